@@ -1,7 +1,11 @@
 /// Inspired from uv: https://github.com/astral-sh/uv/blob/ccdf2d793bbc2401c891b799772f615a28607e79/crates/uv-client/src/middleware.rs#L33
 /// and used to verify that we don't do any requests during the tests.
 use http::Extensions;
-use std::fmt::Debug;
+use std::{
+    collections::HashMap,
+    fmt::Debug,
+    sync::{Arc, Mutex},
+};
 
 use reqwest::{Request, Response};
 use reqwest_middleware::{Middleware, Next};
@@ -47,3 +51,45 @@ impl Middleware for OfflineMiddleware {
         ))
     }
 }
+
+/// A middleware that stands in for the conda-pypi mapping servers. It responds with the
+/// mappings it was constructed with, and with a 404 for any other url. All requested urls are
+/// recorded.
+#[derive(Clone, Default)]
+pub(crate) struct MappingServerMiddleware {
+    responses: Arc<HashMap<String, String>>,
+    requests: Arc<Mutex<Vec<Url>>>,
+}
+
+impl MappingServerMiddleware {
+    /// Constructs a server that responds with the given bodies by url.
+    pub(crate) fn new(responses: HashMap<String, String>) -> Self {
+        Self {
+            responses: Arc::new(responses),
+            requests: Default::default(),
+        }
+    }
+
+    /// Returns the urls that were requested, and forgets about them.
+    pub(crate) fn take_requests(&self) -> Vec<Url> {
+        std::mem::take(&mut self.requests.lock().unwrap())
+    }
+}
+
+#[async_trait::async_trait]
+impl Middleware for MappingServerMiddleware {
+    async fn handle(
+        &self,
+        req: Request,
+        _extensions: &mut Extensions,
+        _next: Next<'_>,
+    ) -> reqwest_middleware::Result<Response> {
+        self.requests.lock().unwrap().push(req.url().clone());
+        let response = match self.responses.get(req.url().as_str()) {
+            Some(body) => http::Response::builder().status(200).body(body.clone()),
+            None => http::Response::builder().status(404).body(String::new()),
+        }
+        .expect("valid response");
+        Ok(Response::from(response))
+    }
+}
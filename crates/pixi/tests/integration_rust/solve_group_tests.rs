@@ -3,10 +3,12 @@ use std::{
     path::Path,
     str::FromStr,
     sync::Arc,
+    time::Duration,
 };
 
 use pypi_mapping::{self, CustomMapping, MappingLocation, MappingSource, PurlSource};
 use rattler_conda_types::{PackageName, Platform, RepoDataRecord};
+use rattler_digest::Sha256Hash;
 use rattler_lock::DEFAULT_ENVIRONMENT_NAME;
 use reqwest_middleware::ClientBuilder;
 use tempfile::TempDir;
@@ -15,7 +17,7 @@ use url::Url;
 use crate::common::{
     LockFileExt, PixiControl,
     builders::{HasDependencyConfig, HasNoInstallConfig},
-    client::OfflineMiddleware,
+    client::{MappingServerMiddleware, OfflineMiddleware},
     package_database::{Package, PackageDatabase},
 };
 use crate::setup_tracing;
@@ -788,3 +790,242 @@ async fn test_disabled_mapping() {
     assert_eq!(boltons_first_purl.name(), "boltons");
     assert!(boltons_first_purl.qualifiers().is_empty());
 }
+
+#[tokio::test]
+async fn test_purls_are_derived_in_batches() {
+    setup_tracing();
+
+    let pixi = PixiControl::new().unwrap();
+    pixi.init().await.unwrap();
+    let project = pixi.workspace().unwrap();
+    let client = project.authenticated_client().unwrap();
+
+    let sha256 = |byte: u8| Sha256Hash::from([byte; 32]);
+    let hash_url = |byte: u8| {
+        format!(
+            "https://conda-mapping.prefix.dev/hash-v0/{:x}",
+            sha256(byte)
+        )
+    };
+    let compressed_mapping_url = "https://raw.githubusercontent.com/prefix-dev/parselmouth/main/files/compressed_mapping.json";
+    let server = MappingServerMiddleware::new(HashMap::from([
+        (
+            hash_url(1),
+            r#"{"pypi_normalized_names": ["pillow"], "conda_name": "pillow", "package_name": "pillow"}"#
+                .to_owned(),
+        ),
+        (
+            compressed_mapping_url.to_owned(),
+            r#"{"numpy": "numpy", "libzlib": null}"#.to_owned(),
+        ),
+    ]));
+    let server_client = ClientBuilder::from_client(client.client().clone())
+        .with(server.clone())
+        .build();
+
+    let records = || {
+        [
+            ("pillow", 1, "https://conda.anaconda.org/conda-forge/"),
+            ("numpy", 2, "https://conda.anaconda.org/conda-forge/"),
+            ("libzlib", 3, "https://conda.anaconda.org/conda-forge/"),
+            ("foo-bar-car", 4, "dummy-channel"),
+        ]
+        .map(|(name, byte, channel)| {
+            let mut package_record = Package::build(name, "1").finish().package_record;
+            package_record.sha256 = Some(sha256(byte));
+            RepoDataRecord {
+                package_record,
+                file_name: name.to_owned(),
+                url: Url::parse(&format!("https://example.com/{name}")).unwrap(),
+                channel: Some(channel.to_owned()),
+            }
+        })
+    };
+
+    let snapshot_dir = TempDir::new().unwrap();
+    let mapping_client = || {
+        pypi_mapping::MappingClient::builder(server_client.clone().into())
+            .with_snapshot_path(Some(snapshot_dir.path().join("snapshot.bin")))
+            .finish()
+    };
+
+    let mut packages = records();
+    mapping_client()
+        .amend_purls(&MappingSource::Prefix, &mut packages, None)
+        .await
+        .unwrap();
+
+    let purls = |record: &RepoDataRecord| {
+        record
+            .package_record
+            .purls
+            .iter()
+            .flatten()
+            .map(|purl| purl.name().to_owned())
+            .collect::<Vec<_>>()
+    };
+    assert_eq!(purls(&packages[0]), ["pillow"]);
+    assert_eq!(purls(&packages[1]), ["numpy"]);
+    assert!(purls(&packages[2]).is_empty());
+    assert!(packages[3].package_record.purls.is_none());
+
+    // Every hash is looked up once, and the compressed mapping is only fetched
+    // once for all records that are missing from the hash mapping.
+    let mut requests = server
+        .take_requests()
+        .into_iter()
+        .map(String::from)
+        .collect::<Vec<_>>();
+    requests.sort();
+    let mut expected = vec![
+        hash_url(1),
+        hash_url(2),
+        hash_url(3),
+        hash_url(4),
+        compressed_mapping_url.to_owned(),
+    ];
+    expected.sort();
+    assert_eq!(requests, expected);
+
+    // A new client, which doesn't share the in-memory caches of the first one, takes
+    // all mappings from the snapshot, including the records that are in neither of
+    // the mappings.
+    let mut packages = records();
+    mapping_client()
+        .amend_purls(&MappingSource::Prefix, &mut packages, None)
+        .await
+        .unwrap();
+    assert_eq!(purls(&packages[0]), ["pillow"]);
+    assert_eq!(purls(&packages[1]), ["numpy"]);
+    assert!(purls(&packages[2]).is_empty());
+    assert!(packages[3].package_record.purls.is_none());
+    assert_eq!(server.take_requests(), Vec::<Url>::new());
+
+    // Without the snapshot every record is looked up again
+    let mut packages = records();
+    pypi_mapping::MappingClient::builder(server_client.clone().into())
+        .with_snapshot_path(None)
+        .finish()
+        .amend_purls(&MappingSource::Prefix, &mut packages, None)
+        .await
+        .unwrap();
+    let mut requests = server
+        .take_requests()
+        .into_iter()
+        .map(String::from)
+        .collect::<Vec<_>>();
+    requests.sort();
+    assert_eq!(requests, expected);
+}
+
+#[tokio::test]
+async fn test_snapshot_is_used_offline() {
+    setup_tracing();
+
+    let pixi = PixiControl::new().unwrap();
+    pixi.init().await.unwrap();
+    let project = pixi.workspace().unwrap();
+    let client = project.authenticated_client().unwrap();
+
+    let sha256 = |byte: u8| Sha256Hash::from([byte; 32]);
+    let server = MappingServerMiddleware::new(HashMap::from([
+        (
+            format!(
+                "https://conda-mapping.prefix.dev/hash-v0/{:x}",
+                sha256(1)
+            ),
+            r#"{"pypi_normalized_names": ["pillow"], "conda_name": "pillow", "package_name": "pillow"}"#
+                .to_owned(),
+        ),
+        (
+            "https://raw.githubusercontent.com/prefix-dev/parselmouth/main/files/compressed_mapping.json".to_owned(),
+            r#"{"numpy": "numpy"}"#.to_owned(),
+        ),
+    ]));
+    let server_client = ClientBuilder::from_client(client.client().clone())
+        .with(server.clone())
+        .build();
+    let offline_client = ClientBuilder::from_client(client.client().clone())
+        .with(OfflineMiddleware)
+        .build();
+
+    // Packages that are in the hash mapping, in the compressed mapping and in
+    // neither of them
+    let records = || {
+        [
+            ("pillow", 1, "https://conda.anaconda.org/conda-forge/"),
+            ("numpy", 2, "https://conda.anaconda.org/conda-forge/"),
+            ("foo-bar-car", 3, "https://example.com/private-channel/"),
+        ]
+        .map(|(name, byte, channel)| {
+            let mut package_record = Package::build(name, "1").finish().package_record;
+            package_record.sha256 = Some(sha256(byte));
+            RepoDataRecord {
+                package_record,
+                file_name: name.to_owned(),
+                url: Url::parse(&format!("https://example.com/{name}")).unwrap(),
+                channel: Some(channel.to_owned()),
+            }
+        })
+    };
+    let purls = |records: &[RepoDataRecord]| {
+        records
+            .iter()
+            .map(|record| {
+                record
+                    .package_record
+                    .purls
+                    .iter()
+                    .flatten()
+                    .map(|purl| purl.name().to_owned())
+                    .collect::<Vec<_>>()
+            })
+            .collect::<Vec<_>>()
+    };
+    let expected_purls = vec![vec!["pillow".to_owned()], vec!["numpy".to_owned()], vec![]];
+
+    let snapshot_dir = TempDir::new().unwrap();
+    let snapshot_path = snapshot_dir.path().join("snapshot.bin");
+    let mapping_client = |client: reqwest_middleware::ClientWithMiddleware, max_age: Duration| {
+        pypi_mapping::MappingClient::builder(client.into())
+            .with_snapshot_path(Some(snapshot_path.clone()))
+            .with_snapshot_max_age(max_age)
+            .finish()
+    };
+
+    let mut packages = records();
+    mapping_client(server_client.clone(), pypi_mapping::SNAPSHOT_MAX_AGE)
+        .amend_purls(&MappingSource::Prefix, &mut packages, None)
+        .await
+        .unwrap();
+    assert_eq!(purls(&packages), expected_purls);
+    assert!(!server.take_requests().is_empty());
+    let snapshot = fs_err::read(&snapshot_path).unwrap();
+
+    // All packages, including the ones that are in neither of the mappings, are
+    // resolved from the snapshot without any requests
+    let mut packages = records();
+    mapping_client(offline_client.clone(), pypi_mapping::SNAPSHOT_MAX_AGE)
+        .amend_purls(&MappingSource::Prefix, &mut packages, None)
+        .await
+        .unwrap();
+    assert_eq!(purls(&packages), expected_purls);
+
+    // An expired snapshot is used when the mappings can't be fetched, and it is kept
+    let mut packages = records();
+    mapping_client(offline_client, Duration::ZERO)
+        .amend_purls(&MappingSource::Prefix, &mut packages, None)
+        .await
+        .unwrap();
+    assert_eq!(purls(&packages), expected_purls);
+    assert_eq!(fs_err::read(&snapshot_path).unwrap(), snapshot);
+
+    // Otherwise an expired snapshot is rebuilt from the mappings
+    let mut packages = records();
+    mapping_client(server_client, Duration::ZERO)
+        .amend_purls(&MappingSource::Prefix, &mut packages, None)
+        .await
+        .unwrap();
+    assert_eq!(purls(&packages), expected_purls);
+    assert!(!server.take_requests().is_empty());
+}
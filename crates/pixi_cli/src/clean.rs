@@ -82,6 +82,10 @@ pub struct CacheArgs {
     #[arg(long)]
     pub build: bool,
 
+    /// Clean only the cached task outputs
+    #[arg(long)]
+    pub tasks: bool,
+
     /// Answer yes to all questions.
     #[clap(short = 'y', long = "yes", alias = "assume-yes")]
     assume_yes: bool,
@@ -201,6 +205,9 @@ async fn clean_cache(args: CacheArgs) -> miette::Result<()> {
         dirs.push(cache_dir.join(consts::CACHED_SOURCE_METADATA));
         dirs.push(cache_dir.join(consts::CACHED_PACKAGES));
     }
+    if args.tasks {
+        dirs.push(cache_dir.join(consts::TASK_OUTPUT_CACHE_DIR));
+    }
     if dirs.is_empty() && (args.assume_yes || dialoguer::Confirm::new()
                 .with_prompt("No cache types specified using the flags.\nDo you really want to remove all cache directories from your machine?")
                 .interact_opt()
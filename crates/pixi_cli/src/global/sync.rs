@@ -38,9 +38,13 @@ pub async fn execute(args: Args) -> miette::Result<()> {
         tracing::warn!("Couldn't remove broken files\n{err:?}")
     }
 
+    // Sync all environments at once, so they're solved and installed concurrently
+    let env_names = project.environments().keys().cloned().collect::<Vec<_>>();
+    let results = project.sync_environments(&env_names).await;
+
     let mut errors = Vec::new();
-    for env_name in project.environments().keys() {
-        match project.sync_environment(env_name, None).await {
+    for (env_name, result) in env_names.iter().zip(results) {
+        match result {
             Ok(state_change) => {
                 if state_change.has_changed() {
                     has_changed = true;
@@ -2,6 +2,7 @@ use crate::global::revert_environment_after_error;
 use clap::Parser;
 use fancy_display::FancyDisplay;
 use pixi_config::{Config, ConfigCli};
+use pixi_global::common::EnvironmentUpdate;
 use pixi_global::common::check_all_exposed;
 use pixi_global::project::ExposedType;
 use pixi_global::{EnvironmentName, Project};
@@ -23,15 +24,11 @@ pub async fn execute(args: Args) -> miette::Result<()> {
         .await?
         .with_cli_config(config.clone());
 
-    async fn apply_changes(
+    /// Determines how the executables of the environment should be exposed after the update
+    async fn expose_type(
         env_name: &EnvironmentName,
-        project: &mut Project,
-    ) -> miette::Result<StateChanges> {
-        // If the environment isn't up-to-date our executable detection afterwards will not work
-        if !project.environment_in_sync(env_name).await? {
-            let _ = project.install_environment(env_name).await?;
-        }
-
+        project: &Project,
+    ) -> miette::Result<ExposedType> {
         // See what executables were installed prior to update
         let env_binaries = project.executables_of_direct_dependencies(env_name).await?;
 
@@ -47,9 +44,16 @@ pub async fn execute(args: Args) -> miette::Result<()> {
         } else {
             ExposedType::Nothing
         };
+        Ok(expose_type)
+    }
 
-        // Reinstall the environment
-        let environment_update = project.install_environment(env_name).await?;
+    async fn apply_changes(
+        env_name: &EnvironmentName,
+        expose_type: ExposedType,
+        environment_update: miette::Result<EnvironmentUpdate>,
+        project: &mut Project,
+    ) -> miette::Result<StateChanges> {
+        let environment_update = environment_update?;
 
         let mut state_changes = StateChanges::default();
 
@@ -93,13 +97,64 @@ pub async fn execute(args: Args) -> miette::Result<()> {
     // Apply changes to each environment, only revert changes if an error occurs
     let mut last_updated_project = project_original;
 
-    for env_name in env_names {
+    // If an environment isn't up-to-date our executable detection afterwards will not work, so
+    // install all environments that are out of sync concurrently first
+    let in_sync = futures::future::join_all(
+        env_names
+            .iter()
+            .map(|env_name| last_updated_project.environment_in_sync(env_name)),
+    )
+    .await;
+    let mut out_of_sync = Vec::new();
+    for (env_name, in_sync) in env_names.iter().zip(in_sync) {
+        match in_sync {
+            Ok(true) => {}
+            Ok(false) => out_of_sync.push(env_name.clone()),
+            Err(err) => {
+                revert_environment_after_error(env_name, &last_updated_project).await?;
+                return Err(err);
+            }
+        }
+    }
+    let results = last_updated_project
+        .install_environments(&out_of_sync)
+        .await;
+    for (env_name, result) in out_of_sync.iter().zip(results) {
+        if let Err(err) = result {
+            revert_environment_after_error(env_name, &last_updated_project).await?;
+            return Err(err);
+        }
+    }
+
+    let mut expose_types = Vec::with_capacity(env_names.len());
+    for env_name in &env_names {
+        match expose_type(env_name, &last_updated_project).await {
+            Ok(expose_type) => expose_types.push(expose_type),
+            Err(err) => {
+                revert_environment_after_error(env_name, &last_updated_project).await?;
+                return Err(err);
+            }
+        }
+    }
+
+    // Reinstall all environments concurrently
+    let environment_updates = last_updated_project.install_environments(&env_names).await;
+
+    for (idx, (expose_type, environment_update)) in expose_types
+        .into_iter()
+        .zip(environment_updates)
+        .enumerate()
+    {
+        let env_name = &env_names[idx];
         let mut project = last_updated_project.clone();
 
-        match apply_changes(&env_name, &mut project).await {
+        match apply_changes(env_name, expose_type, environment_update, &mut project).await {
             Ok(state_changes) => state_changes.report(),
             Err(err) => {
-                revert_environment_after_error(&env_name, &last_updated_project).await?;
+                // The remaining environments were reinstalled as well, so revert them too
+                for env_name in &env_names[idx..] {
+                    revert_environment_after_error(env_name, &last_updated_project).await?;
+                }
                 return Err(err);
             }
         }
@@ -45,6 +45,7 @@ mod shared;
 pub mod shell;
 pub mod shell_hook;
 pub mod task;
+mod timings;
 pub mod tree;
 pub mod update;
 pub mod upgrade;
@@ -119,6 +120,17 @@ pub struct GlobalOptions {
     /// Hide all progress bars, always turned on if stderr is not a terminal.
     #[clap(long, default_value = "false", global = true, env = "PIXI_NO_PROGRESS", help_heading = consts::CLAP_GLOBAL_OPTIONS)]
     no_progress: bool,
+
+    /// Write the wall time of each phase of the command to a trace file in the Chrome trace
+    /// event format.
+    #[clap(
+        long,
+        global = true,
+        env = "PIXI_TIMINGS",
+        value_parser = clap::builder::FalseyValueParser::new(),
+        help_heading = consts::CLAP_GLOBAL_OPTIONS
+    )]
+    timings: bool,
 }
 
 impl Args {
@@ -270,7 +282,9 @@ pub async fn execute() -> miette::Result<()> {
     };
 
     // Execute the command
-    execute_command(command, &global_options).await
+    let result = execute_command(command, &global_options).await;
+    timings::finish();
+    result
 }
 
 #[cfg(feature = "console-subscriber")]
@@ -283,7 +297,7 @@ fn setup_logging(_args: &Args, _use_colors: bool) -> miette::Result<()> {
 fn setup_logging(args: &Args, use_colors: bool) -> miette::Result<()> {
     use pixi_utils::indicatif::IndicatifWriter;
     use tracing_subscriber::{
-        EnvFilter, filter::LevelFilter, prelude::__tracing_subscriber_SubscriberExt,
+        EnvFilter, Layer, filter::LevelFilter, prelude::__tracing_subscriber_SubscriberExt,
         util::SubscriberInitExt,
     };
 
@@ -337,9 +351,17 @@ fn setup_logging(args: &Args, use_colors: bool) -> miette::Result<()> {
         .with_writer(IndicatifWriter::new(pixi_progress::global_multi_progress()))
         .without_time();
 
+    // Record the phases of the command separately from the log output, so the timings don't
+    // depend on the verbosity.
+    let timings_layer = if args.global_options.timings {
+        Some(timings::layer()?)
+    } else {
+        None
+    };
+
     tracing_subscriber::registry()
-        .with(env_filter)
-        .with(fmt_layer)
+        .with(fmt_layer.with_filter(env_filter))
+        .with(timings_layer)
         .init();
     Ok(())
 }
@@ -1,7 +1,8 @@
 use std::{
-    collections::{HashMap, HashSet, hash_map::Entry},
+    collections::{HashMap, HashSet, VecDeque, hash_map::Entry},
     convert::identity,
     ffi::OsString,
+    io::Write,
     string::String,
 };
 
@@ -9,29 +10,32 @@ use std::{
 use std::io::IsTerminal;
 
 use clap::Parser;
-use deno_task_shell::KillSignal;
+use deno_task_shell::{KillSignal, SignalKind};
 use dialoguer::theme::ColorfulTheme;
 use fancy_display::FancyDisplay;
+use futures::{FutureExt, StreamExt, future::LocalBoxFuture, stream::FuturesUnordered};
 use indicatif::ProgressDrawTarget;
 use itertools::Itertools;
 use miette::{Diagnostic, IntoDiagnostic};
 use pixi_config::{ConfigCli, ConfigCliActivation};
+use pixi_consts::consts;
 use pixi_core::{
     Workspace, WorkspaceLocator,
     environment::sanity_check_workspace,
-    lock_file::{ReinstallPackages, UpdateLockFileOptions, UpdateMode},
+    lock_file::{LockFileDerivedData, ReinstallPackages, UpdateLockFileOptions, UpdateMode},
     workspace::{Environment, errors::UnsupportedPlatformError},
 };
 use pixi_manifest::{FeaturesExt, TaskName};
 use pixi_progress::global_multi_progress;
 use pixi_task::{
     AmbiguousTask, CanSkip, ExecutableTask, FailedToParseShellScript, InvalidWorkingDirectory,
-    SearchEnvironments, TaskAndEnvironment, TaskGraph, get_task_env,
+    RunOutput, SearchEnvironments, TaskAndEnvironment, TaskGraph, TaskHash, TaskId, get_task_env,
+    prefetch_task_outputs,
 };
 use rattler_conda_types::Platform;
 use thiserror::Error;
 use tokio_util::sync::CancellationToken;
-use tracing::Level;
+use tracing::{Instrument, Level};
 
 use crate::cli_config::{LockAndInstallConfig, WorkspaceConfig};
 
@@ -82,6 +86,19 @@ pub struct Args {
     #[clap(short = 'n', long)]
     pub dry_run: bool,
 
+    /// The number of tasks to run at the same time
+    ///
+    /// A task starts as soon as the tasks it depends on have finished. When
+    /// more than one task can run at a time, the output of every task is
+    /// captured and printed, prefixed with the task name, once it finishes.
+    #[arg(long, short = 'j', default_value_t = 1, value_parser = clap::value_parser!(u16).range(1..))]
+    pub jobs: u16,
+
+    /// Keep running the tasks that don't depend on a failed task, instead of
+    /// stopping all tasks at the first failure. Only used with `--jobs`
+    #[arg(long)]
+    pub keep_going: bool,
+
     #[clap(long, action = clap::ArgAction::HelpLong)]
     pub help: Option<bool>,
 
@@ -160,8 +177,12 @@ pub async fn execute(args: Args) -> miette::Result<()> {
     )
     .with_disambiguate_fn(disambiguate_task_interactive);
 
-    let task_graph =
-        TaskGraph::from_cmd_args(&workspace, &search_environment, args.task, args.skip_deps)?;
+    let task_graph = TaskGraph::from_cmd_args(
+        &workspace,
+        &search_environment,
+        args.task.clone(),
+        args.skip_deps,
+    )?;
 
     tracing::debug!("Task graph: {}", task_graph);
 
@@ -176,13 +197,36 @@ pub async fn execute(args: Args) -> miette::Result<()> {
         );
     }
 
+    // Download the outputs that are available in the shared task cache for the whole graph at
+    // once, instead of looking up every task separately when it is about to run.
+    if !args.dry_run {
+        prefetch_task_outputs(&task_graph, lock_file.as_lock_file()).await;
+    }
+
+    let signal = KillSignal::default();
+    // make sure that child processes are killed when pixi stops
+    let _drop_guard = signal.clone().drop_guard();
+
+    if args.jobs > 1 {
+        let exit_code = run_future_forwarding_signals(
+            signal.clone(),
+            execute_parallel(&args, &workspace, &task_graph, &lock_file, signal),
+        )
+        .await?;
+        if exit_code != 0 {
+            if exit_code == 127 {
+                command_not_found(&workspace, explicit_environment);
+            }
+            crate::timings::finish();
+            std::process::exit(exit_code);
+        }
+        return Ok(());
+    }
+
     // Traverse the task graph in topological order and execute each individual
     // task.
     let mut task_idx = 0;
     let mut task_envs = HashMap::new();
-    let signal = KillSignal::default();
-    // make sure that child processes are killed when pixi stops
-    let _drop_guard = signal.clone().drop_guard();
 
     for task_id in task_graph.topological_order() {
         let executable_task = ExecutableTask::from_task_graph(&task_graph, task_id);
@@ -193,40 +237,7 @@ pub async fn execute(args: Args) -> miette::Result<()> {
             continue;
         }
 
-        // Showing which command is being run if the level and type allows it.
-        if tracing::enabled!(Level::WARN) && !executable_task.task().is_custom() {
-            if task_idx > 0 {
-                // Add a newline between task outputs
-                pixi_progress::println!();
-            }
-
-            let display_command = executable_task.display_command().to_string();
-
-            pixi_progress::println!(
-                "{}{}{}{}{}{}{}",
-                console::Emoji("✨ ", ""),
-                console::style("Pixi task (").bold(),
-                console::style(executable_task.name().unwrap_or("unnamed"))
-                    .green()
-                    .bold(),
-                // Only print environment if multiple environments are available
-                if workspace.environments().len() > 1 {
-                    format!(
-                        " in {}",
-                        executable_task.run_environment.name().fancy_display()
-                    )
-                } else {
-                    "".to_string()
-                },
-                console::style("): ").bold(),
-                display_command,
-                if let Some(description) = executable_task.task().description() {
-                    console::style(format!(": ({description})")).yellow()
-                } else {
-                    console::style("".to_string()).yellow()
-                }
-            );
-        }
+        print_task_header(&executable_task, &workspace, task_idx);
 
         // on dry-run mode, we just print the command and skip the execution
         if args.dry_run {
@@ -235,72 +246,22 @@ pub async fn execute(args: Args) -> miette::Result<()> {
         }
 
         // check task cache
-        let task_cache = match executable_task
-            .can_skip(lock_file.as_lock_file())
-            .await
-            .into_diagnostic()?
-        {
+        let task_cache = match check_task_cache(&executable_task, &lock_file).await? {
             CanSkip::No(cache) => cache,
             CanSkip::Yes => {
-                let args_text = if !executable_task.args().is_empty() {
-                    format!(
-                        " with args {}",
-                        console::style(executable_task.args()).bold()
-                    )
-                } else {
-                    String::new()
-                };
-
-                pixi_progress::println!(
-                    "Task '{}'{args_text} can be skipped (cache hit) 🚀",
-                    console::style(executable_task.name().unwrap_or("")).bold()
-                );
                 task_idx += 1;
                 continue;
             }
         };
 
-        // If we don't have a command environment yet, we need to compute it. We lazily
-        // compute the task environment because we only need the environment if
-        // a task is actually executed.
-        let task_env: &_ = match task_envs.entry(executable_task.run_environment.clone()) {
-            Entry::Occupied(env) => env.into_mut(),
-            Entry::Vacant(entry) => {
-                // Check if we allow installs
-                if args.lock_and_install_config.allow_installs() {
-                    // Ensure there is a valid prefix
-                    lock_file
-                        .prefix(
-                            &executable_task.run_environment,
-                            UpdateMode::QuickValidate,
-                            &ReinstallPackages::default(),
-                            &pixi_core::environment::InstallFilter::default(),
-                        )
-                        .await?;
-                }
-
-                // Clear the current progress reports.
-                lock_file.command_dispatcher.clear_reporter().await;
-
-                // Clear caches based on the filesystem. The tasks might change files on disk.
-                lock_file.command_dispatcher.clear_filesystem_caches().await;
-
-                let command_env = get_task_env(
-                    &executable_task.run_environment,
-                    args.clean_env || executable_task.task().clean_env(),
-                    Some(lock_file.as_lock_file()),
-                    workspace.config().force_activate(),
-                    workspace.config().experimental_activation_cache_usage(),
-                )
-                .await?;
-                entry.insert(command_env)
-            }
-        };
-
-        let task_env = task_env
-            .iter()
-            .map(|(k, v)| (OsString::from(k), OsString::from(v)))
-            .collect();
+        let task_env = task_env(
+            &args,
+            &workspace,
+            &lock_file,
+            &mut task_envs,
+            &executable_task,
+        )
+        .await?;
 
         // Execute the task itself within the command environment. If one of the tasks
         // failed with a non-zero exit code, we exit this parent process with
@@ -313,28 +274,420 @@ pub async fn execute(args: Args) -> miette::Result<()> {
                 if code == 127 {
                     command_not_found(&workspace, explicit_environment.clone());
                 }
+                crate::timings::finish();
                 std::process::exit(code);
             }
             Err(err) => return Err(err.into()),
         }
 
-        // Compute post-run hash, warn on missing globs, and update the cache
-        let post_hash = executable_task
-            .compute_post_run_hash(lock_file.as_lock_file(), task_cache)
-            .await
-            .into_diagnostic()?;
-        if let Some(ref hash) = post_hash {
-            executable_task.warn_on_missing_globs(hash);
-        }
-        executable_task
-            .save_cache(post_hash)
-            .await
-            .into_diagnostic()?;
+        update_task_cache(&executable_task, &lock_file, task_cache).await?;
     }
 
     Ok(())
 }
 
+/// The result of a task started by [`execute_parallel`], together with what is
+/// needed to report it and update its cache.
+type FinishedTask<'p> = (
+    TaskId,
+    ExecutableTask<'p>,
+    Option<TaskHash>,
+    Result<RunOutput, TaskExecutionError>,
+);
+
+/// The tasks that were started by [`execute_parallel`] and have not finished
+/// yet.
+type RunningTasks<'p> = FuturesUnordered<LocalBoxFuture<'p, FinishedTask<'p>>>;
+
+/// Awaits `future` while polling the running tasks, so they keep making
+/// progress while the next task is prepared. The tasks that finish in the
+/// meantime are added to `finished`.
+async fn while_running<'p, T>(
+    future: impl Future<Output = T>,
+    running: &mut RunningTasks<'p>,
+    finished: &mut VecDeque<FinishedTask<'p>>,
+) -> T {
+    let mut future = std::pin::pin!(future);
+    loop {
+        tokio::select! {
+            output = &mut future => return output,
+            Some(task) = running.next(), if !running.is_empty() => finished.push_back(task),
+        }
+    }
+}
+
+/// Stops the running tasks after `err` occurred. The tasks are awaited, so
+/// their processes are not orphaned, and the output of the tasks that
+/// finished is printed before the error is returned.
+async fn stop_running<'p>(
+    err: impl Into<miette::Report>,
+    kill_signal: &KillSignal,
+    running: RunningTasks<'p>,
+    finished: VecDeque<FinishedTask<'p>>,
+) -> miette::Report {
+    kill_signal.send(SignalKind::SIGTERM);
+    let stopped = running.collect::<Vec<_>>().await;
+    for (_, executable_task, _, result) in finished.into_iter().chain(stopped) {
+        if let Ok(output) = result {
+            print_task_output(&executable_task, &output);
+        }
+    }
+    err.into()
+}
+
+/// Executes the tasks of the graph concurrently. A task is started as soon as
+/// all the tasks it depends on have finished, with at most `args.jobs` tasks
+/// running at the same time.
+///
+/// The output of each task is captured and printed in one go when the task
+/// finishes, so the output of concurrent tasks doesn't interleave. Once a task
+/// fails the other running tasks are stopped, unless `--keep-going` is
+/// passed, in which case all tasks that don't depend on a failed task still
+/// run.
+///
+/// Returns the exit code of the first task that failed, or `0`.
+async fn execute_parallel<'p>(
+    args: &Args,
+    workspace: &'p Workspace,
+    task_graph: &TaskGraph<'p>,
+    lock_file: &LockFileDerivedData<'p>,
+    kill_signal: KillSignal,
+) -> miette::Result<i32> {
+    let order = task_graph.topological_order();
+
+    // The unfinished dependencies of every task, and the tasks waiting on it.
+    let mut waiting_on: HashMap<TaskId, HashSet<TaskId>> = HashMap::new();
+    let mut dependents: HashMap<TaskId, Vec<TaskId>> = HashMap::new();
+    for &task_id in &order {
+        let dependencies: HashSet<TaskId> = task_graph[task_id]
+            .dependencies
+            .iter()
+            .map(|dependency| dependency.task_id())
+            .collect();
+        for &dependency in &dependencies {
+            dependents.entry(dependency).or_default().push(task_id);
+        }
+        waiting_on.insert(task_id, dependencies);
+    }
+
+    // Tasks that can start, in topological order.
+    let mut ready: VecDeque<TaskId> = order
+        .iter()
+        .copied()
+        .filter(|task_id| waiting_on[task_id].is_empty())
+        .collect();
+
+    let mut finish = |task_id: TaskId, ready: &mut VecDeque<TaskId>| {
+        for &dependent in dependents.get(&task_id).into_iter().flatten() {
+            let dependencies = waiting_on
+                .get_mut(&dependent)
+                .expect("every task is part of the graph");
+            if dependencies.remove(&task_id) && dependencies.is_empty() {
+                ready.push_back(dependent);
+            }
+        }
+    };
+
+    let mut task_idx = 0;
+    let mut task_envs = HashMap::new();
+    let mut running: RunningTasks<'p> = FuturesUnordered::new();
+    let mut finished = VecDeque::new();
+    let mut exit_code = 0;
+
+    loop {
+        // Start as many tasks as allowed, unless we are stopping after a failure.
+        while running.len() < args.jobs as usize && (exit_code == 0 || args.keep_going) {
+            let Some(task_id) = ready.pop_front() else {
+                break;
+            };
+            let executable_task = ExecutableTask::from_task_graph(task_graph, task_id);
+
+            // Aliases only group their dependencies, there is nothing to run.
+            if !executable_task.task().is_executable() {
+                finish(task_id, &mut ready);
+                continue;
+            }
+
+            print_task_header(&executable_task, workspace, task_idx);
+            task_idx += 1;
+
+            if args.dry_run {
+                finish(task_id, &mut ready);
+                continue;
+            }
+
+            let can_skip = while_running(
+                check_task_cache(&executable_task, lock_file),
+                &mut running,
+                &mut finished,
+            )
+            .await;
+            let task_cache = match can_skip {
+                Ok(CanSkip::No(cache)) => cache,
+                Ok(CanSkip::Yes) => {
+                    finish(task_id, &mut ready);
+                    continue;
+                }
+                Err(err) => {
+                    return Err(stop_running(err, &kill_signal, running, finished).await);
+                }
+            };
+
+            let task_env = while_running(
+                task_env(args, workspace, lock_file, &mut task_envs, &executable_task),
+                &mut running,
+                &mut finished,
+            )
+            .await;
+            let task_env = match task_env {
+                Ok(task_env) => task_env,
+                Err(err) => {
+                    return Err(stop_running(err, &kill_signal, running, finished).await);
+                }
+            };
+            let kill_signal = kill_signal.clone();
+            running.push(
+                async move {
+                    // Stdin is closed, so the tasks don't compete for it
+                    let result = executable_task
+                        .execute_with_pipes(&task_env, None, Some(kill_signal))
+                        .await;
+                    (task_id, executable_task, task_cache, result)
+                }
+                .boxed_local(),
+            );
+        }
+
+        let next = match finished.pop_front() {
+            Some(task) => Some(task),
+            None => running.next().await,
+        };
+        let Some((task_id, executable_task, task_cache, result)) = next else {
+            break;
+        };
+
+        let output = match result {
+            Ok(output) => output,
+            Err(err) => {
+                return Err(stop_running(err, &kill_signal, running, finished).await);
+            }
+        };
+        print_task_output(&executable_task, &output);
+        if output.exit_code != 0 {
+            pixi_progress::println!(
+                "{}{}",
+                console::style(format!(
+                    "Task '{}' failed with exit code {}",
+                    executable_task.name().unwrap_or("unnamed"),
+                    output.exit_code
+                ))
+                .red()
+                .bold(),
+                if !args.keep_going
+                    && exit_code == 0
+                    && !(running.is_empty() && finished.is_empty())
+                {
+                    ", stopping the other tasks"
+                } else {
+                    ""
+                }
+            );
+            if exit_code == 0 {
+                exit_code = output.exit_code;
+                if !args.keep_going {
+                    kill_signal.send(SignalKind::SIGTERM);
+                }
+            }
+            // The tasks that depend on this task are never started.
+            continue;
+        }
+
+        let updated = while_running(
+            update_task_cache(&executable_task, lock_file, task_cache),
+            &mut running,
+            &mut finished,
+        )
+        .await;
+        if let Err(err) = updated {
+            return Err(stop_running(err, &kill_signal, running, finished).await);
+        }
+        finish(task_id, &mut ready);
+    }
+
+    Ok(exit_code)
+}
+
+/// Shows which command is being run if the level and type allows it.
+fn print_task_header(executable_task: &ExecutableTask<'_>, workspace: &Workspace, task_idx: usize) {
+    if !tracing::enabled!(Level::WARN) || executable_task.task().is_custom() {
+        return;
+    }
+
+    if task_idx > 0 {
+        // Add a newline between task outputs
+        pixi_progress::println!();
+    }
+
+    let display_command = executable_task.display_command().to_string();
+
+    pixi_progress::println!(
+        "{}{}{}{}{}{}{}",
+        console::Emoji("✨ ", ""),
+        console::style("Pixi task (").bold(),
+        console::style(executable_task.name().unwrap_or("unnamed"))
+            .green()
+            .bold(),
+        // Only print environment if multiple environments are available
+        if workspace.environments().len() > 1 {
+            format!(
+                " in {}",
+                executable_task.run_environment.name().fancy_display()
+            )
+        } else {
+            "".to_string()
+        },
+        console::style("): ").bold(),
+        display_command,
+        if let Some(description) = executable_task.task().description() {
+            console::style(format!(": ({description})")).yellow()
+        } else {
+            console::style("".to_string()).yellow()
+        }
+    );
+}
+
+/// Checks whether the task can be skipped, reporting it if it can.
+async fn check_task_cache(
+    executable_task: &ExecutableTask<'_>,
+    lock_file: &LockFileDerivedData<'_>,
+) -> miette::Result<CanSkip> {
+    let can_skip = executable_task
+        .can_skip(lock_file.as_lock_file())
+        .instrument(tracing::info_span!(
+            target: consts::TIMINGS_TARGET,
+            "task hashing",
+            task = executable_task.name().unwrap_or_default()
+        ))
+        .await
+        .into_diagnostic()?;
+
+    if let CanSkip::Yes = can_skip {
+        let args_text = if !executable_task.args().is_empty() {
+            format!(
+                " with args {}",
+                console::style(executable_task.args()).bold()
+            )
+        } else {
+            String::new()
+        };
+
+        pixi_progress::println!(
+            "Task '{}'{args_text} can be skipped (cache hit) 🚀",
+            console::style(executable_task.name().unwrap_or("")).bold()
+        );
+    }
+
+    Ok(can_skip)
+}
+
+/// Returns the environment variables to run the task with.
+///
+/// We lazily compute the task environment because we only need the
+/// environment if a task is actually executed, the result is stored in
+/// `task_envs` for the next task that runs in the same environment.
+async fn task_env<'p>(
+    args: &Args,
+    workspace: &Workspace,
+    lock_file: &LockFileDerivedData<'p>,
+    task_envs: &mut HashMap<Environment<'p>, HashMap<String, String>>,
+    executable_task: &ExecutableTask<'p>,
+) -> miette::Result<HashMap<OsString, OsString>> {
+    let task_env: &_ = match task_envs.entry(executable_task.run_environment.clone()) {
+        Entry::Occupied(env) => env.into_mut(),
+        Entry::Vacant(entry) => {
+            // Check if we allow installs
+            if args.lock_and_install_config.allow_installs() {
+                // Ensure there is a valid prefix
+                lock_file
+                    .prefix(
+                        &executable_task.run_environment,
+                        UpdateMode::QuickValidate,
+                        &ReinstallPackages::default(),
+                        &pixi_core::environment::InstallFilter::default(),
+                    )
+                    .await?;
+            }
+
+            // Clear the current progress reports.
+            lock_file.command_dispatcher.clear_reporter().await;
+
+            // Clear caches based on the filesystem. The tasks might change files on disk.
+            lock_file.command_dispatcher.clear_filesystem_caches().await;
+
+            let command_env = get_task_env(
+                &executable_task.run_environment,
+                args.clean_env || executable_task.task().clean_env(),
+                Some(lock_file.as_lock_file()),
+                workspace.config().force_activate(),
+                workspace.config().activation_cache_usage(),
+            )
+            .await?;
+            entry.insert(command_env)
+        }
+    };
+
+    Ok(task_env
+        .iter()
+        .map(|(k, v)| (OsString::from(k), OsString::from(v)))
+        .collect())
+}
+
+/// Computes the post-run hash, warns on missing globs, and updates the cache.
+async fn update_task_cache(
+    executable_task: &ExecutableTask<'_>,
+    lock_file: &LockFileDerivedData<'_>,
+    task_cache: Option<TaskHash>,
+) -> miette::Result<()> {
+    let post_hash = executable_task
+        .compute_post_run_hash(lock_file.as_lock_file(), task_cache)
+        .instrument(tracing::info_span!(
+            target: consts::TIMINGS_TARGET,
+            "task hashing",
+            task = executable_task.name().unwrap_or_default()
+        ))
+        .await
+        .into_diagnostic()?;
+    if let Some(ref hash) = post_hash {
+        executable_task.warn_on_missing_globs(hash);
+    }
+    executable_task
+        .save_cache(post_hash)
+        .await
+        .into_diagnostic()
+}
+
+/// Prints the captured output of a task, every line prefixed with the name of
+/// the task.
+fn print_task_output(executable_task: &ExecutableTask<'_>, output: &RunOutput) {
+    let prefix = console::style(format!("[{}]", executable_task.name().unwrap_or("unnamed")))
+        .green()
+        .bold();
+
+    global_multi_progress().suspend(|| {
+        // Ignore errors, e.g. when the output is piped into a closed reader
+        let mut stdout = std::io::stdout().lock();
+        for line in output.stdout.lines() {
+            let _ = writeln!(stdout, "{prefix} {line}");
+        }
+        let _ = stdout.flush();
+
+        let mut stderr = std::io::stderr().lock();
+        for line in output.stderr.lines() {
+            let _ = writeln!(stderr, "{prefix} {line}");
+        }
+    });
+}
+
 /// Called when a command was not found.
 fn command_not_found<'p>(workspace: &'p Workspace, explicit_environment: Option<Environment<'p>>) {
     let available_tasks: HashSet<TaskName> =
@@ -534,8 +887,6 @@ async fn listen_ctrl_c_windows() {
 /// https://github.com/astral-sh/uv/blob/9d17dfa3537312b928f94479f632891f918c4760/crates/uv/src/child.rs#L156C21-L168C77.
 #[cfg(unix)]
 async fn listen_and_forward_all_signals(kill_signal: KillSignal) {
-    use futures::FutureExt;
-
     use pixi_core::signals::SIGNALS;
 
     // listen and forward every signal we support
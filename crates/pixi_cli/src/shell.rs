@@ -358,7 +358,7 @@ pub async fn execute(args: Args) -> miette::Result<()> {
         CurrentEnvVarBehavior::Exclude,
         Some(&lock_file),
         workspace.config().force_activate(),
-        workspace.config().experimental_activation_cache_usage(),
+        workspace.config().activation_cache_usage(),
     )
     .await?;
 
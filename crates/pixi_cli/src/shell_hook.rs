@@ -173,7 +173,7 @@ pub async fn execute(args: Args) -> miette::Result<()> {
                 &environment,
                 &lock_file_data.into_lock_file(),
                 workspace.config().force_activate(),
-                workspace.config().experimental_activation_cache_usage(),
+                workspace.config().activation_cache_usage(),
             )
             .await?
         }
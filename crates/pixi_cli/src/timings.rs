@@ -0,0 +1,208 @@
+//! Records the wall time of the phases of a command, enabled with `--timings` or
+//! `PIXI_TIMINGS=json`.
+//!
+//! Phases are marked with spans on the [`consts::TIMINGS_TARGET`] target, e.g. manifest
+//! discovery, satisfiability, solving, installing, activation and task hashing. Every phase is
+//! written to a trace file as a complete event in the Chrome trace event format, which can be
+//! opened in `chrome://tracing` or <https://ui.perfetto.dev>, or aggregated across many runs with
+//! any JSON tooling.
+//!
+//! Events are written as soon as a phase ends, so a trace is still usable when the process exits
+//! early. A trace that misses the closing bracket is accepted by the trace viewers.
+
+use std::{
+    fs::File,
+    io::Write,
+    path::PathBuf,
+    sync::{
+        Mutex, OnceLock,
+        atomic::{AtomicU64, Ordering},
+    },
+    time::{Instant, SystemTime, UNIX_EPOCH},
+};
+
+use pixi_consts::consts;
+use serde_json::{Map, Value, json};
+use tracing::{
+    Subscriber,
+    field::{Field, Visit},
+    span,
+};
+use tracing_subscriber::{
+    Layer,
+    filter::{Filtered, Targets},
+    layer::Context,
+    registry::LookupSpan,
+};
+
+/// The trace file of this process, if timings are enabled.
+static TRACE: OnceLock<Mutex<TraceFile>> = OnceLock::new();
+
+struct TraceFile {
+    path: PathBuf,
+    file: File,
+    events: usize,
+    finished: bool,
+}
+
+impl TraceFile {
+    fn write_event(&mut self, event: &Value) {
+        if self.finished {
+            return;
+        }
+        let separator = if self.events == 0 { "\n" } else { ",\n" };
+        if let Err(err) = write!(self.file, "{separator}{event}") {
+            tracing::debug!("failed to write timings to {}: {err}", self.path.display());
+        }
+        self.events += 1;
+    }
+}
+
+/// Creates the layer that records the timings of the phases of a command into a new trace
+/// file in the temporary directory.
+pub(crate) fn layer<S>() -> miette::Result<Filtered<TimingsLayer, Targets, S>>
+where
+    S: Subscriber + for<'a> LookupSpan<'a>,
+{
+    let millis = SystemTime::now()
+        .duration_since(UNIX_EPOCH)
+        .unwrap_or_default()
+        .as_millis();
+    let dir = std::env::temp_dir().join("pixi-timings");
+    let path = dir.join(format!("{millis}-{}.json", std::process::id()));
+    let file = fs_err::create_dir_all(&dir)
+        .and_then(|_| fs_err::File::create(&path))
+        .map_err(|err| miette::miette!("failed to create the timings file: {err}"))?;
+    let mut file = file.into_parts().0;
+    file.write_all(b"[")
+        .map_err(|err| miette::miette!("failed to write the timings file: {err}"))?;
+
+    let _ = TRACE.set(Mutex::new(TraceFile {
+        path,
+        file,
+        events: 0,
+        finished: false,
+    }));
+
+    Ok(TimingsLayer {
+        start: Instant::now(),
+    }
+    .with_filter(Targets::new().with_target(consts::TIMINGS_TARGET, tracing::Level::TRACE)))
+}
+
+/// Completes the trace file and reports where it was written. Does nothing if timings are
+/// disabled or the trace was already completed.
+pub(crate) fn finish() {
+    let Some(trace) = TRACE.get() else {
+        return;
+    };
+    let mut trace = trace.lock().unwrap_or_else(|err| err.into_inner());
+    if trace.finished {
+        return;
+    }
+    trace.finished = true;
+    let _ = trace.file.write_all(b"\n]\n");
+    eprintln!("Timings written to {}", trace.path.display());
+}
+
+/// A [`Layer`] that writes an event to the trace file when a phase ends.
+pub(crate) struct TimingsLayer {
+    start: Instant,
+}
+
+/// The data that is kept for a phase while it runs.
+struct Phase {
+    start: Instant,
+    thread: u64,
+    args: Map<String, Value>,
+}
+
+impl<S> Layer<S> for TimingsLayer
+where
+    S: Subscriber + for<'a> LookupSpan<'a>,
+{
+    fn on_new_span(&self, attrs: &span::Attributes<'_>, id: &span::Id, ctx: Context<'_, S>) {
+        let Some(span) = ctx.span(id) else {
+            return;
+        };
+        let mut args = Map::new();
+        attrs.record(&mut ArgsVisitor(&mut args));
+        span.extensions_mut().insert(Phase {
+            start: Instant::now(),
+            thread: thread_index(),
+            args,
+        });
+    }
+
+    fn on_record(&self, id: &span::Id, values: &span::Record<'_>, ctx: Context<'_, S>) {
+        let Some(span) = ctx.span(id) else {
+            return;
+        };
+        if let Some(phase) = span.extensions_mut().get_mut::<Phase>() {
+            values.record(&mut ArgsVisitor(&mut phase.args));
+        }
+    }
+
+    fn on_close(&self, id: span::Id, ctx: Context<'_, S>) {
+        let Some(span) = ctx.span(&id) else {
+            return;
+        };
+        let Some(phase) = span.extensions_mut().remove::<Phase>() else {
+            return;
+        };
+        let Some(trace) = TRACE.get() else {
+            return;
+        };
+
+        let micros = |duration: std::time::Duration| duration.as_secs_f64() * 1_000_000.0;
+        let event = json!({
+            "name": span.name(),
+            "cat": "pixi",
+            "ph": "X",
+            "ts": micros(phase.start.saturating_duration_since(self.start)),
+            "dur": micros(phase.start.elapsed()),
+            "pid": std::process::id(),
+            "tid": phase.thread,
+            "args": phase.args,
+        });
+        trace
+            .lock()
+            .unwrap_or_else(|err| err.into_inner())
+            .write_event(&event);
+    }
+}
+
+/// Returns a small number that identifies the current thread in the trace.
+fn thread_index() -> u64 {
+    static NEXT_INDEX: AtomicU64 = AtomicU64::new(0);
+    thread_local! {
+        static INDEX: u64 = NEXT_INDEX.fetch_add(1, Ordering::Relaxed);
+    }
+    INDEX.with(|index| *index)
+}
+
+/// Collects the fields of a span as the arguments of a trace event.
+struct ArgsVisitor<'a>(&'a mut Map<String, Value>);
+
+impl Visit for ArgsVisitor<'_> {
+    fn record_str(&mut self, field: &Field, value: &str) {
+        self.0.insert(field.name().to_string(), Value::from(value));
+    }
+
+    fn record_u64(&mut self, field: &Field, value: u64) {
+        self.0.insert(field.name().to_string(), Value::from(value));
+    }
+
+    fn record_i64(&mut self, field: &Field, value: i64) {
+        self.0.insert(field.name().to_string(), Value::from(value));
+    }
+
+    fn record_bool(&mut self, field: &Field, value: bool) {
+        self.0.insert(field.name().to_string(), Value::from(value));
+    }
+
+    fn record_debug(&mut self, field: &Field, value: &dyn std::fmt::Debug) {
+        self.0
+            .insert(field.name().to_string(), Value::from(format!("{value:?}")));
+    }
+}
@@ -126,6 +126,11 @@ impl CacheDirs {
         })
     }
 
+    /// Returns the directory where the hashes of source globs are cached.
+    pub fn glob_hashes(&self) -> PathBuf {
+        self.build().join(consts::CACHED_GLOB_HASHES)
+    }
+
     /// Returns the directory where source builds are cached.
     pub fn source_builds(&self) -> PathBuf {
         self.source_builds.clone().unwrap_or_else(|| {
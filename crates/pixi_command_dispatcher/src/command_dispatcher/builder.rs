@@ -155,6 +155,7 @@ impl CommandDispatcherBuilder {
         let git_resolver = self.git_resolver.unwrap_or_default();
         let source_metadata_cache = SourceMetadataCache::new(cache_dirs.source_metadata());
         let build_cache = BuildCache::new(cache_dirs.source_builds());
+        let glob_hash_cache = GlobHashCache::persistent(cache_dirs.glob_hashes());
         let tool_platform = self.tool_platform.unwrap_or_else(|| {
             let platform = Platform::current();
             let virtual_packages =
@@ -174,7 +175,7 @@ impl CommandDispatcherBuilder {
             cache_dirs,
             download_client,
             build_backend_overrides: self.build_backend_overrides,
-            glob_hash_cache: GlobHashCache::default(),
+            glob_hash_cache,
             discovery_cache: DiscoveryCache::default(),
             limits: ResolvedLimits::from(self.limits),
             package_cache,
@@ -148,7 +148,7 @@ pub struct ConfigCli {
     #[arg(long, action = ArgAction::SetTrue, help_heading = consts::CLAP_CONFIG_OPTIONS)]
     tls_no_verify: bool,
 
-    /// Use environment activation cache (experimental)
+    /// Use environment activation cache, even if it is disabled in the configuration
     #[arg(long, help_heading = consts::CLAP_CONFIG_OPTIONS)]
     use_environment_activation_cache: bool,
 }
@@ -220,8 +220,7 @@ impl RepodataConfig {
 
 #[derive(Parser, Debug, Default, Clone)]
 pub struct ConfigCliActivation {
-    /// Do not use the environment activation cache. (default: true except in
-    /// experimental mode)
+    /// Do not use the environment activation cache. (default: false)
     #[arg(long, help_heading = consts::CLAP_CONFIG_OPTIONS)]
     force_activate: bool,
 
@@ -365,9 +364,9 @@ impl Default for DetachedEnvironments {
 #[derive(Default, Debug, Clone, Deserialize, Serialize, PartialEq, Eq)]
 #[serde(rename_all = "kebab-case")]
 pub struct ExperimentalConfig {
-    /// The option to opt into the environment activation cache feature.
-    /// This is an experimental feature and may be removed in the future or made
-    /// default.
+    /// The option to opt out of the environment activation cache.
+    /// The cache is used by default, set this to `false` to always run the
+    /// activation scripts.
     #[serde(default)]
     #[serde(skip_serializing_if = "Option::is_none")]
     pub use_environment_activation_cache: Option<bool>,
@@ -382,7 +381,7 @@ impl ExperimentalConfig {
         }
     }
     pub fn use_environment_activation_cache(&self) -> bool {
-        self.use_environment_activation_cache.unwrap_or(false)
+        self.use_environment_activation_cache.unwrap_or(true)
     }
 
     pub fn is_default(&self) -> bool {
@@ -719,6 +718,12 @@ pub struct Config {
     #[serde(skip_serializing_if = "Option::is_none")]
     pub tool_platform: Option<Platform>,
 
+    /// A task cache that is shared between machines, e.g. CI runners and
+    /// developer machines.
+    #[serde(default)]
+    #[serde(skip_serializing_if = "TaskCacheConfig::is_default")]
+    pub task_cache: TaskCacheConfig,
+
     //////////////////////
     // Deprecated fields //
     //////////////////////
@@ -753,6 +758,7 @@ impl Default for Config {
             proxy_config: ProxyConfig::default(),
             build: BuildConfig::default(),
             tool_platform: None,
+            task_cache: TaskCacheConfig::default(),
 
             // Deprecated fields
             change_ps1: None,
@@ -903,6 +909,41 @@ impl ProxyConfig {
     }
 }
 
+#[derive(Clone, Default, Debug, Deserialize, Serialize, PartialEq, Eq)]
+#[serde(rename_all = "kebab-case")]
+pub struct TaskCacheConfig {
+    /// The location of the shared task cache, either a `file://` url of a
+    /// (network) directory or an `http(s)://` url of a server that supports
+    /// `GET`, `HEAD` and `PUT` requests.
+    #[serde(default)]
+    #[serde(skip_serializing_if = "Option::is_none")]
+    pub url: Option<Url>,
+
+    /// Whether to upload the outputs of tasks that ran locally to the shared
+    /// task cache.
+    #[serde(default)]
+    #[serde(skip_serializing_if = "Option::is_none")]
+    pub push: Option<bool>,
+}
+
+impl TaskCacheConfig {
+    pub fn is_default(&self) -> bool {
+        self.url.is_none() && self.push.is_none()
+    }
+
+    pub fn merge(self, other: Self) -> Self {
+        Self {
+            url: other.url.or(self.url),
+            push: other.push.or(self.push),
+        }
+    }
+
+    /// Retrieve the value for the push field (defaults to true).
+    pub fn push(&self) -> bool {
+        self.push.unwrap_or(true)
+    }
+}
+
 /// Container for the package format and compression level
 #[derive(Clone, PartialEq, Eq, Debug)]
 pub struct PackageFormatAndCompression {
@@ -1233,6 +1274,8 @@ impl Config {
     ///
     /// The loaded global config
     pub fn load_global() -> Config {
+        let _span =
+            tracing::info_span!(target: consts::TIMINGS_TARGET, "global config load").entered();
         let mut config = Self::load_system();
 
         for p in config_path_global() {
@@ -1267,6 +1310,7 @@ impl Config {
     ///
     /// The loaded config (merged with the global config)
     pub fn load(project_root: &Path) -> Config {
+        let _span = tracing::info_span!(target: consts::TIMINGS_TARGET, "config load").entered();
         let mut config = Self::load_global();
         let local_config_path = project_root
             .join(consts::PIXI_DIR)
@@ -1321,6 +1365,9 @@ impl Config {
             "shell.change-ps1",
             "shell.force-activate",
             "shell.source-completion-scripts",
+            "task-cache",
+            "task-cache.push",
+            "task-cache.url",
             "tls-no-verify",
             "tool-platform",
         ]
@@ -1370,6 +1417,7 @@ impl Config {
             proxy_config: self.proxy_config.merge(other.proxy_config),
             build: self.build.merge(other.build),
             tool_platform: self.tool_platform.or(other.tool_platform),
+            task_cache: self.task_cache.merge(other.task_cache),
 
             // Deprecated fields that we can ignore as we handle them inside `shell.` field
             change_ps1: None,
@@ -1432,7 +1480,7 @@ impl Config {
         self.shell.force_activate.unwrap_or(false)
     }
 
-    pub fn experimental_activation_cache_usage(&self) -> bool {
+    pub fn activation_cache_usage(&self) -> bool {
         self.experimental.use_environment_activation_cache()
     }
 
@@ -1770,6 +1818,32 @@ impl Config {
                     _ => return Err(err),
                 }
             }
+            key if key.starts_with("task-cache") => {
+                if key == "task-cache" {
+                    if let Some(value) = value {
+                        self.task_cache = serde_json::de::from_str(&value).into_diagnostic()?;
+                    } else {
+                        self.task_cache = TaskCacheConfig::default();
+                    }
+                    return Ok(());
+                } else if !key.starts_with("task-cache.") {
+                    return Err(err);
+                }
+                let subkey = key.strip_prefix("task-cache.").unwrap();
+                match subkey {
+                    "url" => {
+                        self.task_cache.url = value
+                            .map(|v| Url::parse(&v))
+                            .transpose()
+                            .into_diagnostic()?;
+                    }
+                    "push" => {
+                        self.task_cache.push =
+                            value.map(|v| v.parse()).transpose().into_diagnostic()?;
+                    }
+                    _ => return Err(err),
+                }
+            }
             key if key.starts_with("run-post-link-scripts") => {
                 if let Some(value) = value {
                     self.run_post_link_scripts = Some(
@@ -2159,6 +2233,10 @@ UNUSED = "unused"
             proxy_config: ProxyConfig::default(),
             build: BuildConfig::default(),
             tool_platform: None,
+            task_cache: TaskCacheConfig {
+                url: Some(Url::parse("https://cache.example.com/pixi").unwrap()),
+                push: Some(false),
+            },
             // Deprecated keys
             change_ps1: None,
             force_activate: None,
@@ -2484,6 +2562,22 @@ UNUSED = "unused"
             .unwrap();
         assert_eq!(config.shell.source_completion_scripts, Some(false));
 
+        // Test task-cache
+        config
+            .set(
+                "task-cache.url",
+                Some("https://cache.example.com/pixi".to_string()),
+            )
+            .unwrap();
+        assert_eq!(
+            config.task_cache.url,
+            Some(Url::parse("https://cache.example.com/pixi").unwrap())
+        );
+        config
+            .set("task-cache.push", Some("false".to_string()))
+            .unwrap();
+        assert!(!config.task_cache.push());
+
         // Test experimental.use-environment-activation-cache
         config
             .set(
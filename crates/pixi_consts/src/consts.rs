@@ -26,6 +26,7 @@ pub const DEPENDENCIES: &str = "dependencies";
 pub const SYSTEM_REQUIREMENTS: &str = "system-requirements";
 pub const TASK_CACHE_DIR: &str = "task-cache-v0";
 pub const ACTIVATION_ENV_CACHE_DIR: &str = "activation-env-v0";
+pub const SATISFIABILITY_CACHE_FILE: &str = "satisfiability-v0.json";
 pub const PIXI_UV_INSTALLER: &str = "uv-pixi";
 pub const CONDA_PACKAGE_CACHE_DIR: &str = rattler_cache::PACKAGE_CACHE_DIR;
 pub const CONDA_REPODATA_CACHE_DIR: &str = rattler_cache::REPODATA_CACHE_DIR;
@@ -35,6 +36,7 @@ pub const CONDA_MENU_SCHEMA_DIR: &str = "Menu";
 pub const PYPI_CACHE_DIR: &str = "uv-cache";
 pub const CONDA_PYPI_MAPPING_CACHE_DIR: &str = "conda-pypi-mapping";
 pub const CACHED_ENVS_DIR: &str = "cached-envs-v0";
+pub const TASK_OUTPUT_CACHE_DIR: &str = "task-outputs-v0";
 // TODO: CACHED_BUILD_ENVS_DIR was deprecated in favor of CACHED_BUILD_TOOL_ENVS_DIR. This constant will be removed in a future release.
 pub const _CACHED_BUILD_ENVS_DIR: &str = "cached-build-envs-v0";
 pub const CACHED_BUILD_TOOL_ENVS_DIR: &str = "cached-build-tool-envs-v0";
@@ -44,10 +46,15 @@ pub const CACHED_BUILD_BACKENDS: &str = "backends-v0";
 pub const CACHED_PACKAGES: &str = "pkgs";
 pub const CACHED_SOURCE_METADATA: &str = "metadata";
 pub const CACHED_SOURCE_BUILDS: &str = "pkgs";
+pub const CACHED_GLOB_HASHES: &str = "glob-hashes-v0";
 
 /// The directory relative to the .pixi folder that stores build related caches.
 pub const WORKSPACE_CACHE_DIR: &str = "build";
 
+/// The tracing target of the spans that measure the phases of a command, these spans are
+/// recorded when running with `--timings`.
+pub const TIMINGS_TARGET: &str = "pixi::timings";
+
 /// The default config directory for pixi, typically at $XDG_CONFIG_HOME/$PIXI_CONFIG_DIR or $HOME/.config/$PIXI_CONFIG_DIR.
 pub const CONFIG_DIR: &str = match option_env!("PIXI_CONFIG_DIR") {
     Some(dir) => dir,
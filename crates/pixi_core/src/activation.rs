@@ -1,9 +1,11 @@
+use crate::environment::{EnvironmentHash, LockedEnvironmentHash, read_environment_file};
+use crate::workspace::HasWorkspaceRef;
 use crate::{Workspace, workspace::Environment};
-use crate::{environment::EnvironmentHash, workspace::HasWorkspaceRef};
 use fs_err::tokio as tokio_fs;
 use indexmap::IndexMap;
 use itertools::Itertools;
 use miette::IntoDiagnostic;
+use pixi_consts::consts;
 use pixi_manifest::EnvironmentName;
 use pixi_manifest::FeaturesExt;
 use rattler_conda_types::Platform;
@@ -15,9 +17,11 @@ use rattler_shell::{
     },
     shell::ShellEnum,
 };
-use serde::{Deserialize, Serialize};
 use std::collections::HashMap;
+use std::hash::{Hash, Hasher};
 use std::path::PathBuf;
+use tracing::Instrument;
+use xxhash_rust::xxh3::Xxh3;
 
 // Setting a base prefix for the pixi package
 const PROJECT_PREFIX: &str = "PIXI_PROJECT_";
@@ -32,14 +36,125 @@ pub enum CurrentEnvVarBehavior {
     Exclude,
 }
 
-#[derive(Serialize, Deserialize)]
+/// The first bytes of an activation cache file, followed by the version of the format.
+const ACTIVATION_CACHE_MAGIC: &[u8; 4] = b"PXAC";
+const ACTIVATION_CACHE_VERSION: u8 = 1;
+
+/// The environment variables produced by activating an environment, together with the key of the
+/// inputs that produced them.
+///
+/// The cache is read on every `pixi run`, so it is stored in a compact binary format instead of
+/// json: the magic bytes and version, the key as a little-endian `u64`, the number of variables as
+/// a little-endian `u32`, followed by the name and value of every variable, each prefixed with its
+/// length as a little-endian `u32`.
+#[derive(Debug, PartialEq, Eq)]
 struct ActivationCache {
-    /// The hash of the environment which produced the activation's environment variables.
-    hash: EnvironmentHash,
+    /// The key of the inputs which produced the activation's environment variables, see
+    /// [`activation_cache_key`].
+    key: u64,
     /// The environment variables set by the activation.
     environment_variables: HashMap<String, String>,
 }
 
+impl ActivationCache {
+    fn to_bytes(&self) -> Vec<u8> {
+        let mut bytes = Vec::with_capacity(
+            17 + self
+                .environment_variables
+                .iter()
+                .map(|(key, value)| 8 + key.len() + value.len())
+                .sum::<usize>(),
+        );
+        bytes.extend_from_slice(ACTIVATION_CACHE_MAGIC);
+        bytes.push(ACTIVATION_CACHE_VERSION);
+        bytes.extend_from_slice(&self.key.to_le_bytes());
+        bytes.extend_from_slice(&(self.environment_variables.len() as u32).to_le_bytes());
+        for (key, value) in &self.environment_variables {
+            for string in [key, value] {
+                bytes.extend_from_slice(&(string.len() as u32).to_le_bytes());
+                bytes.extend_from_slice(string.as_bytes());
+            }
+        }
+        bytes
+    }
+
+    /// Parses a cache file, returns `None` if it is not a valid cache of the current version.
+    fn from_bytes(mut bytes: &[u8]) -> Option<Self> {
+        fn take<'a>(bytes: &mut &'a [u8], len: usize) -> Option<&'a [u8]> {
+            if bytes.len() < len {
+                return None;
+            }
+            let (head, tail) = bytes.split_at(len);
+            *bytes = tail;
+            Some(head)
+        }
+        fn take_u32(bytes: &mut &[u8]) -> Option<u32> {
+            Some(u32::from_le_bytes(take(bytes, 4)?.try_into().ok()?))
+        }
+        fn take_string(bytes: &mut &[u8]) -> Option<String> {
+            let len = take_u32(bytes)? as usize;
+            String::from_utf8(take(bytes, len)?.to_vec()).ok()
+        }
+
+        if take(&mut bytes, 4)? != ACTIVATION_CACHE_MAGIC
+            || take(&mut bytes, 1)? != [ACTIVATION_CACHE_VERSION]
+        {
+            return None;
+        }
+        let key = u64::from_le_bytes(take(&mut bytes, 8)?.try_into().ok()?);
+        let len = take_u32(&mut bytes)?;
+        let mut environment_variables = HashMap::new();
+        for _ in 0..len {
+            environment_variables.insert(take_string(&mut bytes)?, take_string(&mut bytes)?);
+        }
+
+        bytes.is_empty().then_some(Self {
+            key,
+            environment_variables,
+        })
+    }
+}
+
+/// Computes the key of the inputs of the activation of an environment.
+///
+/// Next to the inputs from the manifest and the given environment variables, the activation
+/// depends on the packages in the prefix. Instead of hashing all packages of the environment in
+/// the lock file, this uses the modification time of the `conda-meta` folder and its `history`
+/// file, which change whenever packages are installed or removed, and the digest of the lock file
+/// environment that was recorded in the prefix when it was installed. Only when the prefix has no
+/// such record is the digest computed from the lock file.
+fn activation_cache_key(
+    environment: &Environment<'_>,
+    input_environment_variables: &HashMap<String, Option<String>>,
+    lock_file: &LockFile,
+) -> u64 {
+    let mut hasher = Xxh3::new();
+    EnvironmentHash::hash_activation_inputs(environment, input_environment_variables, &mut hasher);
+
+    let prefix = environment.dir();
+    let conda_meta = prefix.join(consts::CONDA_META_DIR);
+    for path in [conda_meta.join("history"), conda_meta] {
+        fs_err::metadata(&path)
+            .and_then(|metadata| metadata.modified())
+            .ok()
+            .hash(&mut hasher);
+    }
+
+    match read_environment_file(&prefix) {
+        Ok(Some(environment_file)) => environment_file
+            .environment_lock_file_hash
+            .hash(&mut hasher),
+        _ => lock_file
+            .environment(environment.name().as_str())
+            .map(|locked| {
+                LockedEnvironmentHash::from_environment(locked, environment.best_platform())
+            })
+            .hash(&mut hasher),
+    }
+
+    hasher.finish()
+}
+
 impl Workspace {
     /// Returns environment variables and their values that should be injected when running a command.
     pub(crate) fn get_metadata_env(&self) -> HashMap<String, String> {
@@ -196,25 +311,19 @@ async fn try_get_valid_activation_cache(
     environment: &Environment<'_>,
     cache_file: PathBuf,
 ) -> Option<HashMap<String, String>> {
-    // Find cache file
-    if !cache_file.exists() {
-        return None;
-    }
     // Read the cache file
-    let cache_content = match tokio_fs::read_to_string(&cache_file).await {
+    let cache_content = match tokio_fs::read(&cache_file).await {
         Ok(content) => content,
+        Err(e) if e.kind() == std::io::ErrorKind::NotFound => return None,
         Err(e) => {
             tracing::debug!("Failed to read activation cache file, reactivating. Error: {e}");
             return None;
         }
     };
     // Parse the cache file
-    let cache: ActivationCache = match serde_json::from_str(&cache_content) {
-        Ok(parsed) => parsed,
-        Err(e) => {
-            tracing::debug!("Failed to parse cache file, reactivating. Error: {e}");
-            return None;
-        }
+    let Some(cache) = ActivationCache::from_bytes(&cache_content) else {
+        tracing::debug!("Failed to parse activation cache file, reactivating.");
+        return None;
     };
 
     // Get the current environment variables
@@ -226,11 +335,8 @@ async fn try_get_valid_activation_cache(
             .collect(),
     );
 
-    // Hash the current state
-    let hash = EnvironmentHash::from_environment(environment, &current_input_env_vars, lock_file);
-
-    // Check if the hash matches
-    if cache.hash == hash {
+    // Check if the key of the current state matches
+    if cache.key == activation_cache_key(environment, &current_input_env_vars, lock_file) {
         Some(cache.environment_variables)
     } else {
         None
@@ -243,10 +349,10 @@ pub async fn run_activation(
     env_var_behavior: &CurrentEnvVarBehavior,
     lock_file: Option<&LockFile>,
     force_activate: bool,
-    experimental: bool,
+    use_cache: bool,
 ) -> miette::Result<HashMap<String, String>> {
-    // If the user requested to use the cache and the lockfile is provided, we can try to use the cache.
-    if !force_activate && experimental {
+    // If the cache is enabled and the lockfile is provided, we can try to use the cache.
+    if !force_activate && use_cache {
         let cache_file = environment
             .workspace()
             .activation_env_cache_folder()
@@ -338,7 +444,7 @@ pub async fn run_activation(
 
     // If the lock file is provided, and we can compute the environment hash, let's rewrite the
     // cache file.
-    if experimental {
+    if use_cache {
         if let Some(lock_file) = lock_file {
             // Get the current environment variables from the shell to be part of the hash
             let current_input_env_vars = get_environment_variable_from_shell_environment(
@@ -346,14 +452,10 @@ pub async fn run_activation(
             );
             let cache_file = environment.activation_cache_file_path();
             let cache = ActivationCache {
-                hash: EnvironmentHash::from_environment(
-                    environment,
-                    &current_input_env_vars,
-                    lock_file,
-                ),
+                key: activation_cache_key(environment, &current_input_env_vars, lock_file),
                 environment_variables: activator_result.clone(),
             };
-            let cache = serde_json::to_string(&cache).into_diagnostic()?;
+            let cache = cache.to_bytes();
 
             tokio_fs::create_dir_all(environment.workspace().activation_env_cache_folder())
                 .await
@@ -454,15 +556,20 @@ pub(crate) async fn initialize_env_variables(
     env_var_behavior: CurrentEnvVarBehavior,
     lock_file: Option<&LockFile>,
     force_activate: bool,
-    experimental: bool,
+    use_cache: bool,
 ) -> miette::Result<HashMap<String, String>> {
     let activation_env = run_activation(
         environment,
         &env_var_behavior,
         lock_file,
         force_activate,
-        experimental,
+        use_cache,
     )
+    .instrument(tracing::info_span!(
+        target: consts::TIMINGS_TARGET,
+        "activation",
+        environment = %environment.name()
+    ))
     .await?;
 
     // Get environment variables from the currently activated shell.
@@ -608,6 +715,41 @@ mod tests {
         );
     }
 
+    #[test]
+    fn test_activation_cache_roundtrip() {
+        let cache = ActivationCache {
+            key: 42,
+            environment_variables: HashMap::from([
+                ("PATH".to_string(), "/bin:/usr/bin".to_string()),
+                ("EMPTY".to_string(), String::new()),
+                ("UNICODE".to_string(), "ü🦀".to_string()),
+            ]),
+        };
+        let bytes = cache.to_bytes();
+        assert_eq!(ActivationCache::from_bytes(&bytes), Some(cache));
+
+        // Truncated or trailing data is rejected
+        assert_eq!(ActivationCache::from_bytes(&bytes[..bytes.len() - 1]), None);
+        assert_eq!(
+            ActivationCache::from_bytes(&[bytes.as_slice(), &[0]].concat()),
+            None
+        );
+        assert_eq!(ActivationCache::from_bytes(b"{}"), None);
+    }
+
+    /// Replaces a value in the binary activation cache, the replacement must have the same length
+    /// so the length prefixes in the cache stay valid.
+    async fn replace_in_cache(cache_file: &Path, from: &str, to: &str) {
+        assert_eq!(from.len(), to.len());
+        let mut contents = tokio_fs::read(cache_file).await.unwrap();
+        let start = contents
+            .windows(from.len())
+            .position(|window| window == from.as_bytes())
+            .expect("value should be in the cache");
+        contents[start..start + to.len()].copy_from_slice(to.as_bytes());
+        tokio_fs::write(cache_file, contents).await.unwrap();
+    }
+
     /// Test that the activation cache is created and used correctly based on the lockfile.
     ///
     /// This test will validate the cache usages by running the activation script and checking if the cache is created.
@@ -664,9 +806,7 @@ mod tests {
 
         // Verify that the cache is used, by overwriting the cache and checking if that persisted
         let cache_file = project.default_environment().activation_cache_file_path();
-        let contents = tokio_fs::read_to_string(&cache_file).await.unwrap();
-        let modified = contents.replace("ACTIVATION123", "ACTIVATION456");
-        tokio_fs::write(&cache_file, modified).await.unwrap();
+        replace_in_cache(&cache_file, "ACTIVATION123", "ACTIVATION456").await;
 
         let env = run_activation(
             &default_env,
@@ -716,9 +856,7 @@ packages:
         assert_eq!(env.get("TEST").unwrap(), "ACTIVATION123");
 
         // Verify that the cache is used again after the hash is the same
-        let contents = tokio_fs::read_to_string(&cache_file).await.unwrap();
-        let modified = contents.replace("ACTIVATION123", "ACTIVATION456");
-        tokio_fs::write(&cache_file, modified).await.unwrap();
+        replace_in_cache(&cache_file, "ACTIVATION123", "ACTIVATION456").await;
 
         let env = run_activation(
             &default_env,
@@ -758,9 +896,7 @@ packages:
 
         // Modify the variable in cache
         let cache_file = project.default_environment().activation_cache_file_path();
-        let contents = tokio_fs::read_to_string(&cache_file).await.unwrap();
-        let modified = contents.replace("ACTIVATION123", "ACTIVATION456");
-        tokio_fs::write(&cache_file, modified).await.unwrap();
+        replace_in_cache(&cache_file, "ACTIVATION123", "ACTIVATION456").await;
 
         // Check that the cache is invalidated when the activation.env changes.
         let workspace = r#"
@@ -114,21 +114,45 @@ impl EnvironmentHash {
         lock_file: &LockFile,
     ) -> Self {
         let mut hasher = Xxh3::new();
+        Self::hash_activation_inputs(run_environment, input_environment_variables, &mut hasher);
 
+        // Hash the packages
+        let mut urls = Vec::new();
+        if let Some(env) = lock_file.environment(run_environment.name().as_str()) {
+            if let Some(packages) = env.packages(run_environment.best_platform()) {
+                for package in packages {
+                    urls.push(package.location().to_string())
+                }
+            }
+        }
+        urls.sort();
+        urls.hash(&mut hasher);
+
+        EnvironmentHash(format!("{:x}", hasher.finish()))
+    }
+
+    /// Hashes the inputs of the activation of an environment that are defined outside of the
+    /// prefix: the given environment variables, and the activation scripts and environment
+    /// variables from the manifest.
+    pub(crate) fn hash_activation_inputs(
+        run_environment: &workspace::Environment<'_>,
+        input_environment_variables: &HashMap<String, Option<String>>,
+        hasher: &mut Xxh3,
+    ) {
         // Hash the environment variables
         let mut sorted_input_environment_variables: Vec<_> =
             input_environment_variables.iter().collect();
         sorted_input_environment_variables.sort_by_key(|(key, _)| *key);
         for (key, value) in sorted_input_environment_variables {
-            key.hash(&mut hasher);
-            value.hash(&mut hasher);
+            key.hash(hasher);
+            value.hash(hasher);
         }
 
         // Hash the activation scripts
         let activation_scripts =
             run_environment.activation_scripts(Some(run_environment.best_platform()));
         for script in activation_scripts {
-            script.hash(&mut hasher);
+            script.hash(hasher);
         }
 
         // Hash the environment variables
@@ -138,23 +162,9 @@ impl EnvironmentHash {
         env_vars.sort_by_key(|(key, _)| *key);
 
         for (key, value) in env_vars {
-            key.hash(&mut hasher);
-            value.hash(&mut hasher);
+            key.hash(hasher);
+            value.hash(hasher);
         }
-
-        // Hash the packages
-        let mut urls = Vec::new();
-        if let Some(env) = lock_file.environment(run_environment.name().as_str()) {
-            if let Some(packages) = env.packages(run_environment.best_platform()) {
-                for package in packages {
-                    urls.push(package.location().to_string())
-                }
-            }
-        }
-        urls.sort();
-        urls.hash(&mut hasher);
-
-        EnvironmentHash(format!("{:x}", hasher.finish()))
     }
 }
 
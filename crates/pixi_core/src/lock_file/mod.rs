@@ -5,6 +5,7 @@ mod records_by_name;
 mod reporter;
 mod resolve;
 mod satisfiability;
+mod satisfiability_cache;
 mod update;
 mod utils;
 pub mod virtual_packages;
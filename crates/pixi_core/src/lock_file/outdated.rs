@@ -1,9 +1,18 @@
-use std::collections::{HashMap, HashSet};
+use std::{
+    collections::{HashMap, HashSet},
+    path::Path,
+};
 
-use super::{verify_environment_satisfiability, verify_platform_satisfiability};
+use super::{
+    satisfiability_cache::{self, SatisfiabilityCache},
+    verify_environment_satisfiability, verify_platform_satisfiability,
+};
 use crate::{
     Workspace,
-    lock_file::satisfiability::{EnvironmentUnsat, verify_solve_group_satisfiability},
+    lock_file::satisfiability::{
+        EnvironmentUnsat, PlatformUnsat, VerifiedIndividualEnvironment,
+        verify_solve_group_satisfiability,
+    },
     workspace::{Environment, SolveGroup},
 };
 use fancy_display::FancyDisplay;
@@ -13,6 +22,9 @@ use pixi_glob::GlobHashCache;
 use pixi_manifest::FeaturesExt;
 use rattler_conda_types::Platform;
 use rattler_lock::{LockFile, LockedPackageRef};
+use rayon::prelude::*;
+use tokio::runtime::RuntimeFlavor;
+use tracing::Instrument;
 
 /// A struct that contains information about specific outdated environments.
 ///
@@ -144,6 +156,8 @@ async fn find_unsatisfiable_targets<'p>(
 ) -> UnsatisfiableTargets<'p> {
     let mut verified_environments = HashMap::new();
     let mut unsatisfiable_targets = UnsatisfiableTargets::default();
+    let mut satisfiability_cache = SatisfiabilityCache::load(project);
+    let mut pending_targets = Vec::new();
     for environment in project.environments() {
         let platforms = environment.platforms();
 
@@ -224,48 +238,87 @@ async fn find_unsatisfiable_targets<'p>(
             continue;
         }
 
-        // Verify each individual platform
-        for platform in platforms {
-            match verify_platform_satisfiability(
+        // Collect the platforms that need to be verified, unless they were verified before with
+        // the same inputs
+        let environment_hasher = satisfiability_cache::environment_hasher(&environment);
+        for platform in platforms
+            .into_iter()
+            .sorted_by_key(|platform| platform.as_str())
+        {
+            let digest = satisfiability_cache::target_digest(
+                &environment_hasher,
                 &environment,
                 locked_environment,
                 platform,
-                project.root(),
-                glob_hash_cache.clone(),
-            )
-            .await
+            );
+            if let Some(verified_env) = digest
+                .as_deref()
+                .and_then(|digest| satisfiability_cache.get(&environment, platform, digest))
             {
-                Ok(verified_env) => {
-                    verified_environments.insert((environment.clone(), platform), verified_env);
-                }
-                Err(unsat) if unsat.is_pypi_only() => {
-                    tracing::info!(
-                        "the pypi dependencies of environment '{0}' for platform {platform} are out of date because {unsat}",
-                        environment.name().fancy_display()
-                    );
+                tracing::debug!(
+                    "environment '{0}' for platform {platform} was verified before",
+                    environment.name().fancy_display()
+                );
+                verified_environments.insert((environment.clone(), platform), verified_env);
+                continue;
+            }
 
-                    unsatisfiable_targets
-                        .outdated_pypi
-                        .entry(environment.clone())
-                        .or_default()
-                        .insert(platform);
-                }
-                Err(unsat) => {
-                    tracing::info!(
-                        "the dependencies of environment '{0}' for platform {platform} are out of date because {unsat}",
-                        environment.name().fancy_display()
-                    );
+            pending_targets.push(PendingTarget {
+                environment: environment.clone(),
+                locked_environment,
+                platform,
+                digest,
+            });
+        }
+    }
 
-                    unsatisfiable_targets
-                        .outdated_conda
-                        .entry(environment.clone())
-                        .or_default()
-                        .insert(platform);
+    // Verify the individual platforms in parallel, the results are handled in the order of the
+    // targets so the reported reasons don't depend on the scheduling.
+    let results =
+        verify_platforms_in_parallel(&pending_targets, project.root(), &glob_hash_cache).await;
+    for (target, result) in pending_targets.into_iter().zip(results) {
+        let PendingTarget {
+            environment,
+            platform,
+            digest,
+            ..
+        } = target;
+        match result {
+            Ok(verified_env) => {
+                if let Some(digest) = digest {
+                    satisfiability_cache.insert(&environment, platform, digest, &verified_env);
                 }
+                verified_environments.insert((environment, platform), verified_env);
+            }
+            Err(unsat) if unsat.is_pypi_only() => {
+                tracing::info!(
+                    "the pypi dependencies of environment '{0}' for platform {platform} are out of date because {unsat}",
+                    environment.name().fancy_display()
+                );
+
+                unsatisfiable_targets
+                    .outdated_pypi
+                    .entry(environment)
+                    .or_default()
+                    .insert(platform);
+            }
+            Err(unsat) => {
+                tracing::info!(
+                    "the dependencies of environment '{0}' for platform {platform} are out of date because {unsat}",
+                    environment.name().fancy_display()
+                );
+
+                unsatisfiable_targets
+                    .outdated_conda
+                    .entry(environment)
+                    .or_default()
+                    .insert(platform);
             }
         }
     }
 
+    satisfiability_cache.store();
+
     // Verify grouped environments
     for solve_group in project.solve_groups() {
         'platform: for platform in solve_group.platforms() {
@@ -319,6 +372,68 @@ async fn find_unsatisfiable_targets<'p>(
     unsatisfiable_targets
 }
 
+/// A platform of an environment that needs to be verified against the
+/// lock-file.
+struct PendingTarget<'p, 'l> {
+    environment: Environment<'p>,
+    locked_environment: rattler_lock::Environment<'l>,
+    platform: Platform,
+    /// The digest of the inputs of the verification, if it can be cached.
+    digest: Option<String>,
+}
+
+/// Verifies a single target against the lock-file.
+async fn verify_target(
+    target: &PendingTarget<'_, '_>,
+    project_root: &Path,
+    glob_hash_cache: GlobHashCache,
+) -> Result<VerifiedIndividualEnvironment, Box<PlatformUnsat>> {
+    verify_platform_satisfiability(
+        &target.environment,
+        target.locked_environment,
+        target.platform,
+        project_root,
+        glob_hash_cache,
+    )
+    .instrument(tracing::info_span!(
+        target: consts::TIMINGS_TARGET,
+        "satisfiability",
+        environment = %target.environment.name(),
+        platform = %target.platform
+    ))
+    .await
+}
+
+/// Verifies the given targets and returns the results in the same order.
+///
+/// Matching the locked records against the requirements is CPU bound, so on a
+/// multi-threaded runtime the targets are verified on the rayon thread pool.
+async fn verify_platforms_in_parallel(
+    targets: &[PendingTarget<'_, '_>],
+    project_root: &Path,
+    glob_hash_cache: &GlobHashCache,
+) -> Vec<Result<VerifiedIndividualEnvironment, Box<PlatformUnsat>>> {
+    let handle = tokio::runtime::Handle::current();
+    if targets.len() <= 1 || handle.runtime_flavor() != RuntimeFlavor::MultiThread {
+        let mut results = Vec::with_capacity(targets.len());
+        for target in targets {
+            results.push(verify_target(target, project_root, glob_hash_cache.clone()).await);
+        }
+        return results;
+    }
+
+    // The verification itself may await glob hashes, so every target is driven to completion
+    // on its rayon thread with the handle of the current runtime.
+    tokio::task::block_in_place(|| {
+        targets
+            .par_iter()
+            .map(|target| {
+                handle.block_on(verify_target(target, project_root, glob_hash_cache.clone()))
+            })
+            .collect()
+    })
+}
+
 /// Given a mapping of outdated targets, construct a new mapping of all the
 /// groups that are out of date.
 ///
@@ -480,3 +595,145 @@ fn find_inconsistent_solve_groups<'p>(
         }
     }
 }
+
+#[cfg(test)]
+mod tests {
+    use std::str::FromStr;
+
+    use super::*;
+
+    const PLATFORMS: [Platform; 3] = [Platform::Linux64, Platform::OsxArm64, Platform::Win64];
+
+    fn test_workspace(root: &Path) -> Workspace {
+        let manifest = r#"
+            [workspace]
+            name = "test"
+            channels = ["conda-forge"]
+            platforms = ["linux-64", "osx-arm64", "win-64"]
+
+            [dependencies]
+            _r-mutex = "*"
+
+            [target.win-64.dependencies]
+            _r-mutex = ">=2"
+
+            [feature.other.target.linux-64.dependencies]
+            _r-mutex = ">=2"
+
+            [environments]
+            other = ["other"]
+            "#;
+        Workspace::from_str(&root.join("pixi.toml"), manifest).unwrap()
+    }
+
+    fn test_lock_file() -> LockFile {
+        let platforms = PLATFORMS
+            .iter()
+            .map(|platform| {
+                format!(
+                    "      {platform}:\n      - conda: https://conda.anaconda.org/conda-forge/noarch/_r-mutex-1.0.1-anacondar_1.tar.bz2\n"
+                )
+            })
+            .join("");
+        LockFile::from_str(&format!(
+            r#"
+version: 6
+environments:
+  default:
+    channels:
+    - url: https://conda.anaconda.org/conda-forge/
+    packages:
+{platforms}  other:
+    channels:
+    - url: https://conda.anaconda.org/conda-forge/
+    packages:
+{platforms}packages:
+- conda: https://conda.anaconda.org/conda-forge/noarch/_r-mutex-1.0.1-anacondar_1.tar.bz2
+  sha256: e58f9eeb416b92b550e824bcb1b9fb1958dee69abfe3089dfd1a9173e3a0528a
+  md5: 19f9db5f4f1b7f5ef5f6d67207f25f38
+  license: BSD
+  size: 3566
+  timestamp: 1562343890778
+"#
+        ))
+        .unwrap()
+    }
+
+    #[tokio::test(flavor = "multi_thread")]
+    async fn test_targets_are_verified_in_parallel_in_order() {
+        let temp_dir = tempfile::tempdir().unwrap();
+        let workspace = test_workspace(temp_dir.path());
+        let lock_file = test_lock_file();
+        let glob_hash_cache = GlobHashCache::default();
+
+        let targets = workspace
+            .environments()
+            .into_iter()
+            .cartesian_product(PLATFORMS)
+            .map(|(environment, platform)| PendingTarget {
+                locked_environment: lock_file.environment(environment.name().as_str()).unwrap(),
+                environment,
+                platform,
+                digest: None,
+            })
+            .collect_vec();
+        assert_eq!(targets.len(), 6);
+
+        // The parallel verification returns the same results, in the same order, as
+        // verifying the targets one after another
+        let results =
+            verify_platforms_in_parallel(&targets, workspace.root(), &glob_hash_cache).await;
+        let mut sequential = Vec::new();
+        for target in &targets {
+            sequential.push(verify_target(target, workspace.root(), glob_hash_cache.clone()).await);
+        }
+        let describe = |results: &[Result<VerifiedIndividualEnvironment, Box<PlatformUnsat>>]| {
+            targets
+                .iter()
+                .zip(results)
+                .map(|(target, result)| {
+                    (
+                        target.environment.name().to_string(),
+                        target.platform,
+                        result.as_ref().err().map(ToString::to_string),
+                    )
+                })
+                .collect_vec()
+        };
+        assert_eq!(describe(&results), describe(&sequential));
+        let outdated = describe(&results)
+            .into_iter()
+            .filter(|(_, _, err)| err.is_some())
+            .map(|(environment, platform, _)| (environment, platform))
+            .collect_vec();
+        assert_eq!(
+            outdated,
+            [
+                ("default".to_string(), Platform::Win64),
+                ("other".to_string(), Platform::Linux64),
+                ("other".to_string(), Platform::Win64),
+            ]
+        );
+
+        // The outdated targets are reported per environment
+        let outdated = OutdatedEnvironments::from_workspace_and_lock_file(
+            &workspace,
+            &lock_file,
+            glob_hash_cache,
+        )
+        .await;
+        let outdated_platforms = |name: &str| {
+            let environment = workspace.environment(name).unwrap();
+            outdated.conda[&environment]
+                .iter()
+                .copied()
+                .sorted_by_key(|platform| platform.as_str())
+                .collect_vec()
+        };
+        assert_eq!(outdated_platforms("default"), [Platform::Win64]);
+        assert_eq!(
+            outdated_platforms("other"),
+            [Platform::Linux64, Platform::Win64]
+        );
+    }
+}
@@ -1097,6 +1097,7 @@ pub(crate) async fn verify_package_platform_satisfiability(
 
     // Keep a list of all conda packages that we have already visisted
     let mut conda_packages_visited = HashSet::new();
+    let mut conda_depends_visited = HashSet::new();
     let mut pypi_packages_visited = HashSet::new();
     let mut pypi_requirements_visited = pypi_requirements
         .iter()
@@ -1306,6 +1307,18 @@ pub(crate) async fn verify_package_platform_satisfiability(
 
                 let record = &locked_pixi_records.records[idx.0];
                 for depends in &record.package_record().depends {
+                    // Binary packages share most of their dependencies (e.g. `python >=3.9` or
+                    // `libgcc >=13`). A dependency of a binary package resolves to the same
+                    // locked package regardless of which package requires it, so each distinct
+                    // dependency only has to be parsed and matched once. Dependencies of source
+                    // packages can be anchored to the source package, so these are always
+                    // checked.
+                    if record.as_binary().is_some()
+                        && !conda_depends_visited.insert(depends.as_str())
+                    {
+                        continue;
+                    }
+
                     let spec = MatchSpec::from_str(depends.as_str(), Lenient)
                         .map_err(|e| PlatformUnsat::FailedToParseMatchSpec(depends.clone(), e))?;
 
@@ -0,0 +1,410 @@
+//! Caches the outcome of [`super::verify_platform_satisfiability`] between pixi
+//! invocations.
+//!
+//! Verifying that the lock-file satisfies an environment for a platform walks
+//! every locked package and matches it against the requirements of the
+//! environment. The outcome only depends on the manifest inputs of the
+//! environment, the locked packages of the platform and the channel
+//! configuration, unless the environment contains source packages or path
+//! based pypi packages whose contents are read from disk. For all other
+//! targets a digest of these inputs is stored after a successful verification,
+//! and the verification is skipped when the digest still matches.
+//!
+//! The inputs are hashed field by field in a fixed order. Hashing the debug
+//! representation of the manifest would include maps with a random iteration
+//! order, and unrelated parts like tasks and source spans.
+
+use std::{
+    collections::{BTreeMap, HashSet},
+    fmt::{Debug, Write as _},
+    io::Write as _,
+    path::PathBuf,
+};
+
+use itertools::Itertools;
+use pixi_consts::consts;
+use pixi_manifest::{
+    FeaturesExt,
+    pypi::pypi_options::{NoBinary, NoBuild, NoBuildIsolation, PypiOptions},
+};
+use rattler_conda_types::{PackageName, Platform};
+use rattler_lock::{LockedPackageRef, UrlOrPath};
+use serde::{Deserialize, Serialize};
+use xxhash_rust::xxh3::Xxh3;
+
+use super::satisfiability::VerifiedIndividualEnvironment;
+use crate::{Workspace, workspace::Environment};
+
+/// A target that was verified to be satisfied by the lock-file.
+#[derive(Debug, Clone, PartialEq, Eq, Serialize, Deserialize)]
+struct VerifiedTarget {
+    digest: String,
+    expected_conda_packages: HashSet<PackageName>,
+    conda_packages_used_by_pypi: HashSet<PackageName>,
+}
+
+#[derive(Debug, Default, PartialEq, Eq, Serialize, Deserialize)]
+struct StoredSatisfiability {
+    /// The verified targets by `<environment>/<platform>`.
+    targets: BTreeMap<String, VerifiedTarget>,
+}
+
+/// The targets that were verified by the previous invocation, and the ones
+/// verified by this invocation.
+pub(crate) struct SatisfiabilityCache {
+    path: PathBuf,
+    previous: StoredSatisfiability,
+    current: StoredSatisfiability,
+}
+
+fn target_key(environment: &Environment<'_>, platform: Platform) -> String {
+    format!("{}/{platform}", environment.name().as_str())
+}
+
+impl SatisfiabilityCache {
+    /// Loads the cache of the workspace, a missing or unreadable cache is
+    /// treated as empty.
+    pub(crate) fn load(workspace: &Workspace) -> Self {
+        let path = workspace.satisfiability_cache_file();
+        let previous = fs_err::read(&path)
+            .ok()
+            .and_then(|contents| serde_json::from_slice(&contents).ok())
+            .unwrap_or_default();
+        Self {
+            path,
+            previous,
+            current: StoredSatisfiability::default(),
+        }
+    }
+
+    /// Returns the outcome of the previous verification of the target if its
+    /// inputs still have the same `digest`.
+    pub(crate) fn get(
+        &mut self,
+        environment: &Environment<'_>,
+        platform: Platform,
+        digest: &str,
+    ) -> Option<VerifiedIndividualEnvironment> {
+        let key = target_key(environment, platform);
+        let target = self
+            .previous
+            .targets
+            .get(&key)
+            .filter(|target| target.digest == digest)?
+            .clone();
+        self.current.targets.insert(key, target.clone());
+        Some(VerifiedIndividualEnvironment {
+            expected_conda_packages: target.expected_conda_packages,
+            conda_packages_used_by_pypi: target.conda_packages_used_by_pypi,
+        })
+    }
+
+    /// Records that the target with the given `digest` is satisfied by the
+    /// lock-file.
+    pub(crate) fn insert(
+        &mut self,
+        environment: &Environment<'_>,
+        platform: Platform,
+        digest: String,
+        verified: &VerifiedIndividualEnvironment,
+    ) {
+        self.current.targets.insert(
+            target_key(environment, platform),
+            VerifiedTarget {
+                digest,
+                expected_conda_packages: verified.expected_conda_packages.clone(),
+                conda_packages_used_by_pypi: verified.conda_packages_used_by_pypi.clone(),
+            },
+        );
+    }
+
+    /// Writes the targets verified by this invocation, if they differ from the
+    /// stored ones. Targets that were not verified are dropped.
+    pub(crate) fn store(self) {
+        if self.current == self.previous {
+            return;
+        }
+        let result = (|| {
+            let folder = self.path.parent().expect("the cache is stored in a folder");
+            fs_err::create_dir_all(folder)?;
+            let mut file = tempfile::NamedTempFile::new_in(folder)?;
+            file.write_all(&serde_json::to_vec(&self.current)?)?;
+            file.persist(&self.path).map_err(|err| err.error)?;
+            Ok::<_, std::io::Error>(())
+        })();
+        if let Err(err) = result {
+            tracing::debug!(
+                "failed to write the satisfiability cache to {}: {err}",
+                self.path.display()
+            );
+        }
+    }
+}
+
+/// Feeds formatted values into a hasher without allocating.
+struct HashWriter<'a>(&'a mut Xxh3);
+
+impl std::fmt::Write for HashWriter<'_> {
+    fn write_str(&mut self, s: &str) -> std::fmt::Result {
+        self.0.update(s.as_bytes());
+        Ok(())
+    }
+}
+
+/// Writes the debug representations of `items` in sorted order, followed by
+/// a separator.
+fn write_sorted<T: Debug>(writer: &mut HashWriter<'_>, items: impl IntoIterator<Item = T>) {
+    for item in items.into_iter().map(|item| format!("{item:?}")).sorted() {
+        let _ = write!(writer, "{item}\0");
+    }
+    let _ = write!(writer, "\x01");
+}
+
+/// Returns the pypi options with all package sets and maps sorted by name,
+/// their order depends on the order in which the features are merged.
+fn sorted_pypi_options(mut options: PypiOptions) -> PypiOptions {
+    if let NoBuildIsolation::Packages(packages) = &mut options.no_build_isolation {
+        packages.sort();
+    }
+    if let Some(NoBuild::Packages(packages)) = &mut options.no_build {
+        packages.sort();
+    }
+    if let Some(NoBinary::Packages(packages)) = &mut options.no_binary {
+        packages.sort();
+    }
+    if let Some(overrides) = &mut options.dependency_overrides {
+        overrides.sort_by(|a, _, b, _| a.as_normalized().cmp(b.as_normalized()));
+    }
+    options
+}
+
+/// Hashes the inputs of the verification that are shared by all platforms of
+/// an environment: the channels, system requirements and pypi options of the
+/// environment and the channel configuration.
+pub(crate) fn environment_hasher(environment: &Environment<'_>) -> Xxh3 {
+    let workspace = environment.workspace();
+    let mut hasher = Xxh3::new();
+    let mut writer = HashWriter(&mut hasher);
+    let _ = write!(
+        writer,
+        "{}\0{}\0{}\0{:?}\0{:?}\0{:?}\0",
+        consts::PIXI_VERSION,
+        environment.name().as_str(),
+        workspace.root().display(),
+        environment.channel_config(),
+        environment.system_requirements(),
+        sorted_pypi_options(environment.pypi_options()),
+    );
+    // The order of the channels is their priority
+    for channel in environment.channels() {
+        let _ = write!(writer, "{channel}\0");
+    }
+    hasher
+}
+
+/// Returns the digest of the inputs of the verification of `platform`, or
+/// `None` if the locked packages depend on the contents of files on disk.
+pub(crate) fn target_digest(
+    environment_hasher: &Xxh3,
+    environment: &Environment<'_>,
+    locked_environment: rattler_lock::Environment<'_>,
+    platform: Platform,
+) -> Option<String> {
+    let mut hasher = environment_hasher.clone();
+    let mut writer = HashWriter(&mut hasher);
+    let _ = write!(writer, "{platform}\0");
+    write_sorted(
+        &mut writer,
+        environment
+            .combined_dependencies(Some(platform))
+            .into_specs(),
+    );
+    write_sorted(
+        &mut writer,
+        environment.pypi_dependencies(Some(platform)).into_specs(),
+    );
+    write_sorted(&mut writer, environment.virtual_packages(platform));
+    for package in locked_environment.packages(platform).into_iter().flatten() {
+        match package {
+            LockedPackageRef::Conda(conda) => {
+                if conda.as_source().is_some() {
+                    return None;
+                }
+                let _ = write!(writer, "{conda:?}\0");
+            }
+            LockedPackageRef::Pypi(data, env) => {
+                if matches!(data.location, UrlOrPath::Path(_)) {
+                    return None;
+                }
+                let _ = write!(writer, "{data:?}{env:?}\0");
+            }
+        }
+    }
+    Some(format!("{:032x}", hasher.digest128()))
+}
+
+#[cfg(test)]
+mod tests {
+    use std::str::FromStr;
+
+    use rattler_lock::LockFile;
+
+    use super::*;
+
+    fn test_workspace(root: &std::path::Path, spec: &str) -> Workspace {
+        let manifest = format!(
+            r#"
+            [workspace]
+            name = "test"
+            channels = ["conda-forge"]
+            platforms = ["{platform}"]
+
+            [dependencies]
+            _r-mutex = "{spec}"
+            "#,
+            platform = Platform::current()
+        );
+        Workspace::from_str(&root.join("pixi.toml"), &manifest).unwrap()
+    }
+
+    fn test_lock_file() -> LockFile {
+        LockFile::from_str(&format!(
+            r#"
+version: 6
+environments:
+  default:
+    channels:
+    - url: https://conda.anaconda.org/conda-forge/
+    packages:
+      {platform}:
+      - conda: https://conda.anaconda.org/conda-forge/noarch/_r-mutex-1.0.1-anacondar_1.tar.bz2
+packages:
+- conda: https://conda.anaconda.org/conda-forge/noarch/_r-mutex-1.0.1-anacondar_1.tar.bz2
+  sha256: e58f9eeb416b92b550e824bcb1b9fb1958dee69abfe3089dfd1a9173e3a0528a
+  md5: 19f9db5f4f1b7f5ef5f6d67207f25f38
+  license: BSD
+  size: 3566
+  timestamp: 1562343890778
+"#,
+            platform = Platform::current()
+        ))
+        .unwrap()
+    }
+
+    #[test]
+    fn test_verified_targets_are_reused_while_inputs_match() {
+        let temp_dir = tempfile::tempdir().unwrap();
+        let lock_file = test_lock_file();
+        let locked_environment = lock_file.environment("default").unwrap();
+        let platform = Platform::current();
+
+        let workspace = test_workspace(temp_dir.path(), "*");
+        let environment = workspace.default_environment();
+        let digest = |environment: &Environment<'_>| {
+            target_digest(
+                &environment_hasher(environment),
+                environment,
+                locked_environment,
+                platform,
+            )
+            .unwrap()
+        };
+        assert_eq!(digest(&environment), digest(&environment));
+
+        // Changing the requirements of the environment changes the digest
+        let changed_workspace = test_workspace(temp_dir.path(), ">=1");
+        assert_ne!(
+            digest(&environment),
+            digest(&changed_workspace.default_environment())
+        );
+
+        let mut cache = SatisfiabilityCache::load(&workspace);
+        assert!(
+            cache
+                .get(&environment, platform, &digest(&environment))
+                .is_none()
+        );
+        cache.insert(
+            &environment,
+            platform,
+            digest(&environment),
+            &VerifiedIndividualEnvironment {
+                expected_conda_packages: HashSet::from([PackageName::new_unchecked("_r-mutex")]),
+                conda_packages_used_by_pypi: HashSet::new(),
+            },
+        );
+        cache.store();
+
+        let mut cache = SatisfiabilityCache::load(&workspace);
+        assert!(cache.get(&environment, platform, "outdated").is_none());
+        let verified = cache
+            .get(&environment, platform, &digest(&environment))
+            .unwrap();
+        assert_eq!(
+            verified.expected_conda_packages,
+            HashSet::from([PackageName::new_unchecked("_r-mutex")])
+        );
+    }
+
+    #[test]
+    fn test_digest_does_not_depend_on_map_order() {
+        let temp_dir = tempfile::tempdir().unwrap();
+        let lock_file = test_lock_file();
+        let locked_environment = lock_file.environment("default").unwrap();
+        let platform = Platform::current();
+        let manifest = format!(
+            r#"
+            [workspace]
+            name = "test"
+            channels = ["conda-forge"]
+            platforms = ["{platform}"]
+
+            [dependencies]
+            _r-mutex = "*"
+            zlib = ">=1"
+            bzip2 = "*"
+
+            [tasks]
+            build = "echo build"
+            test = {{ cmd = "echo test", depends-on = ["build"] }}
+            lint = "echo lint"
+            format = "echo format"
+            docs = {{ cmd = "echo docs", inputs = ["docs/**"] }}
+
+            [feature.extra.dependencies]
+            xz = "*"
+            lz4 = "*"
+
+            [feature.extra.tasks]
+            extra-build = "echo extra"
+            extra-test = "echo extra-test"
+
+            [environments]
+            extra = ["extra"]
+            "#
+        );
+
+        // Every workspace has its own hash maps, with their own iteration order
+        let digests = || {
+            let workspace =
+                Workspace::from_str(&temp_dir.path().join("pixi.toml"), &manifest).unwrap();
+            workspace
+                .environments()
+                .into_iter()
+                .map(|environment| {
+                    target_digest(
+                        &environment_hasher(&environment),
+                        &environment,
+                        locked_environment,
+                        platform,
+                    )
+                    .unwrap()
+                })
+                .collect_vec()
+        };
+        let first = digests();
+        for _ in 0..10 {
+            assert_eq!(first, digests());
+        }
+    }
+}
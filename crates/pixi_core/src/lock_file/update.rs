@@ -90,7 +90,6 @@ impl Workspace {
         options: UpdateLockFileOptions,
     ) -> miette::Result<(LockFileDerivedData<'_>, bool)> {
         let lock_file = self.load_lock_file().await?;
-        let glob_hash_cache = GlobHashCache::default();
 
         // Construct a command dispatcher that will be used to run the tasks.
         let multi_progress = global_multi_progress();
@@ -106,6 +105,9 @@ impl Workspace {
         // Get the package cache from the dispatcher.
         let package_cache = command_dispatcher.package_cache().clone();
 
+        // Share the glob hashes with the dispatcher, they are persisted in its cache directory.
+        let glob_hash_cache = command_dispatcher.glob_hash_cache().clone();
+
         // should we check the lock-file in the first place?
         if !options.lock_file_usage.should_check_if_out_of_date() {
             tracing::info!("skipping check if lock-file is up-to-date");
@@ -132,6 +134,10 @@ impl Workspace {
             &lock_file,
             glob_hash_cache.clone(),
         )
+        .instrument(tracing::info_span!(
+            target: consts::TIMINGS_TARGET,
+            "outdated environments"
+        ))
         .await;
         if outdated.is_empty() {
             tracing::info!("the lock-file is up-to-date");
@@ -379,6 +385,11 @@ impl<'p> LockFileDerivedData<'p> {
         // Get the up-to-date prefix
         let prefix = self
             .update_prefix(environment, reinstall_packages, filter)
+            .instrument(tracing::info_span!(
+                target: consts::TIMINGS_TARGET,
+                "install",
+                environment = %environment.name()
+            ))
             .await?;
 
         // We write an invalid hash when filtering, as we will need to do a full
@@ -1124,6 +1135,10 @@ impl<'p> UpdateContextBuilder<'p> {
                     &lock_file,
                     glob_hash_cache.clone(),
                 )
+                .instrument(tracing::info_span!(
+                    target: consts::TIMINGS_TARGET,
+                    "outdated environments"
+                ))
                 .await
             }
         };
@@ -1451,6 +1466,12 @@ impl<'p> UpdateContext<'p> {
                     self.command_dispatcher.clone(),
                     pin_overrides,
                 )
+                .instrument(tracing::info_span!(
+                    target: consts::TIMINGS_TARGET,
+                    "solve conda",
+                    group = %source.name().as_str(),
+                    platform = %platform
+                ))
                 .map_err(Report::new)
                 .boxed_local();
 
@@ -2352,7 +2373,8 @@ async fn spawn_solve_pypi_task<'p>(
         ))
     }
     .instrument(tracing::info_span!(
-        "resolve_pypi",
+        target: consts::TIMINGS_TARGET,
+        "solve pypi",
         group = %grouped_environment.name().as_str(),
         platform = %platform
     ))
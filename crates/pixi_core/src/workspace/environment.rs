@@ -104,9 +104,9 @@ impl<'p> Environment<'p> {
 
     /// We store a hash of the lockfile and all activation env variables in a
     /// file in the cache. The current name is
-    /// `activation_environment-name.json`.
+    /// `activation_environment-name.bin`.
     pub fn activation_cache_name(&self) -> String {
-        format!("activation_{}.json", self.name())
+        format!("activation_{}.bin", self.name())
     }
 
     /// Returns the activation cache file path.
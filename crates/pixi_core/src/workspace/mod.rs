@@ -615,6 +615,12 @@ impl Workspace {
         self.pixi_dir().join(consts::ACTIVATION_ENV_CACHE_DIR)
     }
 
+    /// Returns the file that stores which environments were last verified to be
+    /// satisfied by the lock-file.
+    pub fn satisfiability_cache_file(&self) -> PathBuf {
+        self.pixi_dir().join(consts::SATISFIABILITY_CACHE_FILE)
+    }
+
     /// Returns what pypi mapping configuration we should use.
     /// It can be a custom one  in following format : conda_name: pypi_name
     /// Or we can use our self-hosted
@@ -776,7 +782,7 @@ pub async fn get_activated_environment_variables<'a>(
     current_env_var_behavior: CurrentEnvVarBehavior,
     lock_file: Option<&LockFile>,
     force_activate: bool,
-    experimental_cache: bool,
+    use_activation_cache: bool,
 ) -> miette::Result<&'a HashMap<String, String>> {
     let vars = project_env_vars.get(environment.name()).ok_or_else(|| {
         miette::miette!(
@@ -793,7 +799,7 @@ pub async fn get_activated_environment_variables<'a>(
                         current_env_var_behavior,
                         lock_file,
                         force_activate,
-                        experimental_cache,
+                        use_activation_cache,
                     )
                     .await
                 })
@@ -807,7 +813,7 @@ pub async fn get_activated_environment_variables<'a>(
                         current_env_var_behavior,
                         lock_file,
                         force_activate,
-                        experimental_cache,
+                        use_activation_cache,
                     )
                     .await
                 })
@@ -821,7 +827,7 @@ pub async fn get_activated_environment_variables<'a>(
                         current_env_var_behavior,
                         lock_file,
                         force_activate,
-                        experimental_cache,
+                        use_activation_cache,
                     )
                     .await
                 })
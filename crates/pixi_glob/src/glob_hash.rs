@@ -10,7 +10,7 @@ use std::{
 use rattler_digest::{Sha256, Sha256Hash, digest::Digest};
 use thiserror::Error;
 
-use crate::{GlobSet, GlobSetError};
+use crate::{GlobSet, GlobSetError, glob_hash_store::GlobHashStamps};
 
 /// Contains a hash of the files that match the given glob patterns.
 #[derive(Debug, Clone, Default)]
@@ -35,6 +35,15 @@ pub enum GlobHashError {
 }
 
 impl GlobHash {
+    /// Constructs an instance from a previously computed hash.
+    pub(crate) fn from_hash(hash: Sha256Hash) -> Self {
+        Self {
+            hash,
+            #[cfg(test)]
+            matching_files: Vec::new(),
+        }
+    }
+
     /// Calculate a hash of the files that match the given glob patterns.
     pub fn from_patterns<'a>(
         root_dir: &Path,
@@ -48,8 +57,38 @@ impl GlobHash {
 
         let glob_set = GlobSet::create(globs);
         // Collect matching entries and convert to concrete DirEntry list, propagating errors.
-        let mut entries = glob_set.collect_matching(root_dir)?;
+        let entries = glob_set.collect_matching(root_dir)?;
+        Self::from_entries(root_dir, entries, additional_hash)
+    }
 
+    /// Same as [`GlobHash::from_patterns`], but also returns the stamps of the directories that
+    /// were traversed and the files that matched. The stamps are `None` if they can't be trusted
+    /// to detect changes, see [`GlobHashStamps::from_entries`].
+    pub(crate) fn from_patterns_with_stamps<'a>(
+        root_dir: &Path,
+        globs: impl IntoIterator<Item = &'a str>,
+        additional_hash: Vec<u8>,
+    ) -> Result<(Self, Option<GlobHashStamps>), GlobHashError> {
+        if !root_dir.is_dir() {
+            return Ok((Self::default(), None));
+        }
+
+        let glob_set = GlobSet::create(globs);
+        let (entries, dirs) = glob_set.collect_matching_and_dirs(root_dir)?;
+
+        // Take the stamps before reading the files, so changes made while hashing are detected
+        // the next time.
+        let stamps = GlobHashStamps::from_entries(&entries, &dirs);
+        let hash = Self::from_entries(root_dir, entries, additional_hash)?;
+        Ok((hash, stamps))
+    }
+
+    /// Calculate a hash of the given entries, which matched glob patterns in `root_dir`.
+    fn from_entries(
+        root_dir: &Path,
+        mut entries: Vec<ignore::DirEntry>,
+        additional_hash: Vec<u8>,
+    ) -> Result<Self, GlobHashError> {
         // Sort deterministically by path
         entries.sort_by_key(|e| e.path().to_path_buf());
 
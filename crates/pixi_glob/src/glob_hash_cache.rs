@@ -1,6 +1,9 @@
-//! This module contains the `GlobHashCache` struct which is used to cache the computation of glob hashes. This cache is an in-process cache
-//! so it's purpose is to re-use computed hashes across multiple calls to the same glob hash computation for the same set of input files.
-//! The input files are deemed not to change between calls.
+//! This module contains the `GlobHashCache` struct which is used to cache the computation of glob hashes. The in-process cache
+//! re-uses computed hashes across multiple calls to the same glob hash computation for the same set of input files. Within a
+//! process the input files are deemed not to change between calls.
+//!
+//! A cache created with [`GlobHashCache::persistent`] also stores the hashes on disk, so later processes can re-use them as long
+//! as the matching files didn't change. See the `glob_hash_store` module for how this is validated.
 use std::{
     collections::BTreeSet,
     convert::identity,
@@ -10,9 +13,11 @@ use std::{
 };
 
 use dashmap::{DashMap, Entry};
+use rattler_digest::{Sha256, Sha256Hash, digest::Digest};
 use tokio::sync::broadcast;
 
 use super::{GlobHash, GlobHashError};
+use crate::glob_hash_store::GlobHashStore;
 
 /// A key for the cache of glob hashes.
 #[derive(Debug, Clone, Hash, PartialEq, Eq)]
@@ -44,6 +49,44 @@ impl GlobHashKey {
             additional_hash,
         }
     }
+
+    /// Returns a digest of the key that is used as the name of its entry on disk.
+    pub(crate) fn digest(&self) -> Sha256Hash {
+        let mut hasher = Sha256::default();
+        hasher.update(self.root.to_string_lossy().as_bytes());
+        for glob in &self.globs {
+            // Separate the globs, so different sets of globs never result in the same input
+            hasher.update([0u8]);
+            hasher.update(glob.as_bytes());
+        }
+        hasher.update([0u8]);
+        hasher.update(&self.additional_hash);
+        hasher.finalize()
+    }
+
+    /// Computes the hash of the key, re-using the hash in `store` if the matching files didn't
+    /// change.
+    fn compute(&self, store: Option<&GlobHashStore>) -> Result<GlobHash, GlobHashError> {
+        let globs = self.globs.iter().map(String::as_str);
+        let Some(store) = store else {
+            return GlobHash::from_patterns(&self.root, globs, self.additional_hash.clone());
+        };
+
+        if let Some(hash) = store.load(self) {
+            return Ok(hash);
+        }
+        let (hash, stamps) =
+            GlobHash::from_patterns_with_stamps(&self.root, globs, self.additional_hash.clone())?;
+        if let Some(stamps) = stamps {
+            if let Err(err) = store.store(self, &hash.hash, stamps) {
+                tracing::debug!(
+                    "failed to store the glob hash of {}: {err}",
+                    self.root.display()
+                );
+            }
+        }
+        Ok(hash)
+    }
 }
 
 #[derive(Debug)]
@@ -62,9 +105,22 @@ enum HashCacheEntry {
 #[derive(Debug, Default, Clone)]
 pub struct GlobHashCache {
     cache: Arc<DashMap<GlobHashKey, HashCacheEntry>>,
+
+    /// Where hashes are persisted across processes, if anywhere.
+    store: Option<Arc<GlobHashStore>>,
 }
 
 impl GlobHashCache {
+    /// Creates a cache that also stores the computed hashes in the given directory. Stored
+    /// hashes are re-used by later processes as long as the directories that were traversed and
+    /// the files that matched didn't change.
+    pub fn persistent(dir: impl Into<PathBuf>) -> Self {
+        Self {
+            cache: Arc::default(),
+            store: Some(Arc::new(GlobHashStore::new(dir.into()))),
+        }
+    }
+
     /// Computes the input hash of the given key. If the hash is already in the
     /// cache, it will return the cached value. If the hash is not in the
     /// cache, it will compute the hash (deduplicating any request) and return
@@ -82,21 +138,17 @@ impl GlobHashCache {
 
                 // Spawn the computation of the hash
                 let computation_key = key.clone();
-                let result = tokio::task::spawn_blocking(move || {
-                    GlobHash::from_patterns(
-                        &computation_key.root,
-                        computation_key.globs.iter().map(String::as_str),
-                        computation_key.additional_hash,
-                    )
-                })
-                .await
-                .map_or_else(
-                    |err| match err.try_into_panic() {
-                        Ok(panic) => std::panic::resume_unwind(panic),
-                        Err(_) => Err(GlobHashError::Cancelled),
-                    },
-                    identity,
-                )?;
+                let store = self.store.clone();
+                let result =
+                    tokio::task::spawn_blocking(move || computation_key.compute(store.as_deref()))
+                        .await
+                        .map_or_else(
+                            |err| match err.try_into_panic() {
+                                Ok(panic) => std::panic::resume_unwind(panic),
+                                Err(_) => Err(GlobHashError::Cancelled),
+                            },
+                            identity,
+                        )?;
 
                 // Store the result in the cache
                 self.cache.insert(key, HashCacheEntry::Done(result.clone()));
@@ -130,7 +182,8 @@ impl GlobHashCache {
         }
     }
 
-    /// Clears all memoized glob hashes. In-flight computations are unaffected.
+    /// Clears all memoized glob hashes. In-flight computations are unaffected. Hashes stored on
+    /// disk are kept, they are validated against the files before they are used.
     pub fn clear(&self) {
         self.cache.clear();
     }
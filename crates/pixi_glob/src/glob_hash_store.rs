@@ -0,0 +1,339 @@
+//! This module contains the `GlobHashStore` which persists glob hashes on disk, so the
+//! [`crate::GlobHashCache`] can reuse them across pixi invocations.
+//!
+//! Next to the hash, every stored entry contains the modification time of each directory that was
+//! traversed while matching the globs, and the size and modification time of each matching file.
+//! A file can only start or stop matching when an entry is added to, removed from or renamed in a
+//! traversed directory, which updates the modification time of that directory. The contents of a
+//! file can only change together with its modification time. Validating an entry therefore only
+//! requires a `stat` per directory and file, instead of walking the tree and reading every file.
+//!
+//! The walker also honours the `.git/info/exclude` files of the repositories the directories
+//! belong to. They are stamped as well, including the ones that don't exist yet.
+use std::{
+    collections::HashSet,
+    fs::Metadata,
+    io::{self, Write},
+    path::{Path, PathBuf},
+    time::{Duration, SystemTime, UNIX_EPOCH},
+};
+
+use rattler_digest::{Sha256, Sha256Hash};
+use serde::{Deserialize, Serialize};
+
+use crate::{GlobHash, GlobHashKey};
+
+/// The version of the format of stored entries, entries with another version are ignored.
+const STORE_VERSION: u32 = 2;
+
+/// Directories and files modified less than this long ago are not trusted to detect changes.
+/// Their modification time could still change without any visible difference, e.g. on file
+/// systems with a coarse timestamp resolution.
+const RACY_MODIFICATION_WINDOW: Duration = Duration::from_secs(2);
+
+/// The metadata of a directory or file that is used to detect changes.
+#[derive(Debug, Clone, Copy, PartialEq, Eq, Serialize, Deserialize)]
+struct Stamp {
+    size: u64,
+    mtime_secs: u64,
+    mtime_nanos: u32,
+}
+
+impl Stamp {
+    fn from_metadata(metadata: &Metadata) -> Option<Self> {
+        let mtime = metadata.modified().ok()?.duration_since(UNIX_EPOCH).ok()?;
+        Some(Self {
+            size: metadata.len(),
+            mtime_secs: mtime.as_secs(),
+            mtime_nanos: mtime.subsec_nanos(),
+        })
+    }
+
+    /// Returns the stamp of the directory or file at `path`, following symlinks like the hashing
+    /// does.
+    fn of_path(path: &Path) -> Option<Self> {
+        Self::from_metadata(&fs_err::metadata(path).ok()?)
+    }
+
+    /// Returns the stamp of a file that may not exist, `None` meaning it doesn't. Returns `Err`
+    /// if the stamp can't be determined.
+    fn of_optional_path(path: &Path) -> Result<Option<Self>, ()> {
+        match fs_err::metadata(path) {
+            Ok(metadata) => Self::from_metadata(&metadata).map(Some).ok_or(()),
+            Err(err) if err.kind() == io::ErrorKind::NotFound => Ok(None),
+            Err(_) => Err(()),
+        }
+    }
+
+    fn is_racy(&self, now: SystemTime) -> bool {
+        let mtime = UNIX_EPOCH + Duration::new(self.mtime_secs, self.mtime_nanos);
+        now.duration_since(mtime)
+            .is_ok_and(|age| age < RACY_MODIFICATION_WINDOW)
+            || mtime > now
+    }
+}
+
+/// The stamps of the directories and files that determined a glob hash.
+#[derive(Debug, Serialize, Deserialize)]
+pub(crate) struct GlobHashStamps {
+    dirs: Vec<(PathBuf, Stamp)>,
+    files: Vec<(PathBuf, Stamp)>,
+    /// The git exclude files that apply to the directories, `None` if they don't exist.
+    git_excludes: Vec<(PathBuf, Option<Stamp>)>,
+}
+
+impl GlobHashStamps {
+    /// Records the stamps of the matching files and the traversed directories. Returns `None` if
+    /// a stamp can't be determined or one of them was modified too recently to be trusted.
+    pub(crate) fn from_entries(
+        files: &[ignore::DirEntry],
+        dirs: &[ignore::DirEntry],
+    ) -> Option<Self> {
+        let now = SystemTime::now();
+        let stamps = |entries: &[ignore::DirEntry]| {
+            entries
+                .iter()
+                .map(|entry| {
+                    let stamp = Stamp::of_path(entry.path())?;
+                    (!stamp.is_racy(now)).then(|| (entry.path().to_path_buf(), stamp))
+                })
+                .collect::<Option<Vec<_>>>()
+        };
+        let git_excludes = git_exclude_files(dirs)
+            .into_iter()
+            .map(|path| {
+                let stamp = Stamp::of_optional_path(&path).ok()?;
+                (!stamp.is_some_and(|stamp| stamp.is_racy(now))).then_some((path, stamp))
+            })
+            .collect::<Option<Vec<_>>>()?;
+        Some(Self {
+            dirs: stamps(dirs)?,
+            files: stamps(files)?,
+            git_excludes,
+        })
+    }
+
+    /// Returns true if none of the directories and files changed since the stamps were taken.
+    fn is_unchanged(&self) -> bool {
+        self.dirs
+            .iter()
+            .chain(&self.files)
+            .all(|(path, stamp)| Stamp::of_path(path) == Some(*stamp))
+            && self
+                .git_excludes
+                .iter()
+                .all(|(path, stamp)| Stamp::of_optional_path(path) == Ok(*stamp))
+    }
+}
+
+/// Returns the `info/exclude` files of the git repositories that the directories, or any of
+/// their parents, are the root of.
+fn git_exclude_files(dirs: &[ignore::DirEntry]) -> Vec<PathBuf> {
+    let mut visited = HashSet::new();
+    let mut excludes = Vec::new();
+    for dir in dirs {
+        for ancestor in dir.path().ancestors() {
+            if !visited.insert(ancestor.to_path_buf()) {
+                break;
+            }
+            if let Some(git_dir) = git_dir(ancestor) {
+                excludes.push(git_dir.join("info").join("exclude"));
+            }
+        }
+    }
+    excludes
+}
+
+/// Returns the git directory of the repository rooted at `dir`, resolving the `.git` files of
+/// worktrees and submodules like the walker does.
+fn git_dir(dir: &Path) -> Option<PathBuf> {
+    let dot_git = dir.join(".git");
+    if dot_git.is_dir() {
+        return Some(dot_git);
+    }
+    let contents = fs_err::read_to_string(&dot_git).ok()?;
+    let git_dir = dir.join(contents.strip_prefix("gitdir:")?.trim());
+    match fs_err::read_to_string(git_dir.join("commondir")) {
+        Ok(common_dir) => Some(git_dir.join(common_dir.trim())),
+        Err(_) => Some(git_dir),
+    }
+}
+
+#[derive(Serialize, Deserialize)]
+struct StoredGlobHash {
+    version: u32,
+    hash: String,
+    stamps: GlobHashStamps,
+}
+
+/// A directory with a file per [`GlobHashKey`] that contains the hash and the stamps that
+/// validate it.
+#[derive(Debug)]
+pub(crate) struct GlobHashStore {
+    dir: PathBuf,
+}
+
+impl GlobHashStore {
+    pub(crate) fn new(dir: PathBuf) -> Self {
+        Self { dir }
+    }
+
+    fn entry_path(&self, key: &GlobHashKey) -> PathBuf {
+        self.dir.join(format!("{:x}.json", key.digest()))
+    }
+
+    /// Returns the stored hash for `key` if none of the files it was computed from changed.
+    pub(crate) fn load(&self, key: &GlobHashKey) -> Option<GlobHash> {
+        let contents = fs_err::read(self.entry_path(key)).ok()?;
+        let stored: StoredGlobHash = serde_json::from_slice(&contents).ok()?;
+        if stored.version != STORE_VERSION || !stored.stamps.is_unchanged() {
+            return None;
+        }
+
+        rattler_digest::parse_digest_from_hex::<Sha256>(&stored.hash).map(GlobHash::from_hash)
+    }
+
+    /// Stores the hash for `key`. The file is replaced atomically, so concurrent processes never
+    /// read a partially written entry.
+    pub(crate) fn store(
+        &self,
+        key: &GlobHashKey,
+        hash: &Sha256Hash,
+        stamps: GlobHashStamps,
+    ) -> io::Result<()> {
+        let contents = serde_json::to_vec(&StoredGlobHash {
+            version: STORE_VERSION,
+            hash: format!("{hash:x}"),
+            stamps,
+        })?;
+
+        fs_err::create_dir_all(&self.dir)?;
+        let mut file = tempfile::NamedTempFile::new_in(&self.dir)?;
+        file.write_all(&contents)?;
+        file.persist(self.entry_path(key))
+            .map_err(|err| err.error)?;
+        Ok(())
+    }
+}
+
+#[cfg(test)]
+mod test {
+    use std::collections::BTreeSet;
+
+    use fs_err as fs;
+    use tempfile::tempdir;
+
+    use super::*;
+
+    fn make_old(path: &Path) {
+        let modified = SystemTime::now() - Duration::from_secs(60);
+        std::fs::File::options()
+            .read(true)
+            .open(path)
+            .unwrap()
+            .set_modified(modified)
+            .unwrap();
+    }
+
+    // Setting the modification time of a directory requires opening it, which only works on unix
+    #[cfg(unix)]
+    #[test]
+    fn stored_hash_is_invalidated_by_changes() {
+        let workspace = tempdir().unwrap();
+        let root = workspace.path();
+        fs::create_dir(root.join("src")).unwrap();
+        fs::write(root.join("src/lib.rs"), "fn main() {}").unwrap();
+        for path in [
+            root.join("src/lib.rs"),
+            root.join("src"),
+            root.to_path_buf(),
+        ] {
+            make_old(&path);
+        }
+
+        let store_dir = tempdir().unwrap();
+        let store = GlobHashStore::new(store_dir.path().to_path_buf());
+        let key = GlobHashKey::new(root, BTreeSet::from(["src/**".to_string()]), Vec::new());
+
+        let (hash, stamps) =
+            GlobHash::from_patterns_with_stamps(root, ["src/**"], Vec::new()).unwrap();
+        store.store(&key, &hash.hash, stamps.unwrap()).unwrap();
+        assert_eq!(store.load(&key).unwrap().hash, hash.hash);
+
+        // Adding a file changes the modification time of its directory
+        fs::write(root.join("src/new.rs"), "").unwrap();
+        assert!(store.load(&key).is_none());
+    }
+
+    #[cfg(unix)]
+    #[test]
+    fn stored_hash_is_invalidated_by_nested_changes() {
+        let workspace = tempdir().unwrap();
+        let root = workspace.path();
+        fs::create_dir_all(root.join("src/a/b")).unwrap();
+        fs::write(root.join("src/a/b/lib.rs"), "fn main() {}").unwrap();
+        for path in [
+            root.join("src/a/b/lib.rs"),
+            root.join("src/a/b"),
+            root.join("src/a"),
+            root.join("src"),
+            root.to_path_buf(),
+        ] {
+            make_old(&path);
+        }
+
+        let store_dir = tempdir().unwrap();
+        let store = GlobHashStore::new(store_dir.path().to_path_buf());
+        let key = GlobHashKey::new(root, BTreeSet::from(["src/**".to_string()]), Vec::new());
+
+        let (hash, stamps) =
+            GlobHash::from_patterns_with_stamps(root, ["src/**"], Vec::new()).unwrap();
+        store.store(&key, &hash.hash, stamps.unwrap()).unwrap();
+        assert_eq!(store.load(&key).unwrap().hash, hash.hash);
+
+        fs::write(root.join("src/a/b/new.rs"), "").unwrap();
+        assert!(store.load(&key).is_none());
+    }
+
+    #[cfg(unix)]
+    #[test]
+    fn stored_hash_is_invalidated_by_git_exclude() {
+        let workspace = tempdir().unwrap();
+        let root = workspace.path();
+        fs::create_dir_all(root.join(".git/info")).unwrap();
+        fs::create_dir(root.join("src")).unwrap();
+        fs::write(root.join("src/lib.rs"), "fn main() {}").unwrap();
+        fs::write(root.join("src/generated.rs"), "fn main() {}").unwrap();
+        for path in [
+            root.join("src/lib.rs"),
+            root.join("src/generated.rs"),
+            root.join("src"),
+            root.to_path_buf(),
+        ] {
+            make_old(&path);
+        }
+
+        let store_dir = tempdir().unwrap();
+        let store = GlobHashStore::new(store_dir.path().to_path_buf());
+        let key = GlobHashKey::new(root, BTreeSet::from(["src/**".to_string()]), Vec::new());
+
+        let (hash, stamps) =
+            GlobHash::from_patterns_with_stamps(root, ["src/**"], Vec::new()).unwrap();
+        store.store(&key, &hash.hash, stamps.unwrap()).unwrap();
+        assert_eq!(store.load(&key).unwrap().hash, hash.hash);
+
+        // Excluding a file doesn't touch any of the traversed directories
+        fs::write(root.join(".git/info/exclude"), "src/generated.rs\n").unwrap();
+        assert!(store.load(&key).is_none());
+    }
+
+    #[test]
+    fn recently_modified_files_are_not_stamped() {
+        let workspace = tempdir().unwrap();
+        fs::write(workspace.path().join("recent.txt"), "recent").unwrap();
+
+        let (_, stamps) =
+            GlobHash::from_patterns_with_stamps(workspace.path(), ["*.txt"], Vec::new()).unwrap();
+        assert!(stamps.is_none());
+    }
+}
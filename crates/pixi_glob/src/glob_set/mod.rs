@@ -57,6 +57,24 @@ impl GlobSet {
         let rebased = self.walk_roots.rebase(root_dir)?;
         walk::walk_globs(&rebased.root, &rebased.globs)
     }
+
+    /// Same as [`GlobSet::collect_matching`], but also returns the directories that were
+    /// traversed to find the matches. Files can only start or stop matching when one of these
+    /// directories changes.
+    pub(crate) fn collect_matching_and_dirs(
+        &self,
+        root_dir: &Path,
+    ) -> Result<(Vec<ignore::DirEntry>, Vec<ignore::DirEntry>), GlobSetError> {
+        if self.walk_roots.is_empty() {
+            return Ok((vec![], vec![]));
+        }
+
+        let rebased = self.walk_roots.rebase(root_dir)?;
+        let entries = walk::walk_globs_and_dirs(&rebased.root, &rebased.globs)?;
+        Ok(entries
+            .into_iter()
+            .partition(|entry| !entry.file_type().is_some_and(|ft| ft.is_dir())))
+    }
 }
 
 #[cfg(test)]
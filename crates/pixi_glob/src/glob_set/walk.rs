@@ -15,6 +15,8 @@ struct CollectBuilder {
     sink: SharedResults,
     // The root we are walking, used for error reporting
     err_root: PathBuf,
+    // Whether to also collect the directories that are traversed
+    keep_dirs: bool,
 }
 
 struct CollectVisitor {
@@ -24,6 +26,8 @@ struct CollectVisitor {
     sink: SharedResults,
     // The root we are walking, used for error reporting
     err_root: PathBuf,
+    // Whether to also collect the directories that are traversed
+    keep_dirs: bool,
 }
 
 impl Drop for CollectVisitor {
@@ -41,17 +45,18 @@ impl<'s> ignore::ParallelVisitorBuilder<'s> for CollectBuilder {
             local: Vec::new(),
             sink: Arc::clone(&self.sink),
             err_root: self.err_root.clone(),
+            keep_dirs: self.keep_dirs,
         })
     }
 }
 
 impl ignore::ParallelVisitor for CollectVisitor {
-    /// This function loops over all matches, ignores directories, and ignores PermissionDenied and
-    /// NotFound errors
+    /// This function loops over all matches, ignores directories unless `keep_dirs` is set, and
+    /// ignores PermissionDenied and NotFound errors
     fn visit(&mut self, dir_entry: Result<ignore::DirEntry, ignore::Error>) -> ignore::WalkState {
         match dir_entry {
             Ok(dir_entry) => {
-                if dir_entry.file_type().map(|ft| ft.is_dir()).unwrap_or(false) {
+                if !self.keep_dirs && dir_entry.file_type().map(|ft| ft.is_dir()).unwrap_or(false) {
                     return ignore::WalkState::Continue;
                 }
                 self.local.push(Ok(dir_entry));
@@ -78,6 +83,23 @@ impl ignore::ParallelVisitor for CollectVisitor {
 pub fn walk_globs(
     effective_walk_root: &Path,
     globs: &[SimpleGlob],
+) -> Result<Vec<ignore::DirEntry>, GlobSetError> {
+    walk_globs_impl(effective_walk_root, globs, false)
+}
+
+/// Walk over the globs in the specific root, the result also contains the directories that were
+/// traversed, including the root itself.
+pub fn walk_globs_and_dirs(
+    effective_walk_root: &Path,
+    globs: &[SimpleGlob],
+) -> Result<Vec<ignore::DirEntry>, GlobSetError> {
+    walk_globs_impl(effective_walk_root, globs, true)
+}
+
+fn walk_globs_impl(
+    effective_walk_root: &Path,
+    globs: &[SimpleGlob],
+    keep_dirs: bool,
 ) -> Result<Vec<ignore::DirEntry>, GlobSetError> {
     let mut ob = ignore::overrides::OverrideBuilder::new(effective_walk_root);
     let glob_patterns = globs
@@ -125,6 +147,7 @@ pub fn walk_globs(
     let mut builder = CollectBuilder {
         sink: Arc::clone(&collected),
         err_root: effective_walk_root.to_path_buf(),
+        keep_dirs,
     };
     walker_builder.visit(&mut builder);
 
@@ -4,6 +4,7 @@
 
 mod glob_hash;
 mod glob_hash_cache;
+mod glob_hash_store;
 mod glob_mtime;
 mod glob_set;
 
@@ -413,6 +413,23 @@ impl StateChanges {
         }
     }
 
+    /// Adds the removed packages to the updated environment of `env_name`,
+    /// if the environment was updated.
+    pub fn add_removed_packages(&mut self, env_name: &EnvironmentName, packages: Vec<PackageName>) {
+        let update = self
+            .changes
+            .get_mut(env_name)
+            .into_iter()
+            .flatten()
+            .find_map(|change| match change {
+                StateChange::UpdatedEnvironment(update) => Some(update),
+                _ => None,
+            });
+        if let Some(update) = update {
+            update.add_removed_packages(packages);
+        }
+    }
+
     #[cfg(test)]
     pub fn changes(self) -> HashMap<EnvironmentName, Vec<StateChange>> {
         self.changes
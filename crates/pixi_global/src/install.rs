@@ -115,6 +115,7 @@ pub(crate) async fn create_executable_trampolines(
 
     let path_diff = path_diff(&path_current, &path_after_activation, prefix)?;
 
+    let mut trampolines = Vec::with_capacity(mapped_executables.len());
     for ScriptExecMapping {
         global_script_path,
         original_executable,
@@ -181,8 +182,11 @@ pub(crate) async fn create_executable_trampolines(
             }
         };
 
-        let trampoline = Trampoline::new(exposed_name.clone(), parent_dir.to_path_buf(), metadata);
-        trampoline.save().await?;
+        trampolines.push(Trampoline::new(
+            exposed_name.clone(),
+            parent_dir.to_path_buf(),
+            metadata,
+        ));
 
         match changed {
             AddedOrChanged::Unchanged => {}
@@ -194,6 +198,10 @@ pub(crate) async fn create_executable_trampolines(
             }
         }
     }
+
+    // Write all trampolines at once, so the shared trampoline binary is only verified once
+    Trampoline::save_all(&trampolines).await?;
+
     Ok(state_changes)
 }
 
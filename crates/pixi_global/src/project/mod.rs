@@ -552,6 +552,40 @@ impl Project {
     pub async fn install_environment(
         &self,
         env_name: &EnvironmentName,
+    ) -> miette::Result<EnvironmentUpdate> {
+        let environment_update = self.solve_and_install_environment(env_name).await?;
+        self.command_dispatcher()?.clear_reporter().await;
+        Ok(environment_update)
+    }
+
+    /// Installs multiple environments concurrently.
+    ///
+    /// All environments are solved and installed through the same command
+    /// dispatcher, so the number of concurrent solves is bounded by its
+    /// [`Limits`] and the number of concurrent downloads by the configured
+    /// maximum. Returns the result for every environment in the order of
+    /// `env_names`.
+    pub async fn install_environments(
+        &self,
+        env_names: &[EnvironmentName],
+    ) -> Vec<miette::Result<EnvironmentUpdate>> {
+        let results = futures::future::join_all(
+            env_names
+                .iter()
+                .map(|env_name| self.solve_and_install_environment(env_name)),
+        )
+        .await;
+        if let Ok(command_dispatcher) = self.command_dispatcher() {
+            command_dispatcher.clear_reporter().await;
+        }
+        results
+    }
+
+    /// Solves and installs an environment without clearing the progress
+    /// reporter.
+    async fn solve_and_install_environment(
+        &self,
+        env_name: &EnvironmentName,
     ) -> miette::Result<EnvironmentUpdate> {
         let environment = self
             .environment(env_name)
@@ -627,8 +661,6 @@ impl Project {
             })
             .await?;
 
-        command_dispatcher.clear_reporter().await;
-
         let install_changes = get_install_changes(result.transaction);
         Ok(EnvironmentUpdate::new(install_changes, dependencies_names))
     }
@@ -1054,29 +1086,99 @@ impl Project {
         env_name: &EnvironmentName,
         removed_packages: Option<Vec<PackageName>>,
     ) -> miette::Result<StateChanges> {
-        let mut state_changes = StateChanges::new_with_env(env_name.clone());
-        if self.environment_in_sync(env_name).await? {
-            tracing::debug!(
-                "Environment {} specs already up to date with global manifest",
-                env_name.fancy_display()
-            );
-        } else {
-            tracing::debug!(
-                "Environment {} specs not up to date with global manifest",
-                env_name.fancy_display()
-            );
-            let mut environment_update = self.install_environment(env_name).await?;
+        let mut state_changes = self
+            .sync_environments(std::slice::from_ref(env_name))
+            .await
+            .pop()
+            .expect("there is a result for every environment")?;
 
-            if let Some(removed_packages) = removed_packages {
-                environment_update.add_removed_packages(removed_packages.to_vec());
-            };
+        if let Some(removed_packages) = removed_packages {
+            state_changes.add_removed_packages(env_name, removed_packages);
+        }
 
-            state_changes.insert_change(
-                env_name,
-                StateChange::UpdatedEnvironment(environment_update),
-            );
+        Ok(state_changes)
+    }
+
+    /// Syncs multiple parsed environments with the installation.
+    ///
+    /// First all environments are checked, then the ones that are out of sync
+    /// are solved and installed concurrently, see
+    /// [`Project::install_environments`]. Finally, the executables, shortcuts
+    /// and completions of every environment are synced one environment after
+    /// another, as they share the same directories. Returns the result for
+    /// every environment in the order of `env_names`.
+    pub async fn sync_environments(
+        &self,
+        env_names: &[EnvironmentName],
+    ) -> Vec<miette::Result<StateChanges>> {
+        let in_sync = futures::future::join_all(
+            env_names
+                .iter()
+                .map(|env_name| self.environment_in_sync(env_name)),
+        )
+        .await;
+
+        let mut results = Vec::with_capacity(env_names.len());
+        let mut to_install = Vec::new();
+        for (idx, (env_name, in_sync)) in env_names.iter().zip(in_sync).enumerate() {
+            match in_sync {
+                Ok(true) => tracing::debug!(
+                    "Environment {} specs already up to date with global manifest",
+                    env_name.fancy_display()
+                ),
+                Ok(false) => {
+                    tracing::debug!(
+                        "Environment {} specs not up to date with global manifest",
+                        env_name.fancy_display()
+                    );
+                    to_install.push(idx);
+                }
+                Err(err) => {
+                    results.push(Err(err));
+                    continue;
+                }
+            }
+            results.push(Ok(StateChanges::new_with_env(env_name.clone())));
+        }
+
+        let install_names = to_install
+            .iter()
+            .map(|&idx| env_names[idx].clone())
+            .collect_vec();
+        let updates = self.install_environments(&install_names).await;
+        for (idx, update) in to_install.into_iter().zip(updates) {
+            let env_name = &env_names[idx];
+            results[idx] = update.map(|environment_update| {
+                let mut state_changes = StateChanges::new_with_env(env_name.clone());
+                state_changes.insert_change(
+                    env_name,
+                    StateChange::UpdatedEnvironment(environment_update),
+                );
+                state_changes
+            });
         }
 
+        for (env_name, result) in env_names.iter().zip(results.iter_mut()) {
+            let Ok(state_changes) = result else {
+                continue;
+            };
+            match self.sync_environment_exposed(env_name).await {
+                Ok(exposed_changes) => *state_changes |= exposed_changes,
+                Err(err) => *result = Err(err),
+            }
+        }
+
+        results
+    }
+
+    /// Syncs the executables, shortcuts and completions of an installed
+    /// environment.
+    async fn sync_environment_exposed(
+        &self,
+        env_name: &EnvironmentName,
+    ) -> miette::Result<StateChanges> {
+        let mut state_changes = StateChanges::default();
+
         // Expose executables
         state_changes |= self.expose_executables_from_environment(env_name).await?;
 
@@ -1692,6 +1794,42 @@ mod tests {
         assert_eq!(remaining_dirs, vec!["env1", "env3", "non-conda-env-dir"]);
     }
 
+    #[tokio::test]
+    async fn test_sync_environments_reports_every_environment() {
+        let tempdir = tempdir().unwrap();
+        let project = Project::from_str(
+            &tempdir.path().join(consts::GLOBAL_MANIFEST_DEFAULT_NAME),
+            r#"
+            [envs.first]
+            channels = ["conda-forge"]
+
+            [envs.second]
+            channels = ["conda-forge"]
+            "#,
+            EnvRoot::new(tempdir.path().join("envs")).unwrap(),
+            BinDir::new(tempdir.path().join("bin")).unwrap(),
+        )
+        .unwrap();
+
+        // The environment in the middle is not part of the manifest, so it
+        // fails while the others are synced
+        let env_names: Vec<EnvironmentName> = ["first", "missing", "second"]
+            .into_iter()
+            .map(|name| name.parse().unwrap())
+            .collect();
+        let results = project.sync_environments(&env_names).await;
+
+        assert_eq!(results.len(), 3);
+        assert!(!results[0].as_ref().unwrap().has_changed());
+        let err = results[1].as_ref().unwrap_err();
+        assert!(err.to_string().contains("not found in manifest"), "{err}");
+        assert!(!results[2].as_ref().unwrap().has_changed());
+
+        // Syncing a single environment goes through the same path
+        assert!(project.sync_environment(&env_names[0], None).await.is_ok());
+        assert!(project.sync_environment(&env_names[1], None).await.is_err());
+    }
+
     #[test]
     fn test_convert_repodata_to_exposed_data() {
         let temp_dir = tempdir().unwrap();
@@ -15,14 +15,24 @@
 /// Later we use hardlinks to point to the
 /// original file as needed, reducing redundant data duplication.
 ///
+///
+/// ### Binary configuration
+///
+/// Next to the JSON configuration of each trampoline we store the same configuration in a compact
+/// binary format, so the trampoline doesn't have to parse JSON on every invocation. The binary
+/// configuration records the size and modification time of the JSON configuration, the
+/// trampoline falls back to the JSON configuration if it was modified since.
+///
 use std::{
     collections::HashMap,
     io::ErrorKind,
     path::{Path, PathBuf},
     str::FromStr,
     sync::LazyLock,
+    time::UNIX_EPOCH,
 };
 
+use itertools::Itertools;
 use miette::IntoDiagnostic;
 use pixi_utils::executable_from_path;
 use regex::Regex;
@@ -85,6 +95,8 @@ const TRAMPOLINE_BIN: &[u8] = include_bytes!(
 pub const TRAMPOLINE_CONFIGURATION: &str = "trampoline_configuration";
 // original trampoline binary name
 pub const TRAMPOLINE_BIN_NAME: &str = "trampoline_bin";
+// identifies the format of the binary configuration, and its version
+const BINARY_CONFIGURATION_MAGIC: &[u8; 8] = b"PXTRAMP1";
 
 /// Returns the file name of the executable
 pub(crate) fn file_name(exposed_name: &ExposedName) -> String {
@@ -131,6 +143,14 @@ pub(crate) async fn extract_executable_from_script(script: &Path) -> miette::Res
     )
 }
 
+/// Removes a file, it is not an error if the file doesn't exist.
+async fn remove_file_if_exists(path: PathBuf) -> std::io::Result<()> {
+    match tokio_fs::remove_file(path).await {
+        Err(err) if err.kind() == ErrorKind::NotFound => Ok(()),
+        result => result,
+    }
+}
+
 #[derive(Debug, thiserror::Error, miette::Diagnostic)]
 pub enum ConfigurationParseError {
     #[error("Failed to read configuration file at {0}")]
@@ -184,6 +204,41 @@ impl Configuration {
             .join(PathBuf::from(TRAMPOLINE_CONFIGURATION))
             .join(format!("{exposed_name}.json"))
     }
+
+    /// Encodes the configuration in the binary format that is read by the trampoline.
+    /// `json_metadata` is the metadata of the JSON configuration that was written for this
+    /// configuration. Returns `None` if the configuration can only be stored as JSON.
+    ///
+    /// All integers are little-endian and strings are prefixed with their length as `u32`. The
+    /// magic bytes are followed by the size (`u64`) and modification time (`u64` seconds and
+    /// `u32` nanoseconds) of the JSON configuration, the executable, the path diff, the number
+    /// of environment variables (`u32`) and the key and value of each environment variable.
+    pub fn to_binary(&self, json_metadata: &std::fs::Metadata) -> Option<Vec<u8>> {
+        let json_mtime = json_metadata
+            .modified()
+            .ok()?
+            .duration_since(UNIX_EPOCH)
+            .ok()?;
+
+        let mut bytes = BINARY_CONFIGURATION_MAGIC.to_vec();
+        bytes.extend_from_slice(&json_metadata.len().to_le_bytes());
+        bytes.extend_from_slice(&json_mtime.as_secs().to_le_bytes());
+        bytes.extend_from_slice(&json_mtime.subsec_nanos().to_le_bytes());
+
+        fn push_str(bytes: &mut Vec<u8>, value: &str) -> Option<()> {
+            bytes.extend_from_slice(&u32::try_from(value.len()).ok()?.to_le_bytes());
+            bytes.extend_from_slice(value.as_bytes());
+            Some(())
+        }
+        push_str(&mut bytes, self.exe.to_str()?)?;
+        push_str(&mut bytes, &self.path_diff)?;
+        bytes.extend_from_slice(&u32::try_from(self.env.len()).ok()?.to_le_bytes());
+        for (key, value) in &self.env {
+            push_str(&mut bytes, key)?;
+            push_str(&mut bytes, value)?;
+        }
+        Some(bytes)
+    }
 }
 
 /// Represents an exposed global executable installed by pixi global.
@@ -232,12 +287,14 @@ impl GlobalExecutable {
     pub async fn remove(&self) -> miette::Result<()> {
         match self {
             GlobalExecutable::Trampoline(trampoline) => {
-                let (trampoline_removed, manifest_removed) = tokio::join!(
+                let (trampoline_removed, manifest_removed, binary_manifest_removed) = tokio::join!(
                     tokio_fs::remove_file(trampoline.path()),
-                    tokio_fs::remove_file(trampoline.configuration())
+                    tokio_fs::remove_file(trampoline.configuration()),
+                    remove_file_if_exists(trampoline.binary_configuration())
                 );
                 trampoline_removed.into_diagnostic()?;
                 manifest_removed.into_diagnostic()?;
+                binary_manifest_removed.into_diagnostic()?;
             }
             GlobalExecutable::Script(script) => {
                 tokio_fs::remove_file(script).await.into_diagnostic()?;
@@ -307,6 +364,13 @@ impl Trampoline {
             .join(self.exposed_name.to_string() + ".json")
     }
 
+    /// Returns the path to the binary trampoline configuration
+    pub fn binary_configuration(&self) -> PathBuf {
+        self.root_path
+            .join(TRAMPOLINE_CONFIGURATION)
+            .join(self.exposed_name.to_string() + ".bin")
+    }
+
     /// Return the path to the original trampoline binary,
     /// from what all hardlinks are created.
     fn trampoline_path(&self) -> PathBuf {
@@ -338,13 +402,39 @@ impl Trampoline {
     }
 
     pub async fn save(&self) -> miette::Result<()> {
+        self.write_shared_trampoline().await?;
         let (trampoline, manifest) =
-            tokio::join!(self.write_trampoline(), self.write_configuration());
+            tokio::join!(self.link_trampoline(), self.write_configuration());
         trampoline?;
         manifest?;
         Ok(())
     }
 
+    /// Saves multiple trampolines at once.
+    ///
+    /// The shared trampoline binary of every root path is only verified, and
+    /// written if needed, once. Afterwards the trampolines and their
+    /// configurations are written concurrently.
+    pub async fn save_all(trampolines: &[Trampoline]) -> miette::Result<()> {
+        for trampoline in trampolines
+            .iter()
+            .unique_by(|trampoline| &trampoline.root_path)
+        {
+            trampoline.write_shared_trampoline().await?;
+        }
+
+        futures::future::try_join_all(trampolines.iter().map(|trampoline| async move {
+            let (link, configuration) = tokio::join!(
+                trampoline.link_trampoline(),
+                trampoline.write_configuration()
+            );
+            link?;
+            configuration
+        }))
+        .await?;
+        Ok(())
+    }
+
     /// Returns the decompressed trampoline binary
     pub fn decompressed_trampoline() -> &'static [u8] {
         // A static variable to hold the cached decompressed trampoline binary
@@ -356,7 +446,8 @@ impl Trampoline {
         &DECOMPRESSED_TRAMPOLINE_BIN
     }
 
-    async fn write_trampoline(&self) -> miette::Result<()> {
+    /// Writes the shared trampoline binary, if it is missing or outdated
+    async fn write_shared_trampoline(&self) -> miette::Result<()> {
         tokio_fs::create_dir_all(self.root_path.join(TRAMPOLINE_CONFIGURATION))
             .await
             .into_diagnostic()?;
@@ -377,6 +468,13 @@ impl Trampoline {
                 .into_diagnostic()?;
         }
 
+        Ok(())
+    }
+
+    /// Links the trampoline to the shared trampoline binary
+    async fn link_trampoline(&self) -> miette::Result<()> {
+        let trampoline_path = self.trampoline_path();
+
         // If the path doesn't exist yet, create a hard link to the shared trampoline binary
         // If creating a hard link doesn't succeed, try copying
         // Hard-linking might for example fail because the file-system enforces a maximum number of hard-links per file
@@ -417,6 +515,22 @@ impl Trampoline {
             .await
             .into_diagnostic()?;
 
+        // Write the binary configuration for the JSON configuration that was just written, or
+        // remove the outdated one if the configuration can't be stored in binary.
+        let json_metadata = tokio_fs::metadata(self.configuration())
+            .await
+            .into_diagnostic()?;
+        match self.configuration.to_binary(&json_metadata) {
+            Some(binary_configuration) => {
+                tokio_fs::write(self.binary_configuration(), binary_configuration)
+                    .await
+                    .into_diagnostic()?;
+            }
+            None => remove_file_if_exists(self.binary_configuration())
+                .await
+                .into_diagnostic()?,
+        }
+
         Ok(())
     }
 
@@ -522,4 +636,116 @@ mod tests {
         // Check if the metadata is the same
         assert_eq!(shared_metadata.len(), linked_metadata.len());
     }
+
+    // Test that the binary configuration is written for the JSON configuration
+    // and removed together with the trampoline
+    #[tokio::test]
+    async fn test_binary_configuration() {
+        use super::*;
+        use tempfile::tempdir;
+
+        let dir = tempdir().unwrap();
+        let trampoline = Trampoline::new(
+            ExposedName::from_str("test_binary").unwrap(),
+            dir.path().to_path_buf(),
+            Configuration::new(
+                dir.path().join("exe"),
+                String::from("/some/bin"),
+                HashMap::from([(String::from("KEY"), String::from("value"))]),
+            ),
+        );
+
+        trampoline.save().await.unwrap();
+
+        let json_metadata = tokio_fs::metadata(trampoline.configuration())
+            .await
+            .unwrap();
+        let binary_configuration = tokio_fs::read(trampoline.binary_configuration())
+            .await
+            .unwrap();
+        assert!(binary_configuration.starts_with(BINARY_CONFIGURATION_MAGIC));
+        assert_eq!(
+            Some(binary_configuration),
+            trampoline.configuration.to_binary(&json_metadata)
+        );
+
+        GlobalExecutable::Trampoline(trampoline.clone())
+            .remove()
+            .await
+            .unwrap();
+        assert!(!trampoline.binary_configuration().exists());
+    }
+
+    // Test that the encoder produces the fixture that the trampoline decodes in its own tests,
+    // so both implementations of the binary format agree
+    #[test]
+    fn test_binary_configuration_fixture() {
+        use super::*;
+        use std::time::Duration;
+        use tempfile::tempdir;
+
+        let dir = tempdir().unwrap();
+        let json = dir.path().join("python.json");
+        fs_err::write(
+            &json,
+            include_bytes!("../../../trampoline/tests/fixtures/binary_configuration.json"),
+        )
+        .unwrap();
+        std::fs::File::options()
+            .write(true)
+            .open(&json)
+            .unwrap()
+            .set_modified(UNIX_EPOCH + Duration::new(1_700_000_000, 123_456_700))
+            .unwrap();
+
+        let configuration = Configuration::new(
+            PathBuf::from("/opt/pixi/envs/test/bin/python"),
+            String::from("/opt/pixi/envs/test/bin"),
+            HashMap::from([(
+                String::from("CONDA_PREFIX"),
+                String::from("/opt/pixi/envs/test"),
+            )]),
+        );
+        assert_eq!(
+            configuration
+                .to_binary(&fs_err::metadata(&json).unwrap())
+                .unwrap(),
+            include_bytes!("../../../trampoline/tests/fixtures/binary_configuration.bin")
+        );
+    }
+
+    // Test that saving multiple trampolines at once writes all of them
+    #[tokio::test]
+    async fn test_save_all() {
+        use super::*;
+        use tempfile::tempdir;
+
+        let dir = tempdir().unwrap();
+        let trampolines = ["first", "second", "third"]
+            .into_iter()
+            .map(|name| {
+                Trampoline::new(
+                    ExposedName::from_str(name).unwrap(),
+                    dir.path().to_path_buf(),
+                    Configuration::new(
+                        dir.path().join(name),
+                        String::from("/some/bin"),
+                        HashMap::new(),
+                    ),
+                )
+            })
+            .collect::<Vec<_>>();
+
+        Trampoline::save_all(&trampolines).await.unwrap();
+
+        for trampoline in &trampolines {
+            assert!(Trampoline::is_trampoline(&trampoline.path()).await.unwrap());
+            assert_eq!(
+                Configuration::from_root_path(dir.path(), &trampoline.exposed_name)
+                    .await
+                    .unwrap(),
+                trampoline.configuration
+            );
+        }
+    }
 }
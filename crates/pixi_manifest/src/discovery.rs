@@ -255,6 +255,9 @@ impl WorkspaceDiscoverer {
     pub fn discover(
         self,
     ) -> Result<Option<WithWarnings<Manifests, WarningWithSource>>, WorkspaceDiscoveryError> {
+        let _span =
+            tracing::info_span!(target: consts::TIMINGS_TARGET, "manifest discovery").entered();
+
         #[derive(Clone)]
         enum SearchPath {
             Explicit(PathBuf),
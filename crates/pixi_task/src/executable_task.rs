@@ -7,7 +7,7 @@ use std::{
 };
 
 use deno_task_shell::{
-    ShellPipeWriter, ShellState, execute_with_pipes, parser::SequentialList, pipe,
+    KillSignal, ShellPipeWriter, ShellState, execute_with_pipes, parser::SequentialList, pipe,
 };
 use fs_err::tokio as tokio_fs;
 use itertools::Itertools;
@@ -25,8 +25,10 @@ use rattler_lock::LockFile;
 use thiserror::Error;
 use tokio::task::JoinHandle;
 
+use crate::shared_cache::SharedTaskCache;
 use crate::task_graph::{TaskGraph, TaskId};
-use crate::task_hash::{InputHashesError, NameHash, TaskCache, TaskHash};
+use crate::task_hash::{ComputationHash, InputHashesError, NameHash, TaskCache, TaskHash};
+use crate::{FileHashIndex, FileHashes, TaskOutputStore};
 
 /// Runs task in project.
 #[derive(Default, Debug)]
@@ -232,10 +234,13 @@ impl<'p> ExecutableTask<'p> {
     }
 
     /// Executes the task and capture its output.
+    ///
+    /// The task is stopped when a signal is sent through `kill_signal`.
     pub async fn execute_with_pipes(
         &self,
         command_env: &HashMap<OsString, OsString>,
         input: Option<&[u8]>,
+        kill_signal: Option<KillSignal>,
     ) -> Result<RunOutput, TaskExecutionError> {
         let Some(script) = self.as_deno_script()? else {
             return Ok(RunOutput {
@@ -258,7 +263,7 @@ impl<'p> ExecutableTask<'p> {
             command_env.clone(),
             cwd,
             Default::default(),
-            Default::default(),
+            kill_signal.unwrap_or_default(),
         );
         let code = execute_with_pipes(script, state, stdin, stdout, stderr).await;
         Ok(RunOutput {
@@ -365,7 +370,7 @@ impl<'p> ExecutableTask<'p> {
     pub async fn can_skip(&self, lock_file: &LockFile) -> Result<CanSkip, std::io::Error> {
         tracing::info!("Checking if task can be skipped");
         let args_hash = TaskHash::task_args_hash(self).unwrap_or_default();
-        let cache_name = self.cache_name(args_hash);
+        let cache_name = self.cache_name(args_hash.clone());
         let cache_file = self.project().task_cache_folder().join(cache_name);
         if cache_file.exists() {
             let cache = tokio_fs::read_to_string(&cache_file).await?;
@@ -373,21 +378,136 @@ impl<'p> ExecutableTask<'p> {
             let hash = TaskHash::from_task(self, lock_file).await;
             if let Ok(Some(hash)) = hash {
                 if hash.computation_hash() != cache.hash {
-                    return Ok(CanSkip::No(Some(hash)));
+                    return Ok(self.restore_outputs(hash, args_hash, lock_file).await);
                 } else {
+                    // The task doesn't run, so this is the last time the index is used
+                    self.save_file_hash_index();
                     return Ok(CanSkip::Yes);
                 }
             }
+        } else if self.caches_outputs() {
+            // The outputs may still be stored, even if the task never ran in this workspace
+            if let Ok(Some(hash)) = TaskHash::from_task(self, lock_file).await {
+                return Ok(self.restore_outputs(hash, args_hash, lock_file).await);
+            }
         }
         Ok(CanSkip::No(None))
     }
 
+    /// Whether the outputs of the task are kept in the [`TaskOutputStore`]. This requires
+    /// inputs, otherwise there is nothing that determines the outputs.
+    pub(crate) fn caches_outputs(&self) -> bool {
+        matches!(
+            self.task().as_execute(),
+            Ok(execute) if execute.inputs.is_some() && execute.outputs.is_some()
+        )
+    }
+
+    /// Restores the outputs of the task from the [`TaskOutputStore`] if they were stored for
+    /// the current inputs. Returns `CanSkip::Yes` if the outputs were restored.
+    async fn restore_outputs(
+        &self,
+        hash: TaskHash,
+        args_hash: Option<NameHash>,
+        lock_file: &LockFile,
+    ) -> CanSkip {
+        if !self.caches_outputs() || hash.inputs.is_none() {
+            return CanSkip::No(Some(hash));
+        }
+        let Ok(store) = TaskOutputStore::from_cache_dir() else {
+            return CanSkip::No(Some(hash));
+        };
+
+        let key = hash.output_cache_key(args_hash.as_ref());
+        if !store.contains(&key) {
+            self.pull_outputs(&key, &store).await;
+        }
+        let current = hash.outputs.as_ref().map(|outputs| FileHashes {
+            files: outputs.files.files.clone(),
+        });
+        let workspace_root = self.project().root().to_owned();
+        let restored =
+            spawn_blocking_io(move || store.restore(&workspace_root, &key, current.as_ref())).await;
+        match restored {
+            Ok(Some(restored)) => {
+                tracing::info!(
+                    "Restored {restored} output file(s) of task '{}' from the cache",
+                    self.name().unwrap_or_default()
+                );
+                // Store the hash of the restored state, so the next run is a regular cache hit
+                if let Ok(Some(hash)) = TaskHash::from_task(self, lock_file).await {
+                    if let Err(err) = self.save_cache(Some(hash)).await {
+                        tracing::warn!("failed to update the task cache: {err}");
+                    }
+                }
+                CanSkip::Yes
+            }
+            Ok(None) => CanSkip::No(Some(hash)),
+            Err(err) => {
+                tracing::warn!(
+                    "failed to restore the outputs of task '{}' from the cache: {err}",
+                    self.name().unwrap_or_default()
+                );
+                CanSkip::No(Some(hash))
+            }
+        }
+    }
+
+    /// Downloads the outputs stored for `key` from the shared task cache into the local store,
+    /// if a shared task cache is configured.
+    async fn pull_outputs(&self, key: &ComputationHash, store: &TaskOutputStore) {
+        let Ok(Some(shared)) = SharedTaskCache::from_workspace(self.project()) else {
+            return;
+        };
+        if let Err(err) = shared.backend.pull(key, store).await {
+            tracing::warn!(
+                "failed to download the outputs of task '{}' from the shared task cache: {err}",
+                self.name().unwrap_or_default()
+            );
+        }
+    }
+
+    /// Uploads the outputs stored for `key` in the local store to the shared task cache, if one
+    /// is configured and pushing is enabled.
+    async fn push_outputs(&self, key: &ComputationHash, store: &TaskOutputStore) {
+        let shared = match SharedTaskCache::from_workspace(self.project()) {
+            Ok(Some(shared)) if shared.push => shared,
+            Ok(_) => return,
+            Err(err) => {
+                tracing::warn!("failed to configure the shared task cache: {err}");
+                return;
+            }
+        };
+        if let Err(err) = shared.backend.push(key, store).await {
+            tracing::warn!(
+                "failed to upload the outputs of task '{}' to the shared task cache: {err}",
+                self.name().unwrap_or_default()
+            );
+        }
+    }
+
+    /// Writes the [`FileHashIndex`] of the workspace to disk. This happens once per task run,
+    /// after the last files of the task were hashed.
+    fn save_file_hash_index(&self) {
+        let index = FileHashIndex::for_task_cache(&self.project().task_cache_folder());
+        // The index only speeds up the next run, so failing to write it is not an error
+        if let Err(err) = index.save() {
+            tracing::debug!("failed to save the file hash index: {err}");
+        }
+    }
+
     /// Saves the cache of the task using the provided post-run hash.
     /// If the task has no inputs or outputs (hash is None), it will not save the cache.
     pub async fn save_cache(
         &self,
         post_run_hash: Option<TaskHash>,
     ) -> Result<(), CacheUpdateError> {
+        let result = self.write_cache(post_run_hash).await;
+        self.save_file_hash_index();
+        result
+    }
+
+    async fn write_cache(&self, post_run_hash: Option<TaskHash>) -> Result<(), CacheUpdateError> {
         let execute = if let Ok(task) = self.task().as_execute() {
             task
         } else {
@@ -397,7 +517,7 @@ impl<'p> ExecutableTask<'p> {
 
         let task_cache_folder = self.project().task_cache_folder();
         let args_cache = TaskHash::task_args_hash(self)?;
-        let cache_file = task_cache_folder.join(self.cache_name(args_cache));
+        let cache_file = task_cache_folder.join(self.cache_name(args_cache.clone()));
 
         // Use the post-run hash provided by the caller
         let new_hash = match post_run_hash {
@@ -412,6 +532,31 @@ impl<'p> ExecutableTask<'p> {
             return Ok(());
         }
 
+        // Keep the outputs, so they can be restored when they are removed from the workspace
+        if self.caches_outputs() && new_hash.inputs.is_some() {
+            if let Some(outputs) = &new_hash.outputs {
+                let key = new_hash.output_cache_key(args_cache.as_ref());
+                if let Ok(store) = TaskOutputStore::from_cache_dir() {
+                    let workspace_root = self.project().root().to_owned();
+                    let files = FileHashes {
+                        files: outputs.files.files.clone(),
+                    };
+                    let (store_store, store_key) = (store.clone(), key.clone());
+                    let stored = spawn_blocking_io(move || {
+                        store_store.store(&workspace_root, &store_key, &files)
+                    })
+                    .await;
+                    match stored {
+                        Ok(()) => self.push_outputs(&key, &store).await,
+                        Err(err) => tracing::warn!(
+                            "failed to store the outputs of task '{}' in the cache: {err}",
+                            self.name().unwrap_or_default()
+                        ),
+                    }
+                }
+            }
+        }
+
         tokio::fs::create_dir_all(&task_cache_folder).await?;
         let cache = TaskCache {
             hash: new_hash.computation_hash(),
@@ -421,6 +566,19 @@ impl<'p> ExecutableTask<'p> {
     }
 }
 
+/// Runs file system work of the [`TaskOutputStore`] on the blocking thread pool, copying large
+/// outputs would otherwise stall the async runtime.
+async fn spawn_blocking_io<T: Send + 'static>(
+    f: impl FnOnce() -> std::io::Result<T> + Send + 'static,
+) -> std::io::Result<T> {
+    tokio::task::spawn_blocking(f)
+        .await
+        .unwrap_or_else(|err| match err.try_into_panic() {
+            Ok(panic) => std::panic::resume_unwind(panic),
+            Err(_) => Err(std::io::Error::other("the operation was cancelled")),
+        })
+}
+
 /// A helper object that implements [`Display`] to display (with ascii color)
 /// the command of the task.
 struct ExecutableTaskConsoleDisplay<'p, 't> {
@@ -492,7 +650,7 @@ pub async fn get_task_env(
     clean_env: bool,
     lock_file: Option<&LockFile>,
     force_activate: bool,
-    experimental_cache: bool,
+    use_activation_cache: bool,
 ) -> miette::Result<HashMap<String, String>> {
     // Get environment variables from the activation
     let env_var_behavior = if clean_env {
@@ -507,7 +665,7 @@ pub async fn get_task_env(
             env_var_behavior,
             lock_file,
             force_activate,
-            experimental_cache,
+            use_activation_cache,
         )
     })
     .await
@@ -0,0 +1,294 @@
+//! A persistent index that maps the metadata of a file to the hash of its contents.
+//!
+//! Computing the hashes of the inputs and outputs of a task requires reading every file that
+//! matches the globs of the task, even if nothing changed since the last time the task ran. The
+//! [`FileHashIndex`] stores the size, modification time and inode of every file that was hashed,
+//! so [`crate::FileHashes`] only has to read the files whose metadata changed.
+//!
+//! Entries of files that were not hashed by this process and that were removed or changed since
+//! they were indexed are dropped when the index is saved, so the index doesn't grow without
+//! bound.
+//!
+//! Set `PIXI_TASK_CACHE_STRICT=1` to ignore the index and hash all files again, the index is
+//! still updated with the results.
+
+use std::{
+    collections::{HashMap, HashSet},
+    fs::Metadata,
+    path::{Path, PathBuf},
+    sync::{
+        Arc, LazyLock, Mutex, RwLock,
+        atomic::{AtomicBool, Ordering},
+    },
+    time::{Duration, SystemTime, UNIX_EPOCH},
+};
+
+use serde::{Deserialize, Serialize};
+
+/// The name of the file in the task cache folder that stores the index.
+const INDEX_FILE_NAME: &str = "file-hash-index.json";
+
+/// The version of the index format, an index with another version is discarded.
+const INDEX_VERSION: u32 = 1;
+
+/// Files modified less than this long ago are not added to the index. Their modification time
+/// could still change without any visible difference, e.g. on file systems with a coarse
+/// timestamp resolution, so their contents are always hashed.
+const RACY_MODIFICATION_WINDOW: Duration = Duration::from_secs(2);
+
+/// The indices that were loaded by this process, by the path of their file.
+static LOADED_INDICES: LazyLock<Mutex<HashMap<PathBuf, Arc<FileHashIndex>>>> =
+    LazyLock::new(Default::default);
+
+/// The metadata of a file that decides whether its contents have to be hashed again.
+#[derive(Debug, Clone, Copy, PartialEq, Eq, Serialize, Deserialize)]
+pub(crate) struct FileStamp {
+    size: u64,
+    mtime_secs: u64,
+    mtime_nanos: u32,
+    inode: u64,
+}
+
+impl FileStamp {
+    /// Returns the stamp of a file, or `None` if the stamp is too recent to be trusted.
+    pub(crate) fn from_metadata(metadata: &Metadata) -> Option<Self> {
+        let modified = metadata.modified().ok()?;
+        let age = SystemTime::now().duration_since(modified).ok()?;
+        if age < RACY_MODIFICATION_WINDOW {
+            return None;
+        }
+        let mtime = modified.duration_since(UNIX_EPOCH).ok()?;
+
+        #[cfg(unix)]
+        let inode = std::os::unix::fs::MetadataExt::ino(metadata);
+        #[cfg(not(unix))]
+        let inode = 0;
+
+        Some(Self {
+            size: metadata.len(),
+            mtime_secs: mtime.as_secs(),
+            mtime_nanos: mtime.subsec_nanos(),
+            inode,
+        })
+    }
+}
+
+#[derive(Debug, Clone, Serialize, Deserialize)]
+struct IndexEntry {
+    #[serde(flatten)]
+    stamp: FileStamp,
+    hash: String,
+}
+
+#[derive(Debug, Default, Serialize, Deserialize)]
+struct IndexFile {
+    version: u32,
+    files: HashMap<PathBuf, IndexEntry>,
+}
+
+/// A persistent map from the path and [`FileStamp`] of a file to the hash of its contents.
+///
+/// It is safe to use this object from multiple threads.
+#[derive(Debug, Default)]
+pub struct FileHashIndex {
+    /// The file the index is stored in, `None` for an index that is never written.
+    path: Option<PathBuf>,
+
+    /// Whether to ignore the stored hashes and hash every file again.
+    strict: bool,
+
+    files: RwLock<HashMap<PathBuf, IndexEntry>>,
+
+    /// The paths that were looked up or inserted by this process, their entries are always kept.
+    seen: Mutex<HashSet<PathBuf>>,
+
+    /// Set when `files` changed since it was loaded or saved.
+    modified: AtomicBool,
+}
+
+impl FileHashIndex {
+    /// Returns the index stored in the given task cache folder. The index is only read from
+    /// disk once per process, later calls return the same instance.
+    pub fn for_task_cache(task_cache_folder: &Path) -> Arc<Self> {
+        let path = task_cache_folder.join(INDEX_FILE_NAME);
+        let mut loaded = LOADED_INDICES.lock().unwrap_or_else(|err| err.into_inner());
+        loaded
+            .entry(path.clone())
+            .or_insert_with(|| Arc::new(Self::load(path)))
+            .clone()
+    }
+
+    /// Reads the index from the given file. A missing or unreadable index results in an empty
+    /// index, which is written to the file on [`FileHashIndex::save`].
+    pub fn load(path: PathBuf) -> Self {
+        let files = match fs_err::read(&path) {
+            Ok(contents) => match serde_json::from_slice::<IndexFile>(&contents) {
+                Ok(index) if index.version == INDEX_VERSION => index.files,
+                Ok(_) => HashMap::new(),
+                Err(err) => {
+                    tracing::debug!("discarding file hash index {}: {err}", path.display());
+                    HashMap::new()
+                }
+            },
+            Err(_) => HashMap::new(),
+        };
+
+        Self {
+            path: Some(path),
+            strict: matches!(
+                std::env::var("PIXI_TASK_CACHE_STRICT").as_deref(),
+                Ok("1" | "true")
+            ),
+            files: RwLock::new(files),
+            seen: Mutex::default(),
+            modified: AtomicBool::new(false),
+        }
+    }
+
+    /// Returns the hash of the file at `path`, if it was hashed before with the same stamp.
+    pub(crate) fn get(&self, path: &Path, stamp: &FileStamp) -> Option<String> {
+        self.mark_seen(path.to_owned());
+        if self.strict {
+            return None;
+        }
+        let files = self.files.read().unwrap_or_else(|err| err.into_inner());
+        files
+            .get(path)
+            .filter(|entry| entry.stamp == *stamp)
+            .map(|entry| entry.hash.clone())
+    }
+
+    /// Records the hash of the file at `path`.
+    pub(crate) fn insert(&self, path: PathBuf, stamp: FileStamp, hash: String) {
+        self.mark_seen(path.clone());
+        let mut files = self.files.write().unwrap_or_else(|err| err.into_inner());
+        let previous = files.insert(path, IndexEntry { stamp, hash });
+        if previous.is_none_or(|previous| previous.stamp != stamp) {
+            self.modified.store(true, Ordering::Relaxed);
+        }
+    }
+
+    fn mark_seen(&self, path: PathBuf) {
+        let mut seen = self.seen.lock().unwrap_or_else(|err| err.into_inner());
+        seen.insert(path);
+    }
+
+    /// Removes the entries of files that were not seen by this process and that no longer exist
+    /// or changed since they were indexed. Returns whether any entry was removed.
+    fn prune(&self) -> bool {
+        let seen = self.seen.lock().unwrap_or_else(|err| err.into_inner());
+        let mut files = self.files.write().unwrap_or_else(|err| err.into_inner());
+        let len = files.len();
+        files.retain(|path, entry| {
+            seen.contains(path)
+                || std::fs::metadata(path)
+                    .ok()
+                    .and_then(|metadata| FileStamp::from_metadata(&metadata))
+                    == Some(entry.stamp)
+        });
+        files.len() != len
+    }
+
+    /// Writes the index to disk if it changed, after dropping the entries of stale files. The
+    /// file is replaced atomically, so concurrent processes never read a partially written
+    /// index.
+    pub fn save(&self) -> std::io::Result<()> {
+        let Some(path) = &self.path else {
+            return Ok(());
+        };
+        let pruned = self.prune();
+        if !self.modified.swap(false, Ordering::Relaxed) && !pruned {
+            return Ok(());
+        }
+
+        let contents = {
+            let files = self.files.read().unwrap_or_else(|err| err.into_inner());
+            serde_json::to_vec(&IndexFile {
+                version: INDEX_VERSION,
+                files: files.clone(),
+            })?
+        };
+
+        let folder = path.parent().expect("the index is stored in a folder");
+        fs_err::create_dir_all(folder)?;
+        let mut file = tempfile::NamedTempFile::new_in(folder)?;
+        std::io::Write::write_all(&mut file, &contents)?;
+        file.persist(path).map_err(|err| err.error)?;
+        Ok(())
+    }
+}
+
+#[cfg(test)]
+mod test {
+    use super::*;
+    use tempfile::tempdir;
+
+    fn old_file(path: &Path, contents: &str) -> Metadata {
+        fs_err::write(path, contents).unwrap();
+        std::fs::File::options()
+            .write(true)
+            .open(path)
+            .unwrap()
+            .set_modified(SystemTime::now() - Duration::from_secs(60))
+            .unwrap();
+        fs_err::metadata(path).unwrap()
+    }
+
+    #[test]
+    fn recent_files_are_not_indexed() {
+        let dir = tempdir().unwrap();
+        let path = dir.path().join("recent.txt");
+        fs_err::write(&path, "recent").unwrap();
+
+        assert!(FileStamp::from_metadata(&fs_err::metadata(&path).unwrap()).is_none());
+    }
+
+    #[test]
+    fn index_round_trip() {
+        let dir = tempdir().unwrap();
+        let file = dir.path().join("input.txt");
+        let stamp = FileStamp::from_metadata(&old_file(&file, "input")).unwrap();
+
+        let index = FileHashIndex::load(dir.path().join(INDEX_FILE_NAME));
+        assert_eq!(index.get(&file, &stamp), None);
+        index.insert(file.clone(), stamp, "abc".to_string());
+        index.save().unwrap();
+
+        let index = FileHashIndex::load(dir.path().join(INDEX_FILE_NAME));
+        assert_eq!(index.get(&file, &stamp).as_deref(), Some("abc"));
+
+        // Changing the file invalidates the entry
+        let changed = FileStamp::from_metadata(&old_file(&file, "changed input")).unwrap();
+        assert_eq!(index.get(&file, &changed), None);
+    }
+
+    #[test]
+    fn stale_entries_are_pruned() {
+        let dir = tempdir().unwrap();
+        let kept = dir.path().join("kept.txt");
+        let removed = dir.path().join("removed.txt");
+        let changed = dir.path().join("changed.txt");
+        let index_path = dir.path().join(INDEX_FILE_NAME);
+
+        let index = FileHashIndex::load(index_path.clone());
+        for (path, contents) in [
+            (&kept, "kept"),
+            (&removed, "removed"),
+            (&changed, "changed"),
+        ] {
+            let stamp = FileStamp::from_metadata(&old_file(path, contents)).unwrap();
+            index.insert(path.clone(), stamp, contents.to_string());
+        }
+        index.save().unwrap();
+
+        // A new process that doesn't look at any of the files
+        fs_err::remove_file(&removed).unwrap();
+        old_file(&changed, "changed contents");
+        let index = FileHashIndex::load(index_path.clone());
+        index.save().unwrap();
+
+        let index = FileHashIndex::load(index_path);
+        let files = index.files.read().unwrap();
+        assert_eq!(files.keys().collect::<Vec<_>>(), vec![&kept]);
+    }
+}
@@ -5,7 +5,8 @@
 //! files that are ignored by git will also be ignored by logic defined in this module.
 //!
 //! The main entry-point to compute the hashes of all files in a directory is the
-//! [`FileHashes::from_files`] method.
+//! [`FileHashes::from_files`] method, [`FileHashes::from_files_with_index`] additionally skips
+//! reading files whose metadata didn't change since they were last hashed.
 
 use itertools::Itertools;
 use pixi_glob::{GlobSet, GlobSetError};
@@ -26,6 +27,8 @@ use tokio::task::JoinError;
 use uv_configuration::RAYON_INITIALIZE;
 use xxhash_rust::xxh3::Xxh3;
 
+use crate::{FileHashIndex, file_hash_index::FileStamp};
+
 #[derive(Debug, Error)]
 pub enum FileHashesError {
     #[error(transparent)]
@@ -70,6 +73,25 @@ impl FileHashes {
     pub async fn from_files(
         root: &Path,
         filters: impl IntoIterator<Item = impl AsRef<str>>,
+    ) -> Result<Self, FileHashesError> {
+        Self::from_files_impl(root, filters, None).await
+    }
+
+    /// Same as [`FileHashes::from_files`], but reuses the hashes stored in the `index` for files
+    /// whose size, modification time and inode didn't change. Newly computed hashes are added to
+    /// the index, the caller is responsible for saving it.
+    pub async fn from_files_with_index(
+        root: &Path,
+        filters: impl IntoIterator<Item = impl AsRef<str>>,
+        index: &FileHashIndex,
+    ) -> Result<Self, FileHashesError> {
+        Self::from_files_impl(root, filters, Some(index)).await
+    }
+
+    async fn from_files_impl(
+        root: &Path,
+        filters: impl IntoIterator<Item = impl AsRef<str>>,
+        index: Option<&FileHashIndex>,
     ) -> Result<Self, FileHashesError> {
         // If the root is not a directory or does not exist, return an empty map.
         if !root.is_dir() {
@@ -118,7 +140,7 @@ impl FileHashes {
                     // Skip directories
                     return;
                 } else {
-                    compute_file_hash(entry.path()).map(|hash| {
+                    compute_indexed_file_hash(entry.path(), index).map(|hash| {
                         let path = entry
                             .path()
                             .strip_prefix(&*collect_root)
@@ -143,6 +165,30 @@ impl FileHashes {
     }
 }
 
+/// Returns the hash of a file from the index if its metadata didn't change, otherwise computes
+/// the hash and adds it to the index.
+fn compute_indexed_file_hash(
+    path: &Path,
+    index: Option<&FileHashIndex>,
+) -> Result<String, FileHashesError> {
+    let Some(index) = index else {
+        return compute_file_hash(path);
+    };
+
+    let stamp = std::fs::metadata(path)
+        .ok()
+        .and_then(|metadata| FileStamp::from_metadata(&metadata));
+    if let Some(hash) = stamp.as_ref().and_then(|stamp| index.get(path, stamp)) {
+        return Ok(hash);
+    }
+
+    let hash = compute_file_hash(path)?;
+    if let Some(stamp) = stamp {
+        index.insert(path.to_owned(), stamp, hash.clone());
+    }
+    Ok(hash)
+}
+
 /// Computes the xxh3 hash of a file.
 fn compute_file_hash(path: &Path) -> Result<String, FileHashesError> {
     let mut file =
@@ -252,4 +298,36 @@ mod test {
 
         assert!(hashes.files.contains_key(Path::new("src/lib.rs")));
     }
+
+    #[tokio::test]
+    async fn reuse_indexed_hashes() {
+        let target_dir = tempdir().unwrap();
+        let path = target_dir.path().join("input.txt");
+        write(&path, "input").unwrap();
+        std::fs::File::options()
+            .write(true)
+            .open(&path)
+            .unwrap()
+            .set_modified(std::time::SystemTime::now() - std::time::Duration::from_secs(60))
+            .unwrap();
+
+        let index = FileHashIndex::load(target_dir.path().join("index.json"));
+        let hashes = FileHashes::from_files_with_index(target_dir.path(), ["*.txt"], &index)
+            .await
+            .unwrap();
+        let hash = hashes.files.get(Path::new("input.txt")).unwrap().clone();
+
+        // Files with the same metadata are not read again, so a changed entry in the index is
+        // returned as is.
+        let stamp = FileStamp::from_metadata(&std::fs::metadata(&path).unwrap()).unwrap();
+        assert_eq!(index.get(&path, &stamp), Some(hash));
+        index.insert(path.clone(), stamp, "indexed".to_string());
+        let hashes = FileHashes::from_files_with_index(target_dir.path(), ["*.txt"], &index)
+            .await
+            .unwrap();
+        assert_matches!(
+            hashes.files.get(Path::new("input.txt")).map(String::as_str),
+            Some("indexed")
+        );
+    }
 }
@@ -1,12 +1,21 @@
 mod error;
 mod executable_task;
+mod file_hash_index;
 mod file_hashes;
+mod output_store;
+mod shared_cache;
 mod task_environment;
 mod task_graph;
 mod task_hash;
 
+pub use file_hash_index::FileHashIndex;
 pub use file_hashes::{FileHashes, FileHashesError};
+pub use output_store::TaskOutputStore;
 pub use pixi_manifest::{Task, TaskName};
+pub use shared_cache::{
+    DirectoryTaskCache, HttpTaskCache, SharedTaskCache, SharedTaskCacheError, TaskCacheBackend,
+    prefetch_task_outputs,
+};
 pub use task_hash::{ComputationHash, InputHashes, TaskHash};
 
 pub use executable_task::{
@@ -0,0 +1,417 @@
+//! A content-addressed store for the outputs of tasks, shared by all workspaces on the machine.
+//!
+//! After a task ran, its declared outputs are copied into the store, keyed by the hash of the
+//! command, inputs and environment of the task (see [`TaskHash::output_cache_key`]). When the
+//! same task is about to run again with the same inputs but its outputs are gone or changed,
+//! e.g. after switching branches or running `git clean`, the outputs are restored from the store
+//! instead of running the task.
+//!
+//! The store consists of two folders:
+//!
+//! - `objects` contains the contents of output files, named after their xxh3 hash.
+//! - `entries` contains a json file per output cache key that maps the paths of the outputs,
+//!   relative to the workspace root, to their hash. Entries also record which outputs are
+//!   executable, objects are always stored with the same permissions.
+//!
+//! Files are copied with reflinks where the file system supports it, which makes storing and
+//! restoring outputs practically free. Hardlinks are deliberately not used, tasks and users may
+//! modify restored outputs in place which would corrupt the store.
+//!
+//! The store is never pruned automatically, every distinct set of inputs adds an entry and the
+//! objects it refers to. `pixi clean cache --tasks` removes the whole store.
+
+use std::{
+    collections::{BTreeMap, BTreeSet},
+    io::Write,
+    path::{Component, Path, PathBuf},
+};
+
+use pixi_consts::consts;
+use serde::{Deserialize, Serialize};
+use tempfile::{NamedTempFile, TempPath};
+
+use crate::{ComputationHash, FileHashes};
+
+/// The outputs of a single task run.
+#[derive(Debug, Default, Serialize, Deserialize)]
+pub(crate) struct OutputEntry {
+    /// The hashes of the output files by their path relative to the workspace root.
+    pub(crate) files: BTreeMap<PathBuf, String>,
+
+    /// The paths of the output files that are executable.
+    #[serde(default, skip_serializing_if = "BTreeSet::is_empty")]
+    pub(crate) executables: BTreeSet<PathBuf>,
+}
+
+impl OutputEntry {
+    /// Checks that the entry only refers to paths inside the workspace and to valid object
+    /// names. Entries can come from a shared task cache, so they are checked before their paths
+    /// or hashes are used to access the file system.
+    pub(crate) fn validate(&self) -> std::io::Result<()> {
+        let invalid =
+            |message: String| std::io::Error::new(std::io::ErrorKind::InvalidData, message);
+        for (path, hash) in &self.files {
+            if !is_normalized_relative_path(path) {
+                return Err(invalid(format!(
+                    "invalid output path '{}' in task output entry",
+                    path.display()
+                )));
+            }
+            if !is_valid_object_hash(hash) {
+                return Err(invalid(format!(
+                    "invalid object hash '{hash}' in task output entry"
+                )));
+            }
+        }
+        if let Some(path) = self
+            .executables
+            .iter()
+            .find(|path| !self.files.contains_key(*path))
+        {
+            return Err(invalid(format!(
+                "unknown executable output '{}' in task output entry",
+                path.display()
+            )));
+        }
+        Ok(())
+    }
+}
+
+/// A content-addressed store for the outputs of tasks.
+#[derive(Debug, Clone)]
+pub struct TaskOutputStore {
+    root: PathBuf,
+}
+
+impl TaskOutputStore {
+    /// Creates a store in the given folder.
+    pub fn new(root: impl Into<PathBuf>) -> Self {
+        Self { root: root.into() }
+    }
+
+    /// Returns the store in the pixi cache directory.
+    pub fn from_cache_dir() -> miette::Result<Self> {
+        Ok(Self::new(
+            pixi_config::get_cache_dir()?.join(consts::TASK_OUTPUT_CACHE_DIR),
+        ))
+    }
+
+    pub(crate) fn object_path(&self, hash: &str) -> PathBuf {
+        self.root.join(object_relative_path(hash))
+    }
+
+    pub(crate) fn entry_path(&self, key: &ComputationHash) -> PathBuf {
+        self.root.join(entry_relative_path(key))
+    }
+
+    /// Returns true if outputs are stored for `key`.
+    pub fn contains(&self, key: &ComputationHash) -> bool {
+        self.entry_path(key).is_file()
+    }
+
+    /// Reads the entry stored for `key`, an unreadable entry is treated as missing. Returns an
+    /// error if the entry refers to paths outside of the workspace or to invalid objects.
+    pub(crate) fn read_entry(&self, key: &ComputationHash) -> std::io::Result<Option<OutputEntry>> {
+        let entry = match fs_err::read(self.entry_path(key)) {
+            Ok(contents) => serde_json::from_slice::<OutputEntry>(&contents).ok(),
+            Err(err) if err.kind() == std::io::ErrorKind::NotFound => None,
+            Err(err) => return Err(err),
+        };
+        if let Some(entry) = &entry {
+            entry.validate()?;
+        }
+        Ok(entry)
+    }
+
+    /// Writes the entry for `key`. This should happen after all its objects are stored, so an
+    /// entry never refers to missing objects.
+    pub(crate) fn write_entry(
+        &self,
+        key: &ComputationHash,
+        entry: &OutputEntry,
+    ) -> std::io::Result<()> {
+        let entry_path = self.entry_path(key);
+        let folder = entry_path.parent().expect("entries are stored in a folder");
+        fs_err::create_dir_all(folder)?;
+        let mut file = tempfile::NamedTempFile::new_in(folder)?;
+        file.write_all(&serde_json::to_vec(entry)?)?;
+        file.persist(&entry_path).map_err(|err| err.error)?;
+        Ok(())
+    }
+
+    /// Copies `source` into the store as the object with the given hash, unless it is already
+    /// stored.
+    pub(crate) fn copy_object(&self, hash: &str, source: &Path) -> std::io::Result<()> {
+        let object = self.object_path(hash);
+        if object.is_file() {
+            return Ok(());
+        }
+        let folder = object.parent().expect("objects are stored in a folder");
+        fs_err::create_dir_all(folder)?;
+
+        // Copy to a temporary file first, so a concurrent restore never sees a partial file.
+        let temp_path = tempfile::Builder::new()
+            .prefix(".")
+            .tempfile_in(folder)?
+            .into_temp_path();
+        fs_err::remove_file(&temp_path)?;
+        reflink_copy::reflink_or_copy(source, &temp_path)?;
+        self.persist_object(hash, temp_path)
+    }
+
+    /// Creates a temporary file in the folder of the object with the given hash. Once its
+    /// contents are complete, it is moved into place with [`TaskOutputStore::persist_object`].
+    pub(crate) fn temp_object(&self, hash: &str) -> std::io::Result<NamedTempFile> {
+        let object = self.object_path(hash);
+        let folder = object.parent().expect("objects are stored in a folder");
+        fs_err::create_dir_all(folder)?;
+        NamedTempFile::new_in(folder)
+    }
+
+    /// Moves a complete temporary file into the store as the object with the given hash.
+    pub(crate) fn persist_object(&self, hash: &str, temp_path: TempPath) -> std::io::Result<()> {
+        set_file_mode(&temp_path, false)?;
+        temp_path
+            .persist(self.object_path(hash))
+            .map_err(|err| err.error)?;
+        Ok(())
+    }
+
+    /// Copies the output files of a task into the store. Files that are already stored are
+    /// skipped.
+    pub fn store(
+        &self,
+        workspace_root: &Path,
+        key: &ComputationHash,
+        outputs: &FileHashes,
+    ) -> std::io::Result<()> {
+        let mut executables = BTreeSet::new();
+        for (path, hash) in &outputs.files {
+            let source = workspace_root.join(path);
+            if is_executable(&fs_err::metadata(&source)?) {
+                executables.insert(path.clone());
+            }
+            self.copy_object(hash, &source)?;
+        }
+
+        let entry = OutputEntry {
+            files: outputs
+                .files
+                .iter()
+                .map(|(path, hash)| (path.clone(), hash.clone()))
+                .collect(),
+            executables,
+        };
+        self.write_entry(key, &entry)
+    }
+
+    /// Restores the outputs stored for `key` into the workspace. Files for which `current`
+    /// already contains the stored hash are left untouched.
+    ///
+    /// Returns the number of restored files, or `None` if nothing is stored for the key.
+    pub fn restore(
+        &self,
+        workspace_root: &Path,
+        key: &ComputationHash,
+        current: Option<&FileHashes>,
+    ) -> std::io::Result<Option<usize>> {
+        let Some(entry) = self.read_entry(key)? else {
+            return Ok(None);
+        };
+
+        // Only restore complete entries, objects may have been removed from the cache.
+        let missing: Vec<_> = entry
+            .files
+            .iter()
+            .filter(|(path, hash)| {
+                current.and_then(|current| current.files.get(*path)) != Some(*hash)
+            })
+            .collect();
+        if entry.files.is_empty()
+            || missing
+                .iter()
+                .any(|(_, hash)| !self.object_path(hash).is_file())
+        {
+            return Ok(None);
+        }
+
+        for (path, hash) in &missing {
+            let destination = workspace_root.join(path);
+            if let Some(parent) = destination.parent() {
+                fs_err::create_dir_all(parent)?;
+            }
+            match fs_err::remove_file(&destination) {
+                Err(err) if err.kind() != std::io::ErrorKind::NotFound => return Err(err),
+                _ => {}
+            }
+            reflink_copy::reflink_or_copy(self.object_path(hash), &destination)?;
+            set_file_mode(&destination, entry.executables.contains(*path))?;
+            tracing::info!("Restored output from cache: {:?}", path);
+        }
+
+        Ok(Some(missing.len()))
+    }
+}
+
+/// Returns true if `path` is relative and only consists of normal components, so joining it to
+/// the workspace root never leaves the workspace.
+fn is_normalized_relative_path(path: &Path) -> bool {
+    path.components().next().is_some()
+        && path
+            .components()
+            .all(|component| matches!(component, Component::Normal(_)))
+}
+
+/// Returns true if `hash` is a hash computed by [`FileHashes`]: the xxh3 hash of the contents,
+/// formatted as lowercase hex without leading zeros.
+fn is_valid_object_hash(hash: &str) -> bool {
+    (1..=16).contains(&hash.len())
+        && hash
+            .bytes()
+            .all(|byte| byte.is_ascii_digit() || (b'a'..=b'f').contains(&byte))
+}
+
+/// Returns true if any of the execute bits of the file is set.
+#[cfg(unix)]
+fn is_executable(metadata: &std::fs::Metadata) -> bool {
+    use std::os::unix::fs::PermissionsExt;
+    metadata.permissions().mode() & 0o111 != 0
+}
+
+#[cfg(not(unix))]
+fn is_executable(_metadata: &std::fs::Metadata) -> bool {
+    false
+}
+
+/// Gives objects and restored outputs the usual permissions of a file, independent of how it
+/// was created, e.g. `0600` for temporary files.
+#[cfg(unix)]
+fn set_file_mode(path: &Path, executable: bool) -> std::io::Result<()> {
+    use std::os::unix::fs::PermissionsExt;
+    let mode = if executable { 0o755 } else { 0o644 };
+    fs_err::set_permissions(path, std::fs::Permissions::from_mode(mode))
+}
+
+#[cfg(not(unix))]
+fn set_file_mode(_path: &Path, _executable: bool) -> std::io::Result<()> {
+    Ok(())
+}
+
+/// The path of an object relative to the root of a store.
+pub(crate) fn object_relative_path(hash: &str) -> String {
+    let prefix = hash.get(..2).unwrap_or(hash);
+    format!("objects/{prefix}/{hash}")
+}
+
+/// The path of an entry relative to the root of a store.
+pub(crate) fn entry_relative_path(key: &ComputationHash) -> String {
+    format!("entries/{key}.json")
+}
+
+#[cfg(test)]
+mod test {
+    use super::*;
+    use fs_err::{create_dir, read_to_string, remove_dir_all, write};
+    use tempfile::tempdir;
+
+    #[tokio::test]
+    async fn store_and_restore() {
+        let store_dir = tempdir().unwrap();
+        let workspace = tempdir().unwrap();
+        let store = TaskOutputStore::new(store_dir.path());
+        let key = ComputationHash::from("key".to_string());
+
+        create_dir(workspace.path().join("build")).unwrap();
+        write(workspace.path().join("build/out.txt"), "output").unwrap();
+        let outputs = FileHashes::from_files(workspace.path(), ["build/"])
+            .await
+            .unwrap();
+
+        assert_eq!(store.restore(workspace.path(), &key, None).unwrap(), None);
+        store.store(workspace.path(), &key, &outputs).unwrap();
+
+        // Unchanged outputs are not restored again
+        assert_eq!(
+            store
+                .restore(workspace.path(), &key, Some(&outputs))
+                .unwrap(),
+            Some(0)
+        );
+
+        remove_dir_all(workspace.path().join("build")).unwrap();
+        assert_eq!(
+            store.restore(workspace.path(), &key, None).unwrap(),
+            Some(1)
+        );
+        assert_eq!(
+            read_to_string(workspace.path().join("build/out.txt")).unwrap(),
+            "output"
+        );
+    }
+
+    #[test]
+    fn entries_outside_of_the_workspace_are_rejected() {
+        let store_dir = tempdir().unwrap();
+        let workspace = tempdir().unwrap();
+        let store = TaskOutputStore::new(store_dir.path());
+        let key = ComputationHash::from("key".to_string());
+
+        for (path, hash) in [
+            ("../escape.txt", "0123456789abcdef"),
+            ("/etc/escape.txt", "0123456789abcdef"),
+            ("./build/out.txt", "0123456789abcdef"),
+            ("build/out.txt", "../../escape"),
+            ("build/out.txt", "0123456789ABCDEF"),
+            ("build/out.txt", "0123456789abcdef0"),
+        ] {
+            let entry = OutputEntry {
+                files: BTreeMap::from([(PathBuf::from(path), hash.to_string())]),
+                ..OutputEntry::default()
+            };
+            store.write_entry(&key, &entry).unwrap();
+            assert!(
+                store.restore(workspace.path(), &key, None).is_err(),
+                "{path} -> {hash} was accepted"
+            );
+        }
+    }
+
+    #[cfg(unix)]
+    #[tokio::test]
+    async fn restore_keeps_the_executable_bit() {
+        use std::os::unix::fs::PermissionsExt;
+
+        let store_dir = tempdir().unwrap();
+        let workspace = tempdir().unwrap();
+        let store = TaskOutputStore::new(store_dir.path());
+        let key = ComputationHash::from("key".to_string());
+
+        create_dir(workspace.path().join("build")).unwrap();
+        write(workspace.path().join("build/tool"), "#!/bin/sh").unwrap();
+        write(workspace.path().join("build/data"), "data").unwrap();
+        let mode = |path: &str| {
+            fs_err::metadata(workspace.path().join(path))
+                .unwrap()
+                .permissions()
+                .mode()
+                & 0o777
+        };
+        fs_err::set_permissions(
+            workspace.path().join("build/tool"),
+            std::fs::Permissions::from_mode(0o755),
+        )
+        .unwrap();
+        let outputs = FileHashes::from_files(workspace.path(), ["build/"])
+            .await
+            .unwrap();
+        store.store(workspace.path(), &key, &outputs).unwrap();
+
+        remove_dir_all(workspace.path().join("build")).unwrap();
+        assert_eq!(
+            store.restore(workspace.path(), &key, None).unwrap(),
+            Some(2)
+        );
+        assert_eq!(mode("build/tool"), 0o755);
+        assert_eq!(mode("build/data"), 0o644);
+    }
+}
@@ -0,0 +1,553 @@
+//! A task cache that is shared between machines, e.g. CI runners and developer machines.
+//!
+//! A [`TaskCacheBackend`] stores the outputs of tasks in the same layout as the local
+//! [`TaskOutputStore`]: an `entries` folder with a json file per output cache key and an
+//! `objects` folder with the contents of the files, named after their hash. Outputs are always
+//! downloaded into the local store first and restored from there.
+//!
+//! The backend is configured with the `task-cache.url` configuration key:
+//!
+//! - `file://` urls use [`DirectoryTaskCache`], a directory that is e.g. mounted from a network
+//!   share.
+//! - `http://` and `https://` urls use [`HttpTaskCache`], which only requires `HEAD`, `GET` and
+//!   `PUT` requests, so S3 compatible object stores like MinIO can be used through their HTTP
+//!   endpoint.
+//!
+//! Before a task graph is executed, [`prefetch_task_outputs`] looks up the cacheable tasks of the
+//! graph that don't depend on other tasks in one batch and downloads the outputs that are
+//! available. The outputs of the other tasks are looked up when they are about to run.
+
+use std::{collections::HashSet, path::PathBuf, sync::Arc};
+
+use async_trait::async_trait;
+use futures::{StreamExt, TryStreamExt};
+use miette::Diagnostic;
+use pixi_core::Workspace;
+use rattler_lock::LockFile;
+use rattler_networking::LazyClient;
+use reqwest::StatusCode;
+use thiserror::Error;
+use tokio::io::AsyncWriteExt;
+use url::Url;
+use xxhash_rust::xxh3::Xxh3;
+
+use crate::{
+    ComputationHash, ExecutableTask, TaskGraph, TaskHash, TaskOutputStore,
+    output_store::{OutputEntry, entry_relative_path, object_relative_path},
+};
+
+/// The maximum number of concurrent requests to a shared task cache.
+const CONCURRENT_REQUESTS: usize = 16;
+
+#[derive(Debug, Error, Diagnostic)]
+pub enum SharedTaskCacheError {
+    #[error("unsupported task cache url '{0}', use a 'file', 'http' or 'https' url")]
+    UnsupportedUrl(Url),
+
+    #[error(transparent)]
+    Io(#[from] std::io::Error),
+
+    #[error(transparent)]
+    Request(#[from] reqwest_middleware::Error),
+
+    #[error("the shared task cache contains an invalid entry")]
+    InvalidEntry(#[from] serde_json::Error),
+
+    #[error("the entry '{0}' in the shared task cache refers to missing outputs")]
+    IncompleteEntry(ComputationHash),
+
+    #[error("the contents of object '{0}' in the shared task cache don't match its hash")]
+    HashMismatch(String),
+}
+
+/// A place where the outputs of tasks can be shared between machines.
+#[async_trait]
+pub trait TaskCacheBackend: Send + Sync {
+    /// Returns the subset of `keys` for which outputs are stored.
+    async fn contains_many(
+        &self,
+        keys: &[ComputationHash],
+    ) -> Result<HashSet<ComputationHash>, SharedTaskCacheError>;
+
+    /// Downloads the outputs stored for `key` into the `local` store. Returns `false` if no
+    /// outputs are stored for the key.
+    async fn pull(
+        &self,
+        key: &ComputationHash,
+        local: &TaskOutputStore,
+    ) -> Result<bool, SharedTaskCacheError>;
+
+    /// Uploads the outputs stored for `key` in the `local` store.
+    async fn push(
+        &self,
+        key: &ComputationHash,
+        local: &TaskOutputStore,
+    ) -> Result<(), SharedTaskCacheError>;
+}
+
+/// The shared task cache configured for a workspace, together with whether local results should
+/// be uploaded to it.
+#[derive(Clone)]
+pub struct SharedTaskCache {
+    pub backend: Arc<dyn TaskCacheBackend>,
+    pub push: bool,
+}
+
+impl SharedTaskCache {
+    /// Returns the shared task cache configured for the workspace, if any.
+    pub fn from_workspace(workspace: &Workspace) -> miette::Result<Option<Self>> {
+        let config = &workspace.config().task_cache;
+        let Some(url) = &config.url else {
+            return Ok(None);
+        };
+
+        let backend: Arc<dyn TaskCacheBackend> = match url.scheme() {
+            "file" => {
+                let path = url
+                    .to_file_path()
+                    .map_err(|_| SharedTaskCacheError::UnsupportedUrl(url.clone()))?;
+                Arc::new(DirectoryTaskCache::new(path))
+            }
+            "http" | "https" => Arc::new(HttpTaskCache::new(
+                url.clone(),
+                workspace.authenticated_client()?.clone(),
+            )),
+            _ => return Err(SharedTaskCacheError::UnsupportedUrl(url.clone()).into()),
+        };
+
+        Ok(Some(Self {
+            backend,
+            push: config.push(),
+        }))
+    }
+}
+
+/// A shared task cache in a directory, e.g. on a network share.
+#[derive(Debug, Clone)]
+pub struct DirectoryTaskCache {
+    store: TaskOutputStore,
+}
+
+impl DirectoryTaskCache {
+    pub fn new(root: impl Into<PathBuf>) -> Self {
+        Self {
+            store: TaskOutputStore::new(root),
+        }
+    }
+}
+
+/// Copies the outputs stored for `key` from one store to another. Returns `false` if `from`
+/// doesn't contain outputs for the key.
+fn copy_entry(
+    from: &TaskOutputStore,
+    to: &TaskOutputStore,
+    key: &ComputationHash,
+) -> std::io::Result<bool> {
+    let Some(entry) = from.read_entry(key)? else {
+        return Ok(false);
+    };
+    for hash in entry.files.values() {
+        to.copy_object(hash, &from.object_path(hash))?;
+    }
+    to.write_entry(key, &entry)?;
+    Ok(true)
+}
+
+#[async_trait]
+impl TaskCacheBackend for DirectoryTaskCache {
+    async fn contains_many(
+        &self,
+        keys: &[ComputationHash],
+    ) -> Result<HashSet<ComputationHash>, SharedTaskCacheError> {
+        let store = self.store.clone();
+        let keys = keys.to_vec();
+        let found: HashSet<_> = tokio::task::spawn_blocking(move || {
+            keys.into_iter().filter(|key| store.contains(key)).collect()
+        })
+        .await
+        .map_err(std::io::Error::other)?;
+        Ok(found)
+    }
+
+    async fn pull(
+        &self,
+        key: &ComputationHash,
+        local: &TaskOutputStore,
+    ) -> Result<bool, SharedTaskCacheError> {
+        let (shared, local, key) = (self.store.clone(), local.clone(), key.clone());
+        Ok(
+            tokio::task::spawn_blocking(move || copy_entry(&shared, &local, &key))
+                .await
+                .map_err(std::io::Error::other)??,
+        )
+    }
+
+    async fn push(
+        &self,
+        key: &ComputationHash,
+        local: &TaskOutputStore,
+    ) -> Result<(), SharedTaskCacheError> {
+        let (shared, local, key) = (self.store.clone(), local.clone(), key.clone());
+        tokio::task::spawn_blocking(move || copy_entry(&local, &shared, &key))
+            .await
+            .map_err(std::io::Error::other)??;
+        Ok(())
+    }
+}
+
+/// A shared task cache on an HTTP server that supports `HEAD`, `GET` and `PUT` requests.
+#[derive(Clone)]
+pub struct HttpTaskCache {
+    base_url: Url,
+    client: LazyClient,
+}
+
+impl HttpTaskCache {
+    pub fn new(mut base_url: Url, client: LazyClient) -> Self {
+        // Make sure relative paths are joined below the base url instead of replacing its last
+        // segment.
+        if !base_url.path().ends_with('/') {
+            base_url.set_path(&format!("{}/", base_url.path()));
+        }
+        Self { base_url, client }
+    }
+
+    fn url(&self, relative_path: &str) -> Url {
+        self.base_url
+            .join(relative_path)
+            .expect("cache paths only consist of hashes")
+    }
+
+    async fn exists(&self, url: Url) -> Result<bool, SharedTaskCacheError> {
+        let response = self.client.client().head(url).send().await?;
+        if response.status() == StatusCode::NOT_FOUND {
+            return Ok(false);
+        }
+        response
+            .error_for_status()
+            .map_err(reqwest_middleware::Error::from)?;
+        Ok(true)
+    }
+
+    /// Downloads the object with the given hash into the `local` store. The contents are
+    /// streamed into a temporary file and only moved into place if they match the hash.
+    /// Returns `false` if the object doesn't exist.
+    async fn download_object(
+        &self,
+        hash: &str,
+        local: &TaskOutputStore,
+    ) -> Result<bool, SharedTaskCacheError> {
+        let url = self.url(&object_relative_path(hash));
+        let response = self.client.client().get(url).send().await?;
+        if response.status() == StatusCode::NOT_FOUND {
+            return Ok(false);
+        }
+        let mut response = response
+            .error_for_status()
+            .map_err(reqwest_middleware::Error::from)?;
+
+        let (file, temp_path) = local.temp_object(hash)?.into_parts();
+        let mut file = tokio::fs::File::from_std(file);
+        let mut hasher = Xxh3::new();
+        while let Some(chunk) = response
+            .chunk()
+            .await
+            .map_err(reqwest_middleware::Error::from)?
+        {
+            hasher.update(&chunk);
+            file.write_all(&chunk).await?;
+        }
+        file.flush().await?;
+        drop(file);
+
+        if format!("{:x}", hasher.digest()) != hash {
+            return Err(SharedTaskCacheError::HashMismatch(hash.to_string()));
+        }
+        local.persist_object(hash, temp_path)?;
+        Ok(true)
+    }
+
+    async fn download(&self, url: Url) -> Result<Option<Vec<u8>>, SharedTaskCacheError> {
+        let response = self.client.client().get(url).send().await?;
+        if response.status() == StatusCode::NOT_FOUND {
+            return Ok(None);
+        }
+        let contents = response
+            .error_for_status()
+            .map_err(reqwest_middleware::Error::from)?
+            .bytes()
+            .await
+            .map_err(reqwest_middleware::Error::from)?;
+        Ok(Some(contents.to_vec()))
+    }
+
+    async fn upload(&self, url: Url, contents: Vec<u8>) -> Result<(), SharedTaskCacheError> {
+        self.client
+            .client()
+            .put(url)
+            .body(contents)
+            .send()
+            .await?
+            .error_for_status()
+            .map_err(reqwest_middleware::Error::from)?;
+        Ok(())
+    }
+}
+
+#[async_trait]
+impl TaskCacheBackend for HttpTaskCache {
+    async fn contains_many(
+        &self,
+        keys: &[ComputationHash],
+    ) -> Result<HashSet<ComputationHash>, SharedTaskCacheError> {
+        let found: Vec<_> = futures::stream::iter(keys)
+            .map(|key| async move {
+                let exists = self.exists(self.url(&entry_relative_path(key))).await?;
+                Ok::<_, SharedTaskCacheError>(exists.then(|| key.clone()))
+            })
+            .buffer_unordered(CONCURRENT_REQUESTS)
+            .try_collect()
+            .await?;
+        Ok(found.into_iter().flatten().collect())
+    }
+
+    async fn pull(
+        &self,
+        key: &ComputationHash,
+        local: &TaskOutputStore,
+    ) -> Result<bool, SharedTaskCacheError> {
+        let Some(contents) = self.download(self.url(&entry_relative_path(key))).await? else {
+            return Ok(false);
+        };
+        let entry: OutputEntry = serde_json::from_slice(&contents)?;
+        entry.validate()?;
+
+        let missing: HashSet<_> = entry
+            .files
+            .values()
+            .filter(|hash| !local.object_path(hash).is_file())
+            .collect();
+        futures::stream::iter(missing)
+            .map(|hash| async move {
+                if !self.download_object(hash, local).await? {
+                    return Err(SharedTaskCacheError::IncompleteEntry(key.clone()));
+                }
+                Ok(())
+            })
+            .buffer_unordered(CONCURRENT_REQUESTS)
+            .try_collect::<()>()
+            .await?;
+
+        local.write_entry(key, &entry)?;
+        Ok(true)
+    }
+
+    async fn push(
+        &self,
+        key: &ComputationHash,
+        local: &TaskOutputStore,
+    ) -> Result<(), SharedTaskCacheError> {
+        let Some(entry) = local.read_entry(key)? else {
+            return Ok(());
+        };
+
+        let hashes: HashSet<_> = entry.files.values().collect();
+        futures::stream::iter(hashes)
+            .map(|hash| async move {
+                let url = self.url(&object_relative_path(hash));
+                if self.exists(url.clone()).await? {
+                    return Ok(());
+                }
+                let contents = fs_err::tokio::read(local.object_path(hash)).await?;
+                self.upload(url, contents).await
+            })
+            .buffer_unordered(CONCURRENT_REQUESTS)
+            .try_collect::<()>()
+            .await?;
+
+        // Upload the entry last, so other machines never see an entry with missing objects
+        self.upload(
+            self.url(&entry_relative_path(key)),
+            serde_json::to_vec(&entry)?,
+        )
+        .await
+    }
+}
+
+/// Returns the tasks of the graph whose outputs can be prefetched: tasks that cache their outputs
+/// and don't depend on other tasks. The inputs of a task with dependencies may be produced by
+/// those dependencies, so its cache key is only known once they ran.
+fn prefetch_candidates<'p>(task_graph: &TaskGraph<'p>) -> Vec<ExecutableTask<'p>> {
+    task_graph
+        .topological_order()
+        .into_iter()
+        .filter(|task_id| task_graph[*task_id].dependencies.is_empty())
+        .map(|task_id| ExecutableTask::from_task_graph(task_graph, task_id))
+        .filter(|task| task.caches_outputs())
+        .collect()
+}
+
+/// Downloads the outputs of the tasks in the graph that are available in the shared task cache
+/// but not in the local store. The tasks are looked up in a single batch before any task runs,
+/// so the round trips to the shared cache don't add up per task. Only tasks without
+/// dependencies are prefetched, see [`prefetch_candidates`].
+///
+/// Failures are logged and otherwise ignored, the tasks then simply run.
+pub async fn prefetch_task_outputs(task_graph: &TaskGraph<'_>, lock_file: &LockFile) {
+    let shared = match SharedTaskCache::from_workspace(task_graph.project()) {
+        Ok(Some(shared)) => shared,
+        Ok(None) => return,
+        Err(err) => {
+            tracing::warn!("failed to configure the shared task cache: {err}");
+            return;
+        }
+    };
+    let Ok(local) = TaskOutputStore::from_cache_dir() else {
+        return;
+    };
+
+    let mut keys = Vec::new();
+    for task in prefetch_candidates(task_graph) {
+        let Ok(Some(hash)) = TaskHash::from_task(&task, lock_file).await else {
+            continue;
+        };
+        if hash.inputs.is_none() {
+            continue;
+        }
+        let args_hash = TaskHash::task_args_hash(&task).unwrap_or_default();
+        let key = hash.output_cache_key(args_hash.as_ref());
+        if !local.contains(&key) {
+            keys.push(key);
+        }
+    }
+    if keys.is_empty() {
+        return;
+    }
+
+    let available = match shared.backend.contains_many(&keys).await {
+        Ok(available) => available,
+        Err(err) => {
+            tracing::warn!("failed to query the shared task cache: {err}");
+            return;
+        }
+    };
+    tracing::info!(
+        "{} of {} task output(s) are available in the shared task cache",
+        available.len(),
+        keys.len()
+    );
+
+    futures::stream::iter(&available)
+        .for_each_concurrent(CONCURRENT_REQUESTS, |key| {
+            let (backend, local) = (&shared.backend, &local);
+            async move {
+                if let Err(err) = backend.pull(key, local).await {
+                    tracing::warn!("failed to download task outputs from the shared cache: {err}");
+                }
+            }
+        })
+        .await;
+}
+
+#[cfg(test)]
+mod test {
+    use super::*;
+    use crate::{FileHashes, task_environment::SearchEnvironments};
+    use fs_err::{create_dir, read_to_string, write};
+    use std::path::Path;
+    use tempfile::tempdir;
+
+    #[tokio::test]
+    async fn share_outputs_through_directory() {
+        let workspace = tempdir().unwrap();
+        let shared_dir = tempdir().unwrap();
+        let shared = DirectoryTaskCache::new(shared_dir.path());
+        let key = ComputationHash::from("key".to_string());
+
+        // Store and push the outputs on the first machine
+        create_dir(workspace.path().join("build")).unwrap();
+        write(workspace.path().join("build/out.txt"), "output").unwrap();
+        let outputs = FileHashes::from_files(workspace.path(), ["build/"])
+            .await
+            .unwrap();
+        let first_dir = tempdir().unwrap();
+        let first = TaskOutputStore::new(first_dir.path());
+        first.store(workspace.path(), &key, &outputs).unwrap();
+        shared.push(&key, &first).await.unwrap();
+
+        let missing = ComputationHash::from("missing".to_string());
+        assert_eq!(
+            shared
+                .contains_many(&[key.clone(), missing.clone()])
+                .await
+                .unwrap(),
+            HashSet::from([key.clone()])
+        );
+
+        // Pull them on the second machine
+        let second_dir = tempdir().unwrap();
+        let second = TaskOutputStore::new(second_dir.path());
+        assert!(!shared.pull(&missing, &second).await.unwrap());
+        assert!(shared.pull(&key, &second).await.unwrap());
+
+        let other_workspace = tempdir().unwrap();
+        assert_eq!(
+            second.restore(other_workspace.path(), &key, None).unwrap(),
+            Some(1)
+        );
+        assert_eq!(
+            read_to_string(other_workspace.path().join("build/out.txt")).unwrap(),
+            "output"
+        );
+    }
+
+    #[tokio::test]
+    async fn pull_rejects_entries_outside_of_the_workspace() {
+        let shared_dir = tempdir().unwrap();
+        let shared = DirectoryTaskCache::new(shared_dir.path());
+        let key = ComputationHash::from("key".to_string());
+        let entry = OutputEntry {
+            files: [(
+                PathBuf::from("../escape.txt"),
+                "0123456789abcdef".to_string(),
+            )]
+            .into(),
+            ..OutputEntry::default()
+        };
+        shared.store.write_entry(&key, &entry).unwrap();
+
+        let local_dir = tempdir().unwrap();
+        let local = TaskOutputStore::new(local_dir.path());
+        assert!(shared.pull(&key, &local).await.is_err());
+        assert!(!local.contains(&key));
+    }
+
+    #[test]
+    fn dependent_tasks_are_not_prefetched() {
+        let workspace = Workspace::from_str(
+            Path::new("pixi.toml"),
+            r#"
+        [workspace]
+        name = "pixi"
+        channels = []
+        platforms = ["linux-64", "osx-64", "win-64", "osx-arm64"]
+
+        [tasks]
+        generate = { cmd = "echo generate", inputs = ["src/*"], outputs = ["gen/*"] }
+        build = { cmd = "echo build", inputs = ["gen/*"], outputs = ["build/*"], depends-on = ["generate"] }
+    "#,
+        )
+        .unwrap();
+        let search_envs = SearchEnvironments::from_opt_env(&workspace, None, None);
+        let graph =
+            TaskGraph::from_cmd_args(&workspace, &search_envs, vec!["build".to_string()], false)
+                .unwrap();
+
+        // The inputs of `build` are the outputs of `generate`, they don't exist yet
+        let candidates: Vec<_> = prefetch_candidates(&graph)
+            .iter()
+            .map(|task| task.name().unwrap_or_default().to_string())
+            .collect();
+        assert_eq!(candidates, vec!["generate"]);
+    }
+}
@@ -9,7 +9,7 @@ use std::hash::{Hash, Hasher};
 use thiserror::Error;
 use xxhash_rust::xxh3::Xxh3;
 
-use crate::{ExecutableTask, FileHashes, FileHashesError, InvalidWorkingDirectory};
+use crate::{ExecutableTask, FileHashIndex, FileHashes, FileHashesError, InvalidWorkingDirectory};
 
 /// The computation hash is a combined hash of all the inputs and outputs of a task.
 ///
@@ -123,6 +123,18 @@ impl TaskHash {
         ComputationHash(format!("{:x}", hasher.finish()))
     }
 
+    /// Computes the key under which the outputs of the task are stored in the
+    /// [`crate::TaskOutputStore`]. Unlike the [`TaskHash::computation_hash`] it doesn't depend
+    /// on the current outputs, only on the globs that select them through `args_hash`.
+    pub fn output_cache_key(&self, args_hash: Option<&NameHash>) -> ComputationHash {
+        let mut hasher = Xxh3::new();
+        self.command.hash(&mut hasher);
+        self.inputs.hash(&mut hasher);
+        self.environment.hash(&mut hasher);
+        args_hash.hash(&mut hasher);
+        ComputationHash(format!("{:x}", hasher.finish()))
+    }
+
     /// Return the hash that should be used as the name of the task cache file.
     /// It takes the rendered inputs and rendered outputs of the task into account.
     pub fn task_args_hash(task: &ExecutableTask<'_>) -> Result<Option<NameHash>, InputHashesError> {
@@ -179,7 +191,7 @@ impl InputHashes {
             .map(|i| i.render(Some(task.args())))
             .collect::<Result<_, _>>()?;
 
-        let files = FileHashes::from_files(task.project().root(), &rendered_inputs).await?;
+        let files = hash_workspace_files(task, &rendered_inputs).await?;
 
         // If no files matched, treat as no inputs for caching purposes
         if files.files.is_empty() {
@@ -220,7 +232,7 @@ impl OutputHashes {
             Err(_) => return Ok(None),
         };
 
-        let files = FileHashes::from_files(task.project().root(), outputs.iter()).await?;
+        let files = hash_workspace_files(task, &outputs).await?;
 
         // If no files matched, treat as no outputs for caching purposes
         if files.files.is_empty() {
@@ -231,6 +243,17 @@ impl OutputHashes {
     }
 }
 
+/// Hashes the files in the workspace that match the globs, reusing the hashes of unchanged files
+/// from the [`FileHashIndex`] in the task cache folder of the workspace. The index is saved once
+/// per task run by [`ExecutableTask`].
+async fn hash_workspace_files(
+    task: &ExecutableTask<'_>,
+    globs: &[String],
+) -> Result<FileHashes, InputHashesError> {
+    let index = FileHashIndex::for_task_cache(&task.project().task_cache_folder());
+    Ok(FileHashes::from_files_with_index(task.project().root(), globs, &index).await?)
+}
+
 /// An error that might occur when computing the input hashes of a task.
 #[derive(Debug, Error, Diagnostic)]
 pub enum InputHashesError {
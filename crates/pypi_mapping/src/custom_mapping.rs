@@ -2,7 +2,7 @@ use async_once_cell::OnceCell as AsyncCell;
 use miette::{IntoDiagnostic, WrapErr};
 use rattler_conda_types::{PackageUrl, RepoDataRecord};
 use rattler_networking::LazyClient;
-use std::path::Path;
+use std::{collections::HashMap, path::Path};
 use url::Url;
 
 use crate::{
@@ -159,24 +159,131 @@ impl DerivePurls for CustomMappingClient {
             return Ok(None);
         };
 
-        // Find the mapping for this particular record
-        match custom_mapping.get(record.package_record.name.as_normalized()) {
-            // The record is in the mapping, and it has a pypi name
-            Some(Some(mapped_name)) => {
-                let purl = PackageUrl::builder(String::from("pypi"), mapped_name.to_string())
-                    .with_qualifier("source", PurlSource::ProjectDefinedMapping.as_str())
-                    .expect("valid qualifier");
-                let built_purl = purl.build().expect("valid pypi package url");
-                Ok(Some(vec![built_purl]))
-            }
-            Some(None) => {
-                // The record is in the mapping, but it has no pypi name
-                Ok(Some(vec![]))
-            }
-            None => {
-                // The record is not in the mapping
-                Ok(None)
-            }
+        Ok(derive_purls_from_mapping(custom_mapping, record))
+    }
+
+    async fn derive_purls_many(
+        &self,
+        records: &[&RepoDataRecord],
+        _cache_metrics: &CacheMetrics,
+    ) -> Result<Vec<Option<Vec<PackageUrl>>>, MappingError> {
+        // Look up the mapping of each channel only once.
+        let mut channel_mappings = HashMap::new();
+        Ok(records
+            .iter()
+            .map(|record| {
+                let channel = record.channel.as_deref()?;
+                let custom_mapping = *channel_mappings
+                    .entry(channel)
+                    .or_insert_with(|| self.get_channel_mapping(channel));
+                derive_purls_from_mapping(custom_mapping?, record)
+            })
+            .collect())
+    }
+}
+
+/// Determines the purls of a record from the mapping of its channel.
+fn derive_purls_from_mapping(
+    custom_mapping: &CompressedMapping,
+    record: &RepoDataRecord,
+) -> Option<Vec<PackageUrl>> {
+    // Find the mapping for this particular record
+    match custom_mapping.get(record.package_record.name.as_normalized()) {
+        // The record is in the mapping, and it has a pypi name
+        Some(Some(mapped_name)) => {
+            let purl = PackageUrl::builder(String::from("pypi"), mapped_name.to_string())
+                .with_qualifier("source", PurlSource::ProjectDefinedMapping.as_str())
+                .expect("valid qualifier");
+            let built_purl = purl.build().expect("valid pypi package url");
+            Some(vec![built_purl])
+        }
+        Some(None) => {
+            // The record is in the mapping, but it has no pypi name
+            Some(vec![])
+        }
+        None => {
+            // The record is not in the mapping
+            None
+        }
+    }
+}
+
+#[cfg(test)]
+mod test {
+    use rattler_conda_types::{PackageName, PackageRecord, Version};
+
+    use super::*;
+
+    fn record(name: &str, channel: Option<&str>) -> RepoDataRecord {
+        RepoDataRecord {
+            package_record: PackageRecord::new(
+                PackageName::new_unchecked(name),
+                Version::major(1),
+                "0".to_string(),
+            ),
+            file_name: format!("{name}-1-0.conda"),
+            url: Url::parse(&format!("https://example.com/{name}-1-0.conda")).unwrap(),
+            channel: channel.map(str::to_string),
+        }
+    }
+
+    #[test]
+    fn derive_purls_many_matches_derive_purls() {
+        let client = CustomMappingClient::from(MappingByChannel::from([
+            (
+                "https://example.com/first".to_string(),
+                CompressedMapping::from([
+                    ("pillow".to_string(), Some("pillow".to_string())),
+                    ("libzlib".to_string(), None),
+                ]),
+            ),
+            (
+                "https://example.com/second".to_string(),
+                CompressedMapping::from([("py-numpy".to_string(), Some("numpy".to_string()))]),
+            ),
+        ]));
+
+        let records = [
+            record("pillow", Some("https://example.com/first")),
+            record("py-numpy", Some("https://example.com/second/")),
+            record("libzlib", Some("https://example.com/first/")),
+            record("unmapped", Some("https://example.com/first")),
+            record("pillow", Some("https://example.com/second")),
+            record("pillow", Some("https://example.com/other")),
+            record("pillow", None),
+        ];
+        let records = records.iter().collect::<Vec<_>>();
+        let metrics = CacheMetrics::default();
+
+        let purls = futures::executor::block_on(client.derive_purls_many(&records, &metrics))
+            .unwrap()
+            .into_iter()
+            .map(|purls| {
+                purls.map(|purls| purls.iter().map(|purl| purl.name().to_string()).collect())
+            })
+            .collect::<Vec<Option<Vec<String>>>>();
+        assert_eq!(
+            purls,
+            [
+                Some(vec!["pillow".to_string()]),
+                Some(vec!["numpy".to_string()]),
+                Some(vec![]),
+                None,
+                None,
+                None,
+                None,
+            ]
+        );
+
+        // The batch derives the same purls as the records one by one
+        for record in &records {
+            assert_eq!(
+                futures::executor::block_on(client.derive_purls_many(&[*record], &metrics))
+                    .unwrap()
+                    .pop()
+                    .unwrap(),
+                futures::executor::block_on(client.derive_purls(record, &metrics)).unwrap()
+            );
         }
     }
 }
@@ -6,7 +6,6 @@ use std::{
     time::{Duration, Instant},
 };
 
-use futures::{StreamExt, stream::FuturesUnordered};
 use http_cache_reqwest::{CACacheManager, Cache, CacheMode, HttpCache, HttpCacheOptions};
 use itertools::Itertools;
 use miette::IntoDiagnostic;
@@ -23,12 +22,23 @@ use url::Url;
 mod custom_mapping;
 pub mod prefix;
 mod reporter;
+mod snapshot;
 
 pub use custom_mapping::CustomMapping;
 pub use reporter::Reporter;
+pub use snapshot::{MappingSnapshot, MappingSnapshotBuilder};
 
 use crate::custom_mapping::CustomMappingClient;
 
+/// The name of the file in the mapping cache directory that contains the
+/// [`MappingSnapshot`].
+pub const SNAPSHOT_FILE_NAME: &str = "snapshot-v3.bin";
+
+/// The default age after which the [`MappingSnapshot`] is rebuilt from network
+/// requests, so changes to the mappings are picked up. An expired snapshot is
+/// still used if the network requests fail.
+pub const SNAPSHOT_MAX_AGE: Duration = Duration::from_secs(24 * 60 * 60);
+
 /// A compressed mapping is a mapping of a package name to a potential pypi
 /// name.
 pub type CompressedMapping = HashMap<String, Option<String>>;
@@ -107,18 +117,23 @@ pub fn is_conda_forge_url(url: &Url) -> bool {
 /// For more information see:
 /// - [`prefix::CompressedMappingClient`]
 /// - [`prefix::HashMappingClient`]
+/// - [`MappingSnapshot`]
 /// - [`CondaForgeVerbatim`]
 #[derive(Clone)]
 pub struct MappingClient {
     client: LazyClient,
     compressed_mapping: prefix::CompressedMappingClient,
     hash_mapping: prefix::HashMappingClient,
+    snapshot_path: Option<PathBuf>,
+    snapshot_max_age: Duration,
 }
 
 pub struct MappingClientBuilder {
     client: LazyClient,
     compressed_mapping: prefix::CompressedMappingClientBuilder,
     hash_mapping: prefix::HashMappingClientBuilder,
+    snapshot_path: Option<PathBuf>,
+    snapshot_max_age: Duration,
 }
 
 impl MappingClientBuilder {
@@ -142,12 +157,33 @@ impl MappingClientBuilder {
         self
     }
 
+    /// Sets the location of the [`MappingSnapshot`] that is used to derive
+    /// purls without network requests, and that is extended with the results
+    /// of the network requests. `None` disables the snapshot.
+    pub fn with_snapshot_path(self, path: Option<PathBuf>) -> Self {
+        Self {
+            snapshot_path: path,
+            ..self
+        }
+    }
+
+    /// Sets the age after which the [`MappingSnapshot`] is rebuilt from network
+    /// requests, see [`SNAPSHOT_MAX_AGE`].
+    pub fn with_snapshot_max_age(self, max_age: Duration) -> Self {
+        Self {
+            snapshot_max_age: max_age,
+            ..self
+        }
+    }
+
     /// Finish the construction of the client and return it.
     pub fn finish(self) -> MappingClient {
         MappingClient {
             client: self.client,
             compressed_mapping: self.compressed_mapping.finish(),
             hash_mapping: self.hash_mapping.finish(),
+            snapshot_path: self.snapshot_path,
+            snapshot_max_age: self.snapshot_max_age,
         }
     }
 }
@@ -166,12 +202,14 @@ impl MappingClient {
         // Construct a client with a retry policy and local caching
         let retry_policy = ExponentialBackoff::builder().build_with_max_retries(3);
         let retry_strategy = RetryTransientMiddleware::new_with_policy(retry_policy);
+        let cache_dir = get_cache_dir()
+            .expect("missing cache directory")
+            .join(pixi_consts::consts::CONDA_PYPI_MAPPING_CACHE_DIR);
+        let snapshot_path = cache_dir.join(SNAPSHOT_FILE_NAME);
         let cache_strategy = Cache(HttpCache {
             mode: CacheMode::Default,
             manager: CACacheManager {
-                path: get_cache_dir()
-                    .expect("missing cache directory")
-                    .join(pixi_consts::consts::CONDA_PYPI_MAPPING_CACHE_DIR),
+                path: cache_dir,
                 remove_opts: Default::default(),
             },
             options: HttpCacheOptions::default(),
@@ -189,6 +227,8 @@ impl MappingClient {
             client: wrapped_client.clone(),
             compressed_mapping: prefix::CompressedMappingClient::builder(wrapped_client.clone()),
             hash_mapping: prefix::HashMappingClient::builder(wrapped_client),
+            snapshot_path: Some(snapshot_path),
+            snapshot_max_age: SNAPSHOT_MAX_AGE,
         }
     }
 
@@ -226,55 +266,121 @@ impl MappingClient {
             None
         };
 
-        let mut amend_futures = FuturesUnordered::new();
-        let total_records = records.len();
-        for record in records.into_iter() {
-            let reporter = reporter.clone();
-            let custom_mappings = &custom_mappings;
-            let cache_metrics = &metrics;
-            let file_name = record.file_name.clone();
-            let derive_purls_future = async move {
-                if let Some(reporter) = reporter.as_deref() {
-                    reporter.download_started(record, total_records);
-                }
+        // Open the snapshot to derive purls without network requests.
+        let snapshot = self
+            .snapshot_path
+            .as_deref()
+            .filter(|_| !matches!(mapping_source, MappingSource::Disabled))
+            .and_then(|path| {
+                MappingSnapshot::open(path)
+                    .inspect_err(|err| {
+                        tracing::debug!(
+                            "failed to open the pypi mapping snapshot {}: {err}",
+                            path.display()
+                        )
+                    })
+                    .ok()
+                    .flatten()
+            });
+
+        // An expired snapshot is only used if the mappings can't be fetched.
+        let (snapshot, expired_snapshot) = match snapshot {
+            Some(snapshot) if snapshot.is_expired(self.snapshot_max_age) => {
+                tracing::debug!("the pypi mapping snapshot expired, it will be rebuilt");
+                (None, Some(snapshot))
+            }
+            snapshot => (snapshot, None),
+        };
 
-                let derived_purls = if matches!(mapping_source, MappingSource::Disabled) {
-                    Ok(None)
-                } else if let Some(custom_mappings) = custom_mappings
+        // Group the records by the source of their mapping, so the purls of each group
+        // can be derived in a single batch. Records that are in the snapshot don't have
+        // to be looked up at all.
+        let total_records = records.len();
+        let mut derived_purls: Vec<Option<Vec<PackageUrl>>> = vec![None; total_records];
+        let mut custom_batch = Vec::new();
+        let mut prefix_batch = Vec::new();
+        if !matches!(mapping_source, MappingSource::Disabled) {
+            for (idx, record) in records.iter().enumerate() {
+                if custom_mappings
+                    .as_ref()
+                    .is_some_and(|mapping| mapping.is_mapping_for_record(record))
+                {
+                    custom_batch.push(idx);
+                } else if let Some(purls) = snapshot
                     .as_ref()
-                    .filter(|mapping| mapping.is_mapping_for_record(record))
+                    .and_then(|snapshot| snapshot.derive_purls(record))
                 {
-                    custom_mappings.derive_purls(record, cache_metrics).await
+                    derived_purls[idx] = purls;
                 } else {
-                    self.derive_purls_from_clients(record, cache_metrics).await
-                };
-
-                match derived_purls {
-                    Ok(derived_purls) => {
-                        if let Some(reporter) = reporter.as_deref() {
-                            reporter.download_finished(record, total_records);
-                        }
-                        Ok((record, derived_purls))
-                    }
-                    Err(err) => {
-                        if let Some(reporter) = reporter.as_deref() {
-                            reporter.download_failed(record, total_records);
-                        }
-                        Err(err)
-                    }
+                    prefix_batch.push(idx);
                 }
             }
-            .instrument(tracing::info_span!("derive_purl", record = file_name));
+        }
+
+        // The mappings that are fetched from the network, to extend the snapshot
+        // with.
+        let mut fetched_mappings = MappingSnapshotBuilder::default();
+
+        if let Some(custom_mappings) = custom_mappings.as_ref() {
+            let batch = custom_batch.iter().map(|&idx| &*records[idx]).collect_vec();
+            let purls = report_batch(
+                reporter.as_deref(),
+                &batch,
+                total_records,
+                custom_mappings
+                    .derive_purls_many(&batch, &metrics)
+                    .instrument(tracing::info_span!(
+                        "derive_purls",
+                        source = "custom",
+                        records = batch.len()
+                    )),
+            )
+            .await?;
+            for (idx, purls) in custom_batch.into_iter().zip(purls) {
+                derived_purls[idx] = purls;
+            }
+        }
 
-            // Add all futures to the futures queue to ensure all can run concurrently.
-            amend_futures.push(derive_purls_future);
+        let batch = prefix_batch.iter().map(|&idx| &*records[idx]).collect_vec();
+        let result = report_batch(
+            reporter.as_deref(),
+            &batch,
+            total_records,
+            self.derive_purls_from_clients(
+                &batch,
+                &metrics,
+                snapshot.as_ref(),
+                &mut fetched_mappings,
+            ),
+        )
+        .await;
+        let purls = match result {
+            Ok(purls) => purls,
+            Err(err) => {
+                // Fall back to the expired snapshot if it knows every record, e.g. when
+                // working offline.
+                let Some(purls) = expired_snapshot.as_ref().and_then(|snapshot| {
+                    batch
+                        .iter()
+                        .map(|record| snapshot.derive_purls(record))
+                        .collect::<Option<Vec<_>>>()
+                }) else {
+                    return Err(err);
+                };
+                tracing::warn!(
+                    "failed to fetch the conda to pypi mapping, using the expired snapshot instead: {err}"
+                );
+                // Keep the expired snapshot, so it can be used again
+                fetched_mappings = MappingSnapshotBuilder::default();
+                purls
+            }
+        };
+        for (idx, purls) in prefix_batch.into_iter().zip(purls) {
+            derived_purls[idx] = purls;
         }
 
         let mut amended_records = 0;
-        let mut total_records = 0;
-        while let Some(next) = amend_futures.next().await {
-            let (record, mut derived_purls) = next.into_diagnostic()?;
-
+        for (record, mut derived_purls) in records.into_iter().zip(derived_purls) {
             // As a last resort use the verbatim conda-forge purls.
             if derived_purls.is_none() {
                 derived_purls = CondaForgeVerbatim
@@ -287,11 +393,30 @@ impl MappingClient {
                 amend_purls(record, derived_purls);
                 amended_records += 1;
             }
-
-            total_records += 1;
         }
 
-        drop(amend_futures);
+        // Extend the snapshot with the mappings that were fetched.
+        if let Some(path) = self
+            .snapshot_path
+            .as_deref()
+            .filter(|_| !fetched_mappings.is_empty())
+        {
+            let mut mappings = snapshot
+                .as_ref()
+                .map(MappingSnapshotBuilder::from_snapshot)
+                .unwrap_or_default();
+            mappings.extend(fetched_mappings);
+
+            // The snapshot must be unmapped before it can be replaced on Windows.
+            drop(snapshot);
+            drop(expired_snapshot);
+            if let Err(err) = mappings.write(path) {
+                tracing::debug!(
+                    "failed to write the pypi mapping snapshot {}: {err}",
+                    path.display()
+                );
+            }
+        }
 
         let duration = start.elapsed();
         let data = metrics
@@ -318,29 +443,98 @@ impl MappingClient {
         Ok(())
     }
 
+    /// Derives the purls of a batch of records from the hash mapping, and
+    /// for the records that are not in the hash mapping from the name table of
+    /// the `snapshot` or the compressed mapping. The fetched mappings are added
+    /// to `fetched_mappings`.
     async fn derive_purls_from_clients(
         &self,
-        record: &RepoDataRecord,
+        records: &[&RepoDataRecord],
         cache_metrics: &CacheMetrics,
-    ) -> Result<Option<Vec<PackageUrl>>, MappingError> {
+        snapshot: Option<&MappingSnapshot>,
+        fetched_mappings: &mut MappingSnapshotBuilder,
+    ) -> Result<Vec<Option<Vec<PackageUrl>>>, MappingError> {
         // Try to get the purls from the hash mapping.
         let mut purls = self
             .hash_mapping
-            .derive_purls(record, cache_metrics)
+            .derive_purls_many(records, cache_metrics)
+            .instrument(tracing::info_span!(
+                "derive_purls",
+                source = PurlSource::HashMapping.as_str(),
+                records = records.len()
+            ))
             .await?;
+        // Record the misses as well, so the records resolve from the snapshot next
+        // time.
+        for (record, purls) in records.iter().zip(&purls) {
+            if let Some(sha256) = record.package_record.sha256 {
+                fetched_mappings.insert_by_hash(sha256, purls.as_deref());
+            }
+        }
 
-        // Otherwise try from the compressed mapping
-        if purls.is_none() {
-            purls = self
-                .compressed_mapping
-                .derive_purls(record, cache_metrics)
-                .await?;
+        // Otherwise try the names in the snapshot, and then the compressed mapping
+        let mut missing = Vec::new();
+        for (idx, (record, purls)) in records.iter().zip(purls.iter_mut()).enumerate() {
+            if purls.is_some() {
+                continue;
+            }
+            match snapshot.and_then(|snapshot| snapshot.derive_purls_by_name(record)) {
+                Some(snapshot_purls) => *purls = snapshot_purls,
+                None => missing.push(idx),
+            }
+        }
+        let missing_records = missing.iter().map(|&idx| records[idx]).collect_vec();
+        let missing_purls = self
+            .compressed_mapping
+            .derive_purls_many(&missing_records, cache_metrics)
+            .instrument(tracing::info_span!(
+                "derive_purls",
+                source = PurlSource::CompressedMapping.as_str(),
+                records = missing_records.len()
+            ))
+            .await?;
+        for (idx, derived_purls) in missing.into_iter().zip(missing_purls) {
+            if is_conda_forge_record(records[idx]) {
+                fetched_mappings.insert_by_name(
+                    records[idx].package_record.name.as_normalized(),
+                    derived_purls.as_deref(),
+                );
+            }
+            purls[idx] = derived_purls;
         }
 
         Ok(purls)
     }
 }
 
+/// Reports the progress of deriving the purls of a batch of records.
+async fn report_batch<T>(
+    reporter: Option<&dyn Reporter>,
+    records: &[&RepoDataRecord],
+    total_records: usize,
+    derive_purls: impl Future<Output = Result<T, MappingError>>,
+) -> miette::Result<T> {
+    if let Some(reporter) = reporter {
+        for record in records {
+            reporter.download_started(record, total_records);
+        }
+    }
+
+    let result = derive_purls.await;
+
+    if let Some(reporter) = reporter {
+        for record in records {
+            if result.is_ok() {
+                reporter.download_finished(record, total_records);
+            } else {
+                reporter.download_failed(record, total_records);
+            }
+        }
+    }
+
+    result.into_diagnostic()
+}
+
 /// Returns true if the record has a pypi purl.
 fn has_pypi_purl(record: &RepoDataRecord) -> bool {
     record
@@ -374,6 +568,23 @@ trait DerivePurls {
         record: &RepoDataRecord,
         _cache_metrics: &CacheMetrics,
     ) -> Result<Option<Vec<PackageUrl>>, MappingError>;
+
+    /// Derives purls for a batch of records. The result contains the derived
+    /// purls of each record, in the same order as the records.
+    ///
+    /// By default the purls of all records are derived concurrently.
+    async fn derive_purls_many(
+        &self,
+        records: &[&RepoDataRecord],
+        cache_metrics: &CacheMetrics,
+    ) -> Result<Vec<Option<Vec<PackageUrl>>>, MappingError> {
+        futures::future::try_join_all(
+            records
+                .iter()
+                .map(|record| self.derive_purls(record, cache_metrics)),
+        )
+        .await
+    }
 }
 
 /// A struct that provides derived package urls for conda-forge records where
@@ -129,23 +129,53 @@ impl DerivePurls for CompressedMappingClient {
         // Get the mapping from the server
         let mapping = self.get_mapping(cache_metrics).await?;
 
-        // Determine the mapping for the record
-        let Some(potential_pypi_name) = mapping.get(record.package_record.name.as_normalized())
-        else {
-            return Ok(None);
-        };
+        Ok(derive_purls_from_mapping(mapping, record))
+    }
 
-        // If the mapping is empty, there are no purls.
-        let Some(pypi_name) = potential_pypi_name else {
-            return Ok(Some(vec![]));
-        };
+    async fn derive_purls_many(
+        &self,
+        records: &[&RepoDataRecord],
+        cache_metrics: &CacheMetrics,
+    ) -> Result<Vec<Option<Vec<PackageUrl>>>, MappingError> {
+        // Avoid fetching the mapping if none of the records can be in it.
+        if !records.iter().any(|record| is_conda_forge_record(record)) {
+            return Ok(vec![None; records.len()]);
+        }
 
-        // Construct the purl
-        let purl = PackageUrl::builder(String::from("pypi"), pypi_name)
-            .with_qualifier("source", PurlSource::CompressedMapping.as_str())
-            .expect("valid qualifier");
-        let built_purl = purl.build().expect("valid pypi package url");
+        // Get the mapping from the server once for all records
+        let mapping = self.get_mapping(cache_metrics).await?;
 
-        Ok(Some(vec![built_purl]))
+        Ok(records
+            .iter()
+            .map(|record| {
+                if is_conda_forge_record(record) {
+                    derive_purls_from_mapping(mapping, record)
+                } else {
+                    None
+                }
+            })
+            .collect())
     }
 }
+
+/// Determines the purls of a conda-forge record from the compressed mapping.
+fn derive_purls_from_mapping(
+    mapping: &CompressedMapping,
+    record: &RepoDataRecord,
+) -> Option<Vec<PackageUrl>> {
+    // Determine the mapping for the record
+    let potential_pypi_name = mapping.get(record.package_record.name.as_normalized())?;
+
+    // If the mapping is empty, there are no purls.
+    let Some(pypi_name) = potential_pypi_name else {
+        return Some(vec![]);
+    };
+
+    // Construct the purl
+    let purl = PackageUrl::builder(String::from("pypi"), pypi_name)
+        .with_qualifier("source", PurlSource::CompressedMapping.as_str())
+        .expect("valid qualifier");
+    let built_purl = purl.build().expect("valid pypi package url");
+
+    Some(vec![built_purl])
+}
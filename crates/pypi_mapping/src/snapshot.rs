@@ -0,0 +1,499 @@
+//! A compact snapshot of the conda to pypi mapping that is stored on disk and
+//! memory-mapped, so purls can be derived without any network requests.
+//!
+//! The snapshot contains two sorted tables: one keyed by the sha256 of a conda
+//! package, which mirrors the [`crate::prefix::HashMappingClient`], and one
+//! keyed by the normalized name of a conda-forge package, which mirrors the
+//! [`crate::prefix::CompressedMappingClient`]. A lookup is a binary search over
+//! fixed-size entries, so opening a snapshot doesn't require parsing it.
+//!
+//! The name table is only consulted for records that are not in the hash
+//! mapping, like the clients do: a package with a sha256 is only looked up by
+//! name after the hash mapping reported that it doesn't know the package. The
+//! snapshot also records the packages that a mapping doesn't contain, so
+//! packages from other channels and new builds resolve without network
+//! requests as well.
+//!
+//! The mappings change over time, so a snapshot expires: it records when its
+//! oldest entry was fetched, and an expired snapshot is rebuilt from fresh
+//! network requests. It is only used when those requests fail.
+//!
+//! All integers are stored little-endian. The file starts with a header
+//! (`MAGIC`, the creation time in seconds since the unix epoch as `u64`, the
+//! number of hash entries and the number of name entries as `u32`), followed
+//! by the hash entries (sha256, offset and length of the value), the name
+//! entries (offset and length of the name, offset and length of the value) and
+//! finally the strings that are referenced by the entries. A value contains the
+//! pypi names separated by newlines, an empty value means that the package is
+//! known to not be a pypi package. A value with the length `u32::MAX` means
+//! that the mapping doesn't contain the package.
+
+use std::{
+    collections::BTreeMap,
+    io::{self, Write},
+    path::Path,
+    time::{Duration, SystemTime, UNIX_EPOCH},
+};
+
+use rattler_conda_types::{PackageUrl, RepoDataRecord};
+use rattler_digest::Sha256Hash;
+
+use crate::{PurlSource, is_conda_forge_record};
+
+/// Identifies the file format, and its version.
+const MAGIC: &[u8; 8] = b"PXPYMAP3";
+const HEADER_LEN: usize = MAGIC.len() + 8 + 2 * 4;
+const HASH_ENTRY_LEN: usize = 32 + 2 * 4;
+const NAME_ENTRY_LEN: usize = 4 * 4;
+/// The length of a value that marks a package that the mapping doesn't
+/// contain.
+const UNMAPPED: usize = u32::MAX as usize;
+
+/// A memory-mapped conda to pypi mapping snapshot.
+pub struct MappingSnapshot {
+    data: memmap2::Mmap,
+    created: u64,
+    hash_count: usize,
+    name_count: usize,
+}
+
+fn read_u32(data: &[u8], offset: usize) -> usize {
+    let bytes = data[offset..offset + 4]
+        .try_into()
+        .expect("slice has the length of an u32");
+    u32::from_le_bytes(bytes) as usize
+}
+
+fn unix_time_now() -> u64 {
+    SystemTime::now()
+        .duration_since(UNIX_EPOCH)
+        .map_or(0, |duration| duration.as_secs())
+}
+
+fn invalid_data(message: &str) -> io::Error {
+    io::Error::new(io::ErrorKind::InvalidData, message)
+}
+
+impl MappingSnapshot {
+    /// Opens the snapshot at `path`. Returns `None` if there is no snapshot.
+    pub fn open(path: &Path) -> io::Result<Option<Self>> {
+        let file = match fs_err::File::open(path) {
+            Ok(file) => file,
+            Err(err) if err.kind() == io::ErrorKind::NotFound => return Ok(None),
+            Err(err) => return Err(err),
+        };
+
+        // SAFETY: The snapshot is only ever replaced atomically and never modified in
+        // place, so the mapped contents don't change while they are in use.
+        let data = unsafe { memmap2::Mmap::map(file.file())? };
+
+        if data.len() < HEADER_LEN || &data[..MAGIC.len()] != MAGIC {
+            return Err(invalid_data("not a pypi mapping snapshot"));
+        }
+        let created = u64::from_le_bytes(
+            data[MAGIC.len()..MAGIC.len() + 8]
+                .try_into()
+                .expect("slice has the length of an u64"),
+        );
+        let hash_count = read_u32(&data, MAGIC.len() + 8);
+        let name_count = read_u32(&data, MAGIC.len() + 12);
+        if data.len() < HEADER_LEN + hash_count * HASH_ENTRY_LEN + name_count * NAME_ENTRY_LEN {
+            return Err(invalid_data("the pypi mapping snapshot is truncated"));
+        }
+
+        Ok(Some(Self {
+            data,
+            created,
+            hash_count,
+            name_count,
+        }))
+    }
+
+    /// Returns true if the oldest entry of the snapshot was fetched at least
+    /// `max_age` ago.
+    pub fn is_expired(&self, max_age: Duration) -> bool {
+        unix_time_now().saturating_sub(self.created) >= max_age.as_secs()
+    }
+
+    fn strings_start(&self) -> usize {
+        HEADER_LEN + self.hash_count * HASH_ENTRY_LEN + self.name_count * NAME_ENTRY_LEN
+    }
+
+    /// Returns the string at the given offset in the string table, or `None`
+    /// if the snapshot is corrupt.
+    fn string(&self, offset: usize, len: usize) -> Option<&str> {
+        let start = self.strings_start().checked_add(offset)?;
+        let bytes = self.data.get(start..start.checked_add(len)?)?;
+        std::str::from_utf8(bytes).ok()
+    }
+
+    /// Returns the value at the given offset in the string table. The inner
+    /// `None` means that the mapping doesn't contain the package.
+    fn value(&self, offset: usize, len: usize) -> Option<Option<&str>> {
+        if len == UNMAPPED {
+            return Some(None);
+        }
+        self.string(offset, len).map(Some)
+    }
+
+    fn hash_entry(&self, idx: usize) -> (&[u8], usize, usize) {
+        let entry = HEADER_LEN + idx * HASH_ENTRY_LEN;
+        (
+            &self.data[entry..entry + 32],
+            read_u32(&self.data, entry + 32),
+            read_u32(&self.data, entry + 36),
+        )
+    }
+
+    fn name_entry(&self, idx: usize) -> Option<(&str, usize, usize)> {
+        let entry = HEADER_LEN + self.hash_count * HASH_ENTRY_LEN + idx * NAME_ENTRY_LEN;
+        let name = self.string(read_u32(&self.data, entry), read_u32(&self.data, entry + 4))?;
+        Some((
+            name,
+            read_u32(&self.data, entry + 8),
+            read_u32(&self.data, entry + 12),
+        ))
+    }
+
+    /// Returns the pypi names of the package with the given sha256, separated
+    /// by newlines, or `None` if the package is not in the snapshot. The inner
+    /// `None` means that the hash mapping doesn't contain the package.
+    fn by_hash(&self, sha256: &Sha256Hash) -> Option<Option<&str>> {
+        let (mut low, mut high) = (0, self.hash_count);
+        while low < high {
+            let mid = low + (high - low) / 2;
+            let (hash, offset, len) = self.hash_entry(mid);
+            match hash.cmp(sha256.as_slice()) {
+                std::cmp::Ordering::Less => low = mid + 1,
+                std::cmp::Ordering::Greater => high = mid,
+                std::cmp::Ordering::Equal => return self.value(offset, len),
+            }
+        }
+        None
+    }
+
+    /// Returns the pypi names of the conda-forge package with the given
+    /// normalized name, or `None` if the package is not in the snapshot. The
+    /// inner `None` means that the compressed mapping doesn't contain the
+    /// package.
+    fn by_name(&self, name: &str) -> Option<Option<&str>> {
+        let (mut low, mut high) = (0, self.name_count);
+        while low < high {
+            let mid = low + (high - low) / 2;
+            let (entry_name, offset, len) = self.name_entry(mid)?;
+            match entry_name.cmp(name) {
+                std::cmp::Ordering::Less => low = mid + 1,
+                std::cmp::Ordering::Greater => high = mid,
+                std::cmp::Ordering::Equal => return self.value(offset, len),
+            }
+        }
+        None
+    }
+
+    /// Derives the purls of a record from the snapshot. Returns `None` if the
+    /// snapshot doesn't know the record, otherwise the purls that the mappings
+    /// derive for it, which are `None` if no mapping contains the record.
+    ///
+    /// Records with a sha256 are looked up in the hash table first, the name
+    /// table only applies if the hash mapping doesn't contain the record, see
+    /// [`MappingSnapshot::derive_purls_by_name`]. Records without a sha256
+    /// can't be in the hash mapping, so they are looked up by name directly.
+    pub fn derive_purls(&self, record: &RepoDataRecord) -> Option<Option<Vec<PackageUrl>>> {
+        if let Some(sha256) = record.package_record.sha256 {
+            if let Some(names) = self.by_hash(&sha256)? {
+                return Some(Some(build_purls(names, PurlSource::HashMapping)));
+            }
+        }
+        self.derive_purls_by_name(record)
+    }
+
+    /// Derives the purls of a record from the name table, like
+    /// [`MappingSnapshot::derive_purls`]. This should only be used for
+    /// records that the hash mapping doesn't contain.
+    pub fn derive_purls_by_name(&self, record: &RepoDataRecord) -> Option<Option<Vec<PackageUrl>>> {
+        // The compressed mapping only contains conda-forge packages
+        if !is_conda_forge_record(record) {
+            return Some(None);
+        }
+        self.by_name(record.package_record.name.as_normalized())
+            .map(|names| names.map(|names| build_purls(names, PurlSource::CompressedMapping)))
+    }
+}
+
+fn build_purls(names: &str, source: PurlSource) -> Vec<PackageUrl> {
+    names
+        .lines()
+        .map(|pypi_name| {
+            PackageUrl::builder(String::from("pypi"), pypi_name)
+                .with_qualifier("source", source.as_str())
+                .expect("valid qualifier")
+                .build()
+                .expect("valid pypi package url")
+        })
+        .collect()
+}
+
+fn pypi_names(purls: &[PackageUrl]) -> String {
+    purls
+        .iter()
+        .map(|purl| purl.name())
+        .collect::<Vec<_>>()
+        .join("\n")
+}
+
+/// Collects the entries of a [`MappingSnapshot`] and writes them to disk.
+#[derive(Default)]
+pub struct MappingSnapshotBuilder {
+    /// The creation time of the snapshot that is extended, `None` for a new
+    /// snapshot.
+    created: Option<u64>,
+    hashes: BTreeMap<Sha256Hash, Option<String>>,
+    names: BTreeMap<String, Option<String>>,
+}
+
+impl MappingSnapshotBuilder {
+    /// Constructs a builder that contains all the entries of an existing
+    /// snapshot. The written snapshot keeps the creation time of the existing
+    /// one, so extending a snapshot doesn't extend the lifetime of its entries.
+    pub fn from_snapshot(snapshot: &MappingSnapshot) -> Self {
+        let mut builder = Self {
+            created: Some(snapshot.created),
+            ..Self::default()
+        };
+        for idx in 0..snapshot.hash_count {
+            let (hash, offset, len) = snapshot.hash_entry(idx);
+            if let Some(names) = snapshot.value(offset, len) {
+                builder.hashes.insert(
+                    Sha256Hash::clone_from_slice(hash),
+                    names.map(str::to_string),
+                );
+            }
+        }
+        for idx in 0..snapshot.name_count {
+            if let Some((name, names)) = snapshot
+                .name_entry(idx)
+                .and_then(|(name, offset, len)| Some((name, snapshot.value(offset, len)?)))
+            {
+                builder
+                    .names
+                    .insert(name.to_string(), names.map(str::to_string));
+            }
+        }
+        builder
+    }
+
+    /// Returns true if the builder doesn't contain any entries.
+    pub fn is_empty(&self) -> bool {
+        self.hashes.is_empty() && self.names.is_empty()
+    }
+
+    /// Records the purls that the hash mapping derived for the package with
+    /// the given sha256, `None` if the hash mapping doesn't contain it.
+    pub fn insert_by_hash(&mut self, sha256: Sha256Hash, purls: Option<&[PackageUrl]>) {
+        self.hashes.insert(sha256, purls.map(pypi_names));
+    }
+
+    /// Records the purls that the compressed mapping derived for the
+    /// conda-forge package with the given normalized name, `None` if the
+    /// compressed mapping doesn't contain it.
+    pub fn insert_by_name(&mut self, name: &str, purls: Option<&[PackageUrl]>) {
+        self.names.insert(name.to_string(), purls.map(pypi_names));
+    }
+
+    /// Adds all entries of `other` to this builder.
+    pub fn extend(&mut self, other: Self) {
+        self.hashes.extend(other.hashes);
+        self.names.extend(other.names);
+    }
+
+    /// Writes the snapshot to `path`. The file is replaced atomically, so
+    /// concurrent processes never read a partially written snapshot.
+    pub fn write(&self, path: &Path) -> io::Result<()> {
+        let too_large = || invalid_data("the pypi mapping snapshot is too large");
+        let to_u32 = |value: usize| u32::try_from(value).map_err(|_| too_large());
+
+        let mut strings = Vec::new();
+        let mut push_string = |value: Option<&str>| -> io::Result<[u8; 8]> {
+            let offset = to_u32(strings.len())?;
+            let len = match value {
+                Some(value) if value.len() < UNMAPPED => {
+                    strings.extend_from_slice(value.as_bytes());
+                    value.len() as u32
+                }
+                Some(_) => return Err(too_large()),
+                None => UNMAPPED as u32,
+            };
+            let mut entry = [0; 8];
+            entry[..4].copy_from_slice(&offset.to_le_bytes());
+            entry[4..].copy_from_slice(&len.to_le_bytes());
+            Ok(entry)
+        };
+
+        let mut contents = Vec::with_capacity(
+            HEADER_LEN + self.hashes.len() * HASH_ENTRY_LEN + self.names.len() * NAME_ENTRY_LEN,
+        );
+        contents.extend_from_slice(MAGIC);
+        contents.extend_from_slice(&self.created.unwrap_or_else(unix_time_now).to_le_bytes());
+        contents.extend_from_slice(&to_u32(self.hashes.len())?.to_le_bytes());
+        contents.extend_from_slice(&to_u32(self.names.len())?.to_le_bytes());
+        for (sha256, names) in &self.hashes {
+            contents.extend_from_slice(sha256);
+            contents.extend_from_slice(&push_string(names.as_deref())?);
+        }
+        for (name, names) in &self.names {
+            contents.extend_from_slice(&push_string(Some(name))?);
+            contents.extend_from_slice(&push_string(names.as_deref())?);
+        }
+        contents.extend_from_slice(&strings);
+
+        let folder = path.parent().expect("the snapshot is stored in a folder");
+        fs_err::create_dir_all(folder)?;
+        let mut file = tempfile::NamedTempFile::new_in(folder)?;
+        file.write_all(&contents)?;
+        file.persist(path).map_err(|err| err.error)?;
+        Ok(())
+    }
+}
+
+#[cfg(test)]
+mod test {
+    use rattler_conda_types::{PackageName, PackageRecord, Version};
+    use url::Url;
+
+    use super::*;
+
+    fn record(name: &str, sha256: Option<Sha256Hash>) -> RepoDataRecord {
+        let mut package_record = PackageRecord::new(
+            PackageName::new_unchecked(name),
+            Version::major(1),
+            "0".to_string(),
+        );
+        package_record.sha256 = sha256;
+        RepoDataRecord {
+            package_record,
+            file_name: format!("{name}-1-0.conda"),
+            url: Url::parse(&format!(
+                "https://conda.anaconda.org/conda-forge/noarch/{name}-1-0.conda"
+            ))
+            .unwrap(),
+            channel: Some("https://conda.anaconda.org/conda-forge".to_string()),
+        }
+    }
+
+    fn purls(names: &[&str], source: PurlSource) -> Vec<PackageUrl> {
+        build_purls(&names.join("\n"), source)
+    }
+
+    #[test]
+    fn snapshot_roundtrip() {
+        let dir = tempfile::tempdir().unwrap();
+        let path = dir.path().join("snapshot.bin");
+        assert!(MappingSnapshot::open(&path).unwrap().is_none());
+
+        let hashed = Sha256Hash::from([1; 32]);
+        let unmapped = Sha256Hash::from([4; 32]);
+        let mut builder = MappingSnapshotBuilder::default();
+        builder.insert_by_hash(hashed, Some(&purls(&["pillow"], PurlSource::HashMapping)));
+        builder.insert_by_hash(Sha256Hash::from([2; 32]), Some(&[]));
+        builder.insert_by_hash(unmapped, None);
+        builder.insert_by_name(
+            "numpy",
+            Some(&purls(&["numpy"], PurlSource::CompressedMapping)),
+        );
+        builder.insert_by_name("libzlib", Some(&[]));
+        builder.insert_by_name("private", None);
+        builder.write(&path).unwrap();
+
+        let snapshot = MappingSnapshot::open(&path).unwrap().unwrap();
+        assert_eq!(
+            snapshot.derive_purls(&record("pil", Some(hashed))),
+            Some(Some(purls(&["pillow"], PurlSource::HashMapping)))
+        );
+        assert_eq!(
+            snapshot.derive_purls(&record("other", Some(Sha256Hash::from([2; 32])))),
+            Some(Some(vec![]))
+        );
+        // The name table only applies once the hash mapping doesn't know the package
+        assert_eq!(
+            snapshot.derive_purls(&record("numpy", Some(Sha256Hash::from([3; 32])))),
+            None
+        );
+        assert_eq!(
+            snapshot.derive_purls(&record("numpy", Some(unmapped))),
+            Some(Some(purls(&["numpy"], PurlSource::CompressedMapping)))
+        );
+        assert_eq!(
+            snapshot.derive_purls(&record("numpy", None)),
+            Some(Some(purls(&["numpy"], PurlSource::CompressedMapping)))
+        );
+        assert_eq!(
+            snapshot.derive_purls(&record("libzlib", None)),
+            Some(Some(vec![]))
+        );
+        // Packages that no mapping contains are resolved as well
+        assert_eq!(
+            snapshot.derive_purls(&record("private", Some(unmapped))),
+            Some(None)
+        );
+        assert_eq!(snapshot.derive_purls(&record("unknown", None)), None);
+        assert_eq!(
+            snapshot.derive_purls(&record("unknown", Some(unmapped))),
+            None
+        );
+        let mut other_channel = record("unknown", Some(unmapped));
+        other_channel.channel = Some("https://example.com/private".to_string());
+        assert_eq!(snapshot.derive_purls(&other_channel), Some(None));
+
+        // Rebuilding the snapshot retains all entries
+        let rebuilt = dir.path().join("rebuilt.bin");
+        MappingSnapshotBuilder::from_snapshot(&snapshot)
+            .write(&rebuilt)
+            .unwrap();
+        assert_eq!(
+            fs_err::read(&path).unwrap(),
+            fs_err::read(&rebuilt).unwrap()
+        );
+    }
+
+    #[test]
+    fn snapshot_expires() {
+        let dir = tempfile::tempdir().unwrap();
+        let path = dir.path().join("snapshot.bin");
+        let max_age = Duration::from_secs(60 * 60);
+
+        let mut builder = MappingSnapshotBuilder::default();
+        builder.insert_by_name(
+            "numpy",
+            Some(&purls(&["numpy"], PurlSource::CompressedMapping)),
+        );
+        builder.write(&path).unwrap();
+        let snapshot = MappingSnapshot::open(&path).unwrap().unwrap();
+        assert!(!snapshot.is_expired(max_age));
+
+        // Extending an old snapshot keeps its creation time
+        let mut builder = MappingSnapshotBuilder::from_snapshot(&snapshot);
+        builder.created = Some(unix_time_now() - 2 * max_age.as_secs());
+        drop(snapshot);
+        builder.write(&path).unwrap();
+        let snapshot = MappingSnapshot::open(&path).unwrap().unwrap();
+        assert!(snapshot.is_expired(max_age));
+
+        let mut builder = MappingSnapshotBuilder::from_snapshot(&snapshot);
+        builder.insert_by_name(
+            "pillow",
+            Some(&purls(&["pillow"], PurlSource::CompressedMapping)),
+        );
+        drop(snapshot);
+        builder.write(&path).unwrap();
+        let snapshot = MappingSnapshot::open(&path).unwrap().unwrap();
+        assert!(snapshot.is_expired(max_age));
+    }
+
+    #[test]
+    fn invalid_snapshot_is_rejected() {
+        let dir = tempfile::tempdir().unwrap();
+        let path = dir.path().join("snapshot.bin");
+        fs_err::write(&path, b"{}").unwrap();
+        assert!(MappingSnapshot::open(&path).is_err());
+    }
+}
@@ -3,7 +3,6 @@
 from __future__ import annotations
 
 import json
-from copy import deepcopy
 from pathlib import Path
 import tomllib
 from typing import Annotated, Any, Literal, ClassVar, override
@@ -935,35 +934,85 @@ class SchemaJsonEncoder(json.JSONEncoder):
     def encode(self, o: object):
         """Overload the default ``encode`` behavior."""
         if isinstance(o, dict):
-            o = self.normalize_schema(deepcopy(o))  # pyright: ignore[reportUnknownArgumentType]
+            o = self.normalize_schema(o)  # pyright: ignore[reportUnknownArgumentType]
 
         return super().encode(o)
 
     def normalize_schema(self, obj: dict[str, Any]) -> dict[str, Any]:
-        """Recursively normalize and apply an arbitrary sort order to a schema."""
-        self.strip_nulls(obj)
+        """Normalize and apply an arbitrary sort order to a schema, without modifying it.
+
+        Every schema object is normalized once: results are memoized by the identity of
+        the input, and normalized objects that are nested again are reused as-is.
+        """
+        return self._normalize(obj, {}, set())
+
+    def _normalize(
+        self,
+        obj: dict[str, Any],
+        memo: dict[int, tuple[dict[str, Any], dict[str, Any]]],
+        normalized: set[int],
+    ) -> dict[str, Any]:
+        if id(obj) in normalized:
+            return obj
+        if id(obj) in memo:
+            return memo[id(obj)][1]
+
+        result = self._normalize_once(obj, memo, normalized)
+        # Keep the input alive, so its `id` can't be reused during the walk
+        memo[id(obj)] = (obj, result)
+        normalized.add(id(result))
+        return result
+
+    def _normalize_once(
+        self,
+        source: dict[str, Any],
+        memo: dict[int, tuple[dict[str, Any], dict[str, Any]]],
+        normalized: set[int],
+    ) -> dict[str, Any]:
+        obj = dict(source)
+
+        # Remove unrepresentable-in-TOML ``"anyOf":{"type": null}`` values
+        if "default" in obj and obj["default"] is None:
+            obj.pop("default")
+
+        for nest in self.SORT_NESTED_ARR:
+            some_of = [
+                self._normalize(option, memo, normalized)
+                for option in obj.get(nest, [])
+                if option.get("type") != "null"
+            ]
+
+            if some_of:
+                obj[nest] = some_of
+                if len(some_of) == 1:
+                    obj.update(some_of[0])
+                    obj.pop(nest)
 
         for nest in self.SORT_NESTED:
             if nest in obj:
-                obj[nest] = self.normalize_schema(obj[nest])
+                obj[nest] = self._normalize(obj[nest], memo, normalized)
 
         for nest in self.SORT_NESTED_OBJ:
-            obj = self.sort_nested(obj, nest)
+            if isinstance(obj.get(nest), dict):
+                obj[nest] = {
+                    k: self._normalize(v, memo, normalized) if isinstance(v, dict) else v  # pyright: ignore[reportUnknownArgumentType]
+                    for k, v in sorted(obj[nest].items(), key=lambda kv: kv[0])
+                }
 
         for nest in self.SORT_NESTED_OBJ_OBJ:
             if nest in obj:
                 obj[nest] = {
-                    k: self.normalize_schema(v)
+                    k: self._normalize(v, memo, normalized)
                     for k, v in sorted(obj[nest].items(), key=lambda kv: kv[0])
                 }
 
         for nest in self.SORT_NESTED_ARR:
             if nest in obj:
-                obj[nest] = [self.normalize_schema(item) for item in obj[nest]]
+                obj[nest] = [self._normalize(item, memo, normalized) for item in obj[nest]]
 
         for nest in self.SORT_NESTED_MAYBE_OBJ:
             if isinstance(obj.get(nest), dict):
-                obj[nest] = self.normalize_schema(obj[nest])
+                obj[nest] = self._normalize(obj[nest], memo, normalized)
 
         header = {}
         footer = {}
@@ -978,37 +1027,6 @@ class SchemaJsonEncoder(json.JSONEncoder):
 
         return {**header, **dict(sorted(obj.items())), **footer}
 
-    def strip_nulls(self, obj: dict[str, Any]) -> dict[str, Any]:
-        """Remove unrepresentable-in-TOML ``"anyOf":{"type": null}`` values."""
-
-        if "default" in obj and obj["default"] is None:
-            obj.pop("default")
-
-        for nest in self.SORT_NESTED_ARR:
-            some_of = [
-                self.normalize_schema(option)
-                for option in obj.get(nest, [])
-                if option.get("type") != "null"
-            ]
-
-            if some_of:
-                obj[nest] = some_of
-                if len(some_of) == 1:
-                    obj.update(some_of[0])
-                    obj.pop(nest)
-
-        return obj
-
-    def sort_nested(self, obj: dict[str, Any], key: str) -> dict[str, Any]:
-        """Sort a key of an object."""
-        if key not in obj or not isinstance(obj[key], dict):
-            return obj
-        obj[key] = {
-            k: self.normalize_schema(v) if isinstance(v, dict) else v  # pyright: ignore[reportUnknownArgumentType]
-            for k, v in sorted(obj[key].items(), key=lambda kv: kv[0])
-        }
-        return obj
-
 
 ##########################
 # Command Line Interface #
@@ -1,15 +1,23 @@
 # pyright: reportUnknownMemberType=false, reportUnknownVariableType=false, reportMissingParameterType=false, reportUnknownParameterType=false, reportUnknownArgumentType=false
 
 import glob
+import hashlib
 import json
 import tomllib
 
+from collections.abc import Callable, Iterator
 from pathlib import Path
-from typing import Any
+from typing import Any, cast
 
 import pytest
 import jsonschema
 
+try:
+    # Optional, compiles the schema to python code which validates a lot faster
+    import fastjsonschema  # pyright: ignore[reportMissingImports]
+except ImportError:
+    fastjsonschema = None
+
 HERE = Path(__file__).parent
 EXAMPLES = HERE / "examples"
 DOC_EXAMPLES = HERE.joinpath("..", "docs", "source_files", "pixi_tomls")
@@ -17,13 +25,21 @@ VALID = {ex.stem: ex for ex in (EXAMPLES / "valid").glob("*.toml")} | {
     ex.stem: ex for ex in DOC_EXAMPLES.glob("*.toml")
 }
 INVALID = {ex.stem: ex for ex in (EXAMPLES / "invalid").glob("*.toml")}
+# Hashes of the manifests that passed validation, per hash of the schema
+VALIDATION_CACHE = HERE / ".validation-cache.json"
+
+VALIDATION_ERRORS: tuple[type[Exception], ...] = (jsonschema.ValidationError,) + (
+    (fastjsonschema.JsonSchemaValueException,) if fastjsonschema is not None else ()
+)
+
+
+def _digest(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
 
 
 @pytest.fixture(scope="module", params=VALID)
-def valid_manifest(request) -> dict[str, Any]:
-    manifest = VALID[request.param].read_text()
-    manifest_toml = tomllib.loads(manifest)
-    return manifest_toml
+def valid_manifest(request) -> str:
+    return VALID[request.param].read_text()
 
 
 @pytest.fixture(scope="module", params=INVALID)
@@ -47,30 +63,72 @@ def real_manifest_path(request):
 
 
 @pytest.fixture(scope="session")
-def manifest_schema():
-    with open("schema.json") as f:
-        schema = json.load(f)
-    return schema
+def schema_source() -> bytes:
+    with open("schema.json", "rb") as f:
+        return f.read()
 
 
 @pytest.fixture(scope="session")
-def validator(manifest_schema):
+def manifest_schema(schema_source):
+    return json.loads(schema_source)
+
+
+@pytest.fixture(scope="session")
+def validator(manifest_schema) -> Callable[[dict[str, Any]], Any]:
+    """The schema validator, compiled once per session"""
+    if fastjsonschema is not None:
+        # `jsonschema` doesn't check formats by default either
+        return cast(
+            Callable[[dict[str, Any]], Any],
+            fastjsonschema.compile(manifest_schema, use_formats=False),
+        )
     validator_cls = jsonschema.validators.validator_for(manifest_schema)  # pyright: ignore[reportAttributeAccessIssue]
-    return validator_cls(manifest_schema)
+    return validator_cls(manifest_schema).validate
+
+
+@pytest.fixture(scope="session")
+def validated_manifests(schema_source) -> Iterator[set[str]]:
+    """Hashes of the manifests known to be valid against the current schema.
+
+    Only successful validations are stored, invalid manifests are always validated again.
+    """
+    schema_hash = _digest(schema_source)
+    cache: dict[str, list[str]] = {}
+    try:
+        cache = json.loads(VALIDATION_CACHE.read_text())
+    except (OSError, ValueError):
+        pass
+
+    validated = set(cache.get(schema_hash, []))
+    yield validated
+
+    # Entries for older schemas can never be hit again
+    VALIDATION_CACHE.write_text(json.dumps({schema_hash: sorted(validated)}))
 
 
-def test_manifest_schema_valid(validator, valid_manifest):
-    validator.validate(valid_manifest)
+@pytest.fixture(scope="session")
+def validate_cached(validator, validated_manifests) -> Callable[[str], None]:
+    def validate(manifest: str) -> None:
+        manifest_hash = _digest(manifest.encode())
+        if manifest_hash in validated_manifests:
+            return
+        validator(tomllib.loads(manifest))
+        validated_manifests.add(manifest_hash)
+
+    return validate
+
+
+def test_manifest_schema_valid(validate_cached, valid_manifest):
+    validate_cached(valid_manifest)
 
 
 def test_manifest_schema_invalid(validator, invalid_manifest):
-    with pytest.raises(jsonschema.ValidationError):
-        validator.validate(invalid_manifest)
+    with pytest.raises(VALIDATION_ERRORS):
+        validator(invalid_manifest)
 
 
-def test_real_manifests(real_manifest_path, validator):
+def test_real_manifests(real_manifest_path, validate_cached):
     print(real_manifest_path)
     with open(real_manifest_path) as f:
         manifest = f.read()
-    manifest_toml = tomllib.loads(manifest)
-    validator.validate(manifest_toml)
+    validate_cached(manifest)
@@ -0,0 +1,121 @@
+# pyright: reportUnknownMemberType=false, reportUnknownVariableType=false, reportUnknownArgumentType=false
+
+import json
+import time
+
+from copy import deepcopy
+from typing import Any, override
+
+import pytest
+
+from model import BaseManifest, SchemaJsonEncoder  # pyright: ignore[reportImplicitRelativeImport]
+
+
+def _reference_normalize(obj: dict[str, Any]) -> dict[str, Any]:
+    """The original in-place, multi-pass normalizer, used to guard the output of the new one."""
+    encoder = SchemaJsonEncoder
+
+    def strip_nulls(obj: dict[str, Any]) -> None:
+        if "default" in obj and obj["default"] is None:
+            obj.pop("default")
+        for nest in encoder.SORT_NESTED_ARR:
+            some_of = [
+                normalize(option) for option in obj.get(nest, []) if option.get("type") != "null"
+            ]
+            if some_of:
+                obj[nest] = some_of
+                if len(some_of) == 1:
+                    obj.update(some_of[0])
+                    obj.pop(nest)
+
+    def sort_nested(obj: dict[str, Any], key: str) -> dict[str, Any]:
+        if key not in obj or not isinstance(obj[key], dict):
+            return obj
+        obj[key] = {
+            k: normalize(v) if isinstance(v, dict) else v
+            for k, v in sorted(obj[key].items(), key=lambda kv: kv[0])
+        }
+        return obj
+
+    def normalize(obj: dict[str, Any]) -> dict[str, Any]:
+        strip_nulls(obj)
+        for nest in encoder.SORT_NESTED:
+            if nest in obj:
+                obj[nest] = normalize(obj[nest])
+        for nest in encoder.SORT_NESTED_OBJ:
+            obj = sort_nested(obj, nest)
+        for nest in encoder.SORT_NESTED_OBJ_OBJ:
+            if nest in obj:
+                obj[nest] = {
+                    k: normalize(v) for k, v in sorted(obj[nest].items(), key=lambda kv: kv[0])
+                }
+        for nest in encoder.SORT_NESTED_ARR:
+            if nest in obj:
+                obj[nest] = [normalize(item) for item in obj[nest]]
+        for nest in encoder.SORT_NESTED_MAYBE_OBJ:
+            if isinstance(obj.get(nest), dict):
+                obj[nest] = normalize(obj[nest])
+        header = {key: obj.pop(key) for key in encoder.HEADER_ORDER if key in obj}
+        footer = {key: obj.pop(key) for key in encoder.FOOTER_ORDER if key in obj}
+        return {**header, **dict(sorted(obj.items())), **footer}
+
+    return normalize(deepcopy(obj))
+
+
+class CountingEncoder(SchemaJsonEncoder):
+    calls: int = 0
+
+    @override
+    def _normalize_once(self, *args: Any, **kwargs: Any) -> dict[str, Any]:
+        self.calls += 1
+        return super()._normalize_once(*args, **kwargs)
+
+
+def _count_schema_objects(obj: object) -> int:
+    if isinstance(obj, dict):
+        return 1 + sum(_count_schema_objects(value) for value in obj.values())
+    if isinstance(obj, list):
+        return sum(_count_schema_objects(item) for item in obj)
+    return 0
+
+
+@pytest.fixture(scope="module")
+def raw_schema() -> dict[str, Any]:
+    return BaseManifest.model_json_schema()
+
+
+def test_normalize_matches_reference(raw_schema: dict[str, Any]) -> None:
+    expected = json.dumps(_reference_normalize(raw_schema), indent=2)
+    assert json.dumps(raw_schema, indent=2, cls=SchemaJsonEncoder) == expected
+
+
+def test_normalize_does_not_modify_input(raw_schema: dict[str, Any]) -> None:
+    original = deepcopy(raw_schema)
+    SchemaJsonEncoder().normalize_schema(raw_schema)
+    assert raw_schema == original
+
+
+def test_normalize_visits_each_schema_once(raw_schema: dict[str, Any]) -> None:
+    encoder = CountingEncoder()
+    encoder.normalize_schema(raw_schema)
+    assert 0 < encoder.calls <= _count_schema_objects(raw_schema)
+
+
+# Wall-clock timings are noisy on shared machines, so the new normalizer may be this much
+# slower than the best run of the reference before the benchmark fails
+BENCHMARK_TOLERANCE = 1.5
+
+
+def test_normalize_benchmark(raw_schema: dict[str, Any]) -> None:
+    def best_of(normalize: Any, rounds: int = 25) -> float:
+        timings: list[float] = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            normalize(raw_schema)
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    reference = best_of(_reference_normalize)
+    current = best_of(SchemaJsonEncoder().normalize_schema)
+    print(f"normalize_schema: {current * 1000:.2f}ms, reference: {reference * 1000:.2f}ms")
+    assert current <= reference * BENCHMARK_TOLERANCE
@@ -1,12 +1,23 @@
+import codecs
+import functools
+import hashlib
+import json
 import os
 import platform
+import re
+import shutil
+import signal
 import subprocess
 import sys
+import threading
+import time
+from collections import deque
 from collections.abc import Sequence
 from enum import IntEnum
 from pathlib import Path
-from typing import override
+from typing import IO, override
 
+from filelock import FileLock
 from rattler import Platform
 
 PIXI_VERSION = "0.59.0"
@@ -33,6 +44,26 @@ class ExitCode(IntEnum):
     COMMAND_NOT_FOUND = 127
 
 
+# Wall time of every pixi invocation made through `verify_cli_command` in this process,
+# as `(subcommand, seconds)` pairs. Collected per test by the `conftest.py` fixtures.
+COMMAND_DURATIONS: list[tuple[str, float]] = []
+
+
+def pixi_subcommand(command: Sequence[Path | str]) -> str:
+    """Return the pixi subcommand of a command line, e.g. `run` for `pixi -v run task`.
+
+    Commands that don't invoke pixi are reported by the name of their executable.
+    """
+    executable = Path(command[0]).stem
+    if executable != "pixi":
+        return executable
+    for arg in command[1:]:
+        arg = str(arg)
+        if not arg.startswith("-"):
+            return arg
+    return "<none>"
+
+
 class Output:
     command: Sequence[Path | str]
     stdout: str
@@ -50,6 +81,142 @@ class Output:
         return f"command: {self.command}"
 
 
+class StreamCapture:
+    """Matches patterns against a stream of output while keeping only its tail in memory.
+
+    Text arrives in chunks. Every chunk is searched together with the last
+    `longest pattern - 1` characters of the previous chunk. That way a pattern
+    split over two chunks is still found, without keeping the full output.
+    """
+
+    def __init__(self, patterns: Sequence[str], max_size: int):
+        self.pending: set[str] = set(patterns)
+        self.found: set[str] = {pattern for pattern in self.pending if not pattern}
+        self.pending -= self.found
+        self.overlap: int = max((len(pattern) for pattern in self.pending), default=1) - 1
+        self.carry: str = ""
+        self.max_size: int = max_size
+        self.tail: deque[str] = deque()
+        self.tail_size: int = 0
+        self.truncated: bool = False
+        self.decoder: codecs.IncrementalDecoder = codecs.getincrementaldecoder("utf-8")(
+            errors="replace"
+        )
+
+    def feed(self, data: bytes, final: bool = False) -> None:
+        text = self.decoder.decode(data, final)
+        if not text:
+            return
+
+        if self.pending:
+            window = self.carry + text
+            matched = {pattern for pattern in self.pending if pattern in window}
+            self.found |= matched
+            self.pending -= matched
+            self.carry = window[-self.overlap :] if self.overlap else ""
+
+        self.tail.append(text)
+        self.tail_size += len(text)
+        while self.tail_size - len(self.tail[0]) >= self.max_size:
+            self.tail_size -= len(self.tail.popleft())
+            self.truncated = True
+
+    def read_from(self, stream: IO[bytes]) -> None:
+        # Read whatever is available instead of waiting for a full buffer
+        while chunk := os.read(stream.fileno(), 64 * 1024):
+            self.feed(chunk)
+        self.feed(b"", final=True)
+
+    def text(self) -> str:
+        text = "".join(self.tail)[-self.max_size :]
+        return f"[...truncated...]\n{text}" if self.truncated else text
+
+
+def _as_list(patterns: str | list[str] | None) -> list[str]:
+    if patterns is None:
+        return []
+    return [patterns] if isinstance(patterns, str) else patterns
+
+
+def _kill_process_tree(process: subprocess.Popen[bytes]) -> None:
+    """Kill a process started by `run_streaming` together with all of its children."""
+    if sys.platform == "win32":
+        _ = subprocess.run(
+            ["taskkill", "/F", "/T", "/PID", str(process.pid)], capture_output=True, check=False
+        )
+        process.kill()
+    else:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
+def run_streaming(
+    command: Sequence[Path | str],
+    env: dict[str, str],
+    cwd: str | Path | None,
+    stdout_patterns: Sequence[str],
+    stderr_patterns: Sequence[str],
+    stop_on: Sequence[str],
+    max_output_size: int,
+) -> tuple[StreamCapture, StreamCapture, int | None]:
+    """Run a command, matching its output while it is produced.
+
+    The process and its children are killed as soon as any pattern in `stop_on` is found
+    on either stream, in which case the returned exit code is `None`. The process runs in
+    its own process group, so children that the process started don't outlive it.
+    """
+    stdout = StreamCapture([*stdout_patterns, *stop_on], max_output_size)
+    stderr = StreamCapture([*stderr_patterns, *stop_on], max_output_size)
+
+    if sys.platform == "win32":
+        process = subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=env,
+            cwd=cwd,
+            creationflags=subprocess.CREATE_NEW_PROCESS_GROUP,
+        )
+    else:
+        process = subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=env,
+            cwd=cwd,
+            start_new_session=True,
+        )
+    assert process.stdout is not None and process.stderr is not None
+    readers = [
+        threading.Thread(target=stdout.read_from, args=(process.stdout,), daemon=True),
+        threading.Thread(target=stderr.read_from, args=(process.stderr,), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+
+    stopped = False
+    while True:
+        try:
+            process.wait(timeout=0.05)
+            break
+        except subprocess.TimeoutExpired:
+            if any(pattern in stdout.found or pattern in stderr.found for pattern in stop_on):
+                _kill_process_tree(process)
+                _ = process.wait()
+                stopped = True
+                break
+
+    for reader in readers:
+        # Children that escaped the process group may still hold the pipes open
+        reader.join(timeout=5)
+
+    # Only a process that was killed isn't checked, a process that reported a `stop_on`
+    # pattern and then exited on its own is checked like any other
+    return stdout, stderr, None if stopped else process.returncode
+
+
 def verify_cli_command(
     command: Sequence[Path | str],
     expected_exit_code: ExitCode = ExitCode.SUCCESS,
@@ -60,59 +227,138 @@ def verify_cli_command(
     env: dict[str, str] | None = None,
     cwd: str | Path | None = None,
     reset_env: bool = False,
+    stream_output: bool = False,
+    stop_on: str | list[str] | None = None,
+    max_output_size: int = 64 * 1024,
 ) -> Output:
+    """Run a command and verify its exit code and output.
+
+    With `stream_output` the output is matched while it arrives and only the last
+    `max_output_size` characters of each stream are kept, for the assertion messages
+    and the returned `Output`. The output is then only printed when an assertion fails.
+    When any of the `stop_on` patterns shows up the process is killed, and its exit code
+    is not checked, use this to stop as soon as an expected error is reported.
+    """
     base_env = {} if reset_env else dict(os.environ)
     complete_env = base_env if env is None else base_env | env
     # Set `PIXI_NO_WRAP` to avoid to have miette wrapping lines
     complete_env |= {"PIXI_NO_WRAP": "1"}
 
-    process = subprocess.run(
-        command,
-        capture_output=True,
-        env=complete_env,
-        cwd=cwd,
-    )
-    # Decode stdout and stderr explicitly using UTF-8
-    stdout = process.stdout.decode("utf-8", errors="replace")
-    stderr = process.stderr.decode("utf-8", errors="replace")
-    returncode = process.returncode
-    output = Output(command, stdout, stderr, returncode)
-    print(f"command: {command}, stdout: {stdout}, stderr: {stderr}, code: {returncode}")
-    assert returncode == expected_exit_code, (
-        f"Return code was {returncode}, expected {expected_exit_code}, stderr: {stderr}"
-    )
-
-    if stdout_contains:
-        if isinstance(stdout_contains, str):
-            stdout_contains = [stdout_contains]
-        for substring in stdout_contains:
-            assert substring in stdout, f"'{substring}'\n not found in stdout:\n {stdout}"
-
-    if stdout_excludes:
-        if isinstance(stdout_excludes, str):
-            stdout_excludes = [stdout_excludes]
-        for substring in stdout_excludes:
-            assert substring not in stdout, (
-                f"'{substring}'\n unexpectedly found in stdout:\n {stdout}"
-            )
+    stdout_contains = _as_list(stdout_contains)
+    stdout_excludes = _as_list(stdout_excludes)
+    stderr_contains = _as_list(stderr_contains)
+    stderr_excludes = _as_list(stderr_excludes)
+    stop_on = _as_list(stop_on)
+    assert stream_output or not stop_on, "`stop_on` requires `stream_output`"
+
+    start = time.perf_counter()
+    if stream_output:
+        stdout_capture, stderr_capture, returncode = run_streaming(
+            command,
+            complete_env,
+            cwd,
+            [*stdout_contains, *stdout_excludes],
+            [*stderr_contains, *stderr_excludes],
+            stop_on,
+            max_output_size,
+        )
+        COMMAND_DURATIONS.append((pixi_subcommand(command), time.perf_counter() - start))
+        stdout = stdout_capture.text()
+        stderr = stderr_capture.text()
+        stdout_found = stdout_capture.found
+        stderr_found = stderr_capture.found
+    else:
+        process = subprocess.run(
+            command,
+            capture_output=True,
+            env=complete_env,
+            cwd=cwd,
+        )
+        COMMAND_DURATIONS.append((pixi_subcommand(command), time.perf_counter() - start))
+        # Decode stdout and stderr explicitly using UTF-8
+        stdout = process.stdout.decode("utf-8", errors="replace")
+        stderr = process.stderr.decode("utf-8", errors="replace")
+        returncode = process.returncode
+        print(f"command: {command}, stdout: {stdout}, stderr: {stderr}, code: {returncode}")
+        stdout_found = {p for p in stdout_contains + stdout_excludes if p in stdout}
+        stderr_found = {p for p in stderr_contains + stderr_excludes if p in stderr}
+
+    output = Output(command, stdout, stderr, -1 if returncode is None else returncode)
+    if returncode is not None:
+        assert returncode == expected_exit_code, (
+            f"Return code was {returncode}, expected {expected_exit_code}, stderr: {stderr}"
+        )
 
-    if stderr_contains:
-        if isinstance(stderr_contains, str):
-            stderr_contains = [stderr_contains]
-        for substring in stderr_contains:
-            assert substring in stderr, f"'{substring}'\n not found in stderr:\n {stderr}"
-
-    if stderr_excludes:
-        if isinstance(stderr_excludes, str):
-            stderr_excludes = [stderr_excludes]
-        for substring in stderr_excludes:
-            assert substring not in stderr, (
-                f"'{substring}'\n unexpectedly found in stderr:\n {stderr}"
-            )
+    for substring in stdout_contains:
+        assert substring in stdout_found, f"'{substring}'\n not found in stdout:\n {stdout}"
+
+    for substring in stdout_excludes:
+        assert substring not in stdout_found, (
+            f"'{substring}'\n unexpectedly found in stdout:\n {stdout}"
+        )
+
+    for substring in stderr_contains:
+        assert substring in stderr_found, f"'{substring}'\n not found in stderr:\n {stderr}"
+
+    for substring in stderr_excludes:
+        assert substring not in stderr_found, (
+            f"'{substring}'\n unexpectedly found in stderr:\n {stderr}"
+        )
 
     return output
 
 
+class PrebuiltWorkspaces:
+    """Solves and installs each distinct manifest once per test session.
+
+    Environments are not relocatable, so instead of copying `.pixi/envs` a test receives
+    the manifest and the lock file of the prebuilt workspace. Installing from that lock file
+    skips the solve and links the packages from the warm package cache. The cache directory
+    is shared between pytest-xdist workers and guarded by a file lock per manifest.
+    """
+
+    def __init__(self, pixi: Path, root: Path, config: str):
+        self.pixi: Path = pixi
+        self.root: Path = root
+        self.config: str = config
+
+    def workspace(self, manifest: str) -> tuple[Path, float, bool]:
+        """Return the prebuilt workspace for `manifest`, the seconds it took to build it
+        and whether it was built by this call."""
+        key = hashlib.sha256(manifest.encode()).hexdigest()[:16]
+        workspace = self.root.joinpath(key)
+        build_time = workspace.joinpath("build-time")
+        self.root.mkdir(parents=True, exist_ok=True)
+
+        built = False
+        with FileLock(str(workspace.with_suffix(".lock"))):
+            if not build_time.exists():
+                built = True
+                if workspace.exists():
+                    shutil.rmtree(workspace)
+                workspace.joinpath(".pixi").mkdir(parents=True)
+                workspace.joinpath(".pixi", "config.toml").write_text(self.config)
+                manifest_path = workspace.joinpath("pixi.toml")
+                manifest_path.write_text(manifest)
+
+                start = time.perf_counter()
+                verify_cli_command([self.pixi, "install", "--manifest-path", manifest_path])
+                build_time.write_text(str(time.perf_counter() - start))
+
+        return workspace, float(build_time.read_text()), built
+
+    def clone(self, manifest: str, destination: Path) -> float:
+        """Copy the solved workspace for `manifest` into `destination`.
+
+        Returns the number of seconds the test saved by not solving it again,
+        which is zero for the test that had to build the workspace.
+        """
+        workspace, build_time, built = self.workspace(manifest)
+        for name in ("pixi.toml", "pixi.lock"):
+            shutil.copy2(workspace.joinpath(name), destination.joinpath(name))
+        return 0.0 if built else build_time
+
+
 def bat_extension(exe_name: str) -> str:
     if platform.system() == "Windows":
         return exe_name + ".bat"
@@ -194,39 +440,97 @@ def run_and_get_env(pixi: Path, *args: str, env_var: str) -> tuple[str | None, O
 
 # Command discovery utilities for testing CLI flag support
 
+# Persisted command -> flags index, rebuilt when the docs change
+CLI_FLAGS_INDEX = Path(__file__).parent / ".cli_flags_index.json"
+# Matches the anchor of an option, e.g. `<a id="arg---frozen" ...>`
+FLAG_ANCHOR = re.compile(r'<a id="arg-(--[^"]+)"')
+# Matches the short form of an option, e.g. `--platform (-p) <PLATFORM>`
+SHORT_FLAG = re.compile(r'href="#arg-[^"]+">`--[^` ]+ \((-\w)\)')
 
-def discover_pixi_commands() -> set[str]:
-    """Discover all available pixi commands by walking the docs/reference/cli/pixi directory.
 
-    Returns:
-        set[str]: Set of command names in the format "pixi command subcommand ..."
+def cli_docs_path() -> Path:
+    return repo_root() / "docs" / "reference" / "cli" / "pixi"
 
-    Examples:
-        {"pixi add", "pixi workspace channel add", "pixi shell", ...}
-    """
-    docs_path = repo_root() / "docs" / "reference" / "cli" / "pixi"
-    commands: set[str] = set()
 
-    if not docs_path.exists():
-        return commands
+def _docs_fingerprint(md_files: list[Path]) -> str:
+    """Invalidation key of the index: the docs files with their size and modification time."""
+    hasher = hashlib.sha256()
+    for md_file in sorted(md_files):
+        stat = md_file.stat()
+        hasher.update(f"{md_file}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return hasher.hexdigest()
 
-    # Walk through all markdown files in the docs directory
-    for md_file in docs_path.rglob("*.md"):
-        # Get relative path from the pixi docs directory
-        relative_path = md_file.relative_to(docs_path)
 
+@functools.cache
+def cli_flag_index() -> dict[str, frozenset[str]]:
+    """Map every pixi command to the flags it supports, by parsing docs/reference/cli/pixi.
+
+    The index is built once per process and persisted next to this file,
+    it is only rebuilt when a docs file is added, removed or modified.
+
+    Returns:
+        dict[str, frozenset[str]]: Command names like "pixi workspace channel add"
+        mapped to their long and short flags, e.g. {"--frozen", "-p", ...}
+    """
+    docs_path = cli_docs_path()
+    if not docs_path.exists():
+        return {}
+
+    md_files = list(docs_path.rglob("*.md"))
+    fingerprint = _docs_fingerprint(md_files)
+    try:
+        cached = json.loads(CLI_FLAGS_INDEX.read_text())
+        if cached["fingerprint"] == fingerprint:
+            return {command: frozenset(flags) for command, flags in cached["commands"].items()}
+    except (OSError, ValueError, KeyError):
+        pass
+
+    index: dict[str, frozenset[str]] = {}
+    for md_file in md_files:
         # Convert file path to command format
         # e.g., "workspace/channel/add.md" -> "pixi workspace channel add"
-        command_parts = ["pixi"] + list(relative_path.parts[:-1]) + [relative_path.stem]
-        command = " ".join(command_parts)
-        commands.add(command)
+        relative_path = md_file.relative_to(docs_path)
+        command = " ".join(["pixi", *relative_path.parts[:-1], relative_path.stem])
+        doc_content = md_file.read_text()
+        index[command] = frozenset(FLAG_ANCHOR.findall(doc_content)) | frozenset(
+            SHORT_FLAG.findall(doc_content)
+        )
+
+    # Write atomically, pytest-xdist workers may build the index at the same time
+    tmp_file = CLI_FLAGS_INDEX.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        tmp_file.write_text(
+            json.dumps(
+                {
+                    "fingerprint": fingerprint,
+                    "commands": {command: sorted(flags) for command, flags in index.items()},
+                }
+            )
+        )
+        os.replace(tmp_file, CLI_FLAGS_INDEX)
+    except OSError:
+        tmp_file.unlink(missing_ok=True)
+
+    return index
+
 
-    return commands
+def discover_pixi_commands() -> set[str]:
+    """Discover all available pixi commands from the docs/reference/cli/pixi directory.
+
+    Returns:
+        set[str]: Set of command names in the format "pixi command subcommand ..."
+
+    Examples:
+        {"pixi add", "pixi workspace channel add", "pixi shell", ...}
+    """
+    return set(cli_flag_index())
 
 
 def check_command_supports_flags(command_parts: list[str], *flag_names: str) -> tuple[bool, ...]:
     """Check if a command supports specific flags by examining its documentation.
 
+    Flags are matched exactly, a flag that is only mentioned in a description doesn't count.
+
     Args:
         command_parts: List of command parts (e.g., ["workspace", "channel", "add"])
         *flag_names: Variable number of flag names to check for (e.g., "--frozen", "--no-install")
@@ -241,25 +545,8 @@ def check_command_supports_flags(command_parts: list[str], *flag_names: str) ->
         check_command_supports_flags(["shell"], "--frozen", "--locked", "--no-install")
         # Returns: (False, True, True) if only --locked and --no-install are supported
     """
-    # Build the documentation file path
-    docs_path = repo_root() / "docs" / "reference" / "cli" / "pixi"
-    doc_file = docs_path / Path(*command_parts).with_suffix(".md")
-
-    if not doc_file.exists():
-        return tuple(False for _ in flag_names)
-
-    try:
-        doc_content = doc_file.read_text()
-
-        # Check each flag
-        results: list[bool] = []
-        for flag_name in flag_names:
-            results.append(flag_name in doc_content)
-
-        return tuple(results)
-
-    except (OSError, IOError):
-        return tuple(False for _ in flag_names)
+    flags = cli_flag_index().get(" ".join(["pixi", *command_parts]), frozenset())
+    return tuple(flag_name in flags for flag_name in flag_names)
 
 
 def find_commands_supporting_flags(*flag_names: str) -> list[str]:
@@ -278,27 +565,8 @@ def find_commands_supporting_flags(*flag_names: str) -> list[str]:
         find_commands_supporting_flags("--locked", "--no-install")
         # Returns: ["pixi shell"] (special case that uses --locked instead of --frozen)
     """
-    all_commands = discover_pixi_commands()
-    supported_commands: list[str] = []
-
-    for command_str in all_commands:
-        # Skip the "pixi" prefix to get command parts
-        command_parts = (
-            command_str.split()[1:] if command_str.startswith("pixi ") else command_str.split()
-        )
-
-        # Skip empty commands
-        if not command_parts:
-            continue
-
-        # Check if the command supports all specified flags
-        flag_support = check_command_supports_flags(command_parts, *flag_names)
-
-        # Only include if ALL flags are supported
-        if all(flag_support):
-            supported_commands.append(command_str)
-
-    return sorted(supported_commands)
+    required = frozenset(flag_names)
+    return sorted(command for command, flags in cli_flag_index().items() if required <= flags)
 
 
 def find_commands_supporting_frozen_and_no_install() -> set[str]:
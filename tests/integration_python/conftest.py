@@ -1,8 +1,32 @@
+import os
+from collections import defaultdict
+from collections.abc import Callable, Iterator
 from pathlib import Path
+from typing import Any, cast
 
 import pytest
 
-from .common import CONDA_FORGE_CHANNEL, exec_extension
+from .common import COMMAND_DURATIONS, CONDA_FORGE_CHANNEL, PrebuiltWorkspaces, exec_extension
+
+# Common config independent of the developers machine
+PIXI_TEST_CONFIG = f"""
+# Reset to defaults
+default-channels = ["{CONDA_FORGE_CHANNEL}"]
+shell.change-ps1 = true
+tls-no-verify = false
+detached-environments = false
+pinning-strategy = "semver"
+
+[concurrency]
+downloads = 50
+
+[experimental]
+use-environment-activation-cache = false
+
+# Enable sharded repodata
+[repodata-config."https://prefix.dev/"]
+disable-sharded = false
+"""
 
 
 def pytest_addoption(parser: pytest.Parser) -> None:
@@ -12,43 +36,136 @@ def pytest_addoption(parser: pytest.Parser) -> None:
         default="release",
         help="Specify the pixi build type (e.g., release or debug)",
     )
+    parser.addoption(
+        "--pixi-timings",
+        action="store_true",
+        default=False,
+        help="Report the wall time spent in pixi subprocesses per subcommand",
+    )
 
 
-@pytest.fixture
-def pixi(request: pytest.FixtureRequest) -> Path:
-    pixi_build = request.config.getoption("--pixi-build")
+@pytest.fixture(autouse=True)
+def record_command_durations(request: pytest.FixtureRequest) -> Iterator[None]:
+    """Attach the pixi invocations of a test to its report.
+
+    User properties are sent back to the controller by pytest-xdist,
+    so the summary covers all workers.
+    """
+    start = len(COMMAND_DURATIONS)
+    yield
+    durations = COMMAND_DURATIONS[start:]
+    if durations:
+        node = cast(pytest.Item, request.node)
+        node.user_properties.append(("pixi_command_durations", durations))
+
+
+def pytest_terminal_summary(terminalreporter: Any, config: pytest.Config) -> None:
+    """
+    Summarize how much of the session was spent starting and running pixi,
+    and how much was saved by the prebuilt workspaces.
+    """
+    per_subcommand: defaultdict[str, list[float]] = defaultdict(list)
+    per_test: dict[str, float] = {}
+    saved: list[float] = []
+    for reports in terminalreporter.stats.values():
+        for report in reports:
+            if getattr(report, "when", None) != "teardown":
+                continue
+            for name, value in report.user_properties:
+                if name == "prebuilt_workspace_saved_seconds":
+                    saved.append(value)
+                elif name == "pixi_command_durations":
+                    for subcommand, duration in value:
+                        per_subcommand[subcommand].append(duration)
+                    per_test[report.nodeid] = sum(duration for _, duration in value)
+
+    reused = [seconds for seconds in saved if seconds > 0]
+    if reused:
+        terminalreporter.write_line(
+            f"prebuilt workspaces were reused {len(reused)} times, "
+            + f"saving ~{sum(reused):.2f}s of solving and installing"
+        )
+
+    if not config.getoption("--pixi-timings") or not per_subcommand:
+        return
+
+    terminalreporter.section("pixi command timings")
+    terminalreporter.write_line(
+        f"{'subcommand':<20} {'calls':>7} {'total (s)':>10} {'mean (ms)':>10} {'min (ms)':>10}"
+    )
+    for subcommand, durations in sorted(
+        per_subcommand.items(), key=lambda item: sum(item[1]), reverse=True
+    ):
+        terminalreporter.write_line(
+            f"{subcommand:<20} {len(durations):>7} {sum(durations):>10.2f}"
+            + f" {1000 * sum(durations) / len(durations):>10.1f} {1000 * min(durations):>10.1f}"
+        )
+
+    all_durations = [duration for durations in per_subcommand.values() for duration in durations]
+    terminalreporter.write_line(
+        f"{len(all_durations)} pixi invocations took {sum(all_durations):.2f}s in total"
+    )
+    terminalreporter.write_line("slowest tests by time spent in pixi:")
+    for nodeid, total in sorted(per_test.items(), key=lambda item: item[1], reverse=True)[:10]:
+        terminalreporter.write_line(f"  {total:8.2f}s {nodeid}")
+
+
+def pixi_executable(config: pytest.Config) -> Path:
+    pixi_build = config.getoption("--pixi-build")
     pixi_path = Path(__file__).parent.joinpath(f"../../target/pixi/{pixi_build}/pixi")
     return Path(exec_extension(str(pixi_path)))
 
 
 @pytest.fixture
-def tmp_pixi_workspace(tmp_path: Path) -> Path:
-    """Ensure to use a common config independent of the developers machine"""
-
-    pixi_config = f"""
-# Reset to defaults
-default-channels = ["{CONDA_FORGE_CHANNEL}"]
-shell.change-ps1 = true
-tls-no-verify = false
-detached-environments = false
-pinning-strategy = "semver"
+def pixi(request: pytest.FixtureRequest) -> Path:
+    return pixi_executable(request.config)
 
-[concurrency]
-downloads = 50
 
-[experimental]
-use-environment-activation-cache = false
+@pytest.fixture
+def tmp_pixi_workspace(tmp_path: Path) -> Path:
+    """Ensure to use a common config independent of the developers machine"""
 
-# Enable sharded repodata
-[repodata-config."https://prefix.dev/"]
-disable-sharded = false
-"""
     dot_pixi = tmp_path.joinpath(".pixi")
     dot_pixi.mkdir()
-    dot_pixi.joinpath("config.toml").write_text(pixi_config)
+    dot_pixi.joinpath("config.toml").write_text(PIXI_TEST_CONFIG)
     return tmp_path
 
 
+@pytest.fixture(scope="session")
+def prebuilt_workspaces(
+    pytestconfig: pytest.Config, tmp_path_factory: pytest.TempPathFactory
+) -> PrebuiltWorkspaces:
+    """Session wide store of solved workspaces, shared between pytest-xdist workers"""
+    base_temp = tmp_path_factory.getbasetemp()
+    if os.environ.get("PYTEST_XDIST_WORKER"):
+        # Every worker gets its own directory inside the basetemp of the controller
+        base_temp = base_temp.parent
+    return PrebuiltWorkspaces(
+        pixi_executable(pytestconfig), base_temp.joinpath("prebuilt-workspaces"), PIXI_TEST_CONFIG
+    )
+
+
+@pytest.fixture
+def prebuilt_workspace(
+    request: pytest.FixtureRequest,
+    prebuilt_workspaces: PrebuiltWorkspaces,
+    tmp_pixi_workspace: Path,
+) -> Callable[[str], Path]:
+    """Populate `tmp_pixi_workspace` with a solved manifest and lock file.
+
+    The manifest is solved and installed once per session,
+    calling `pixi install` afterwards only links packages from the cache.
+    """
+
+    def clone(manifest: str) -> Path:
+        saved = prebuilt_workspaces.clone(manifest, tmp_pixi_workspace)
+        node = cast(pytest.Item, request.node)
+        node.user_properties.append(("prebuilt_workspace_saved_seconds", saved))
+        return tmp_pixi_workspace.joinpath("pixi.toml")
+
+    return clone
+
+
 @pytest.fixture
 def test_data() -> Path:
     return Path(__file__).parents[1].joinpath("data").resolve()
@@ -0,0 +1,71 @@
+import sys
+import time
+
+import pytest
+
+from .common import ExitCode, StreamCapture, verify_cli_command
+
+
+def test_stream_capture_finds_patterns_split_over_chunks() -> None:
+    capture = StreamCapture(["needle"], max_size=8)
+    for chunk in [b"hay hay nee", b"dle hay", b" hay hay hay"]:
+        capture.feed(chunk)
+    capture.feed(b"", final=True)
+
+    assert capture.found == {"needle"}
+    # Only the tail of the output is kept
+    assert capture.truncated
+    assert capture.text().endswith(" hay hay")
+    assert "needle" not in capture.text()
+
+
+def test_stream_output_matches_like_captured_output() -> None:
+    output = verify_cli_command(
+        [sys.executable, "-c", "import sys; print('out'); print('err', file=sys.stderr)"],
+        stdout_contains="out",
+        stderr_contains="err",
+        stderr_excludes="out",
+        stream_output=True,
+    )
+    assert output.stdout.strip() == "out"
+
+
+def test_stop_on_kills_the_process() -> None:
+    verify_cli_command(
+        [sys.executable, "-c", "import time; print('ready', flush=True); time.sleep(60)"],
+        stdout_contains="ready",
+        stream_output=True,
+        stop_on="ready",
+    )
+
+
+def test_stop_on_kills_the_children_of_the_process() -> None:
+    child = "import time; time.sleep(60)"
+    start = time.perf_counter()
+    verify_cli_command(
+        [
+            sys.executable,
+            "-c",
+            "import subprocess, sys, time; "
+            + f"subprocess.Popen([sys.executable, '-c', {child!r}]); "
+            + "print('ready', flush=True); time.sleep(60)",
+        ],
+        stream_output=True,
+        stop_on="ready",
+    )
+    # The child would keep the pipes open until the readers give up
+    assert time.perf_counter() - start < 5
+
+
+def test_stop_on_after_the_process_exited() -> None:
+    # The process reports the pattern and exits before it is killed, so its exit code is checked
+    command = [
+        sys.executable,
+        "-c",
+        "import os; os.write(2, b'boom'); os._exit(1)",
+    ]
+    verify_cli_command(
+        command, expected_exit_code=ExitCode.FAILURE, stream_output=True, stop_on="boom"
+    )
+    with pytest.raises(AssertionError, match="Return code was 1"):
+        verify_cli_command(command, stream_output=True, stop_on="boom")
@@ -7,6 +7,7 @@ import subprocess
 import sys
 import tempfile
 import time
+from collections.abc import Callable
 from pathlib import Path
 
 import pytest
@@ -131,9 +132,11 @@ def test_run_in_shell_project(pixi: Path) -> None:
 
 
 def test_using_prefix_validation(
-    pixi: Path, tmp_pixi_workspace: Path, dummy_channel_1: str
+    pixi: Path,
+    tmp_pixi_workspace: Path,
+    prebuilt_workspace: Callable[[str], Path],
+    dummy_channel_1: str,
 ) -> None:
-    manifest = tmp_pixi_workspace.joinpath("pixi.toml")
     toml = f"""
     [project]
     name = "test"
@@ -143,7 +146,8 @@ def test_using_prefix_validation(
     [dependencies]
     dummy-a = "*"
     """
-    manifest.write_text(toml)
+    # Start from the lock file that was solved once for the whole session
+    manifest = prebuilt_workspace(toml)
 
     # Run the install
     verify_cli_command(
@@ -203,10 +207,10 @@ def test_run_with_activation(pixi: Path, tmp_pixi_workspace: Path) -> None:
         stdout_contains="test123",
     )
 
-    # Validate that without experimental caching it does not use the cache
+    # Validate that the cache isn't used when it is disabled, as the test configuration does
     assert not tmp_pixi_workspace.joinpath(".pixi/activation-env-v0").exists()
 
-    # Enable the experimental cache config
+    # Enable the cache again
     verify_cli_command(
         [
             pixi,
@@ -227,12 +231,8 @@ def test_run_with_activation(pixi: Path, tmp_pixi_workspace: Path) -> None:
     )
 
     # Modify the environment variable in cache
-    cache_path = tmp_pixi_workspace.joinpath(
-        ".pixi", "activation-env-v0", "activation_default.json"
-    )
-    data = json.loads(cache_path.read_text())
-    data["environment_variables"]["TEST_ENV_VAR_FOR_ACTIVATION_TEST"] = "test456"
-    cache_path.write_text(json.dumps(data, indent=4))
+    cache_path = tmp_pixi_workspace.joinpath(".pixi", "activation-env-v0", "activation_default.bin")
+    cache_path.write_bytes(cache_path.read_bytes().replace(b"test123", b"test456"))
 
     verify_cli_command(
         [pixi, "run", "--manifest-path", manifest, "task"],
@@ -248,6 +248,29 @@ def test_run_with_activation(pixi: Path, tmp_pixi_workspace: Path) -> None:
     )
 
 
+def test_run_timings(pixi: Path, tmp_pixi_workspace: Path) -> None:
+    manifest = tmp_pixi_workspace.joinpath("pixi.toml")
+    toml = f"""
+    {EMPTY_BOILERPLATE_PROJECT}
+    [tasks]
+    task = {{ cmd = "echo timings", inputs = ["pixi.toml"] }}
+    """
+    manifest.write_text(toml)
+
+    output = verify_cli_command(
+        [pixi, "run", "--manifest-path", manifest, "task"],
+        env={"PIXI_TIMINGS": "json"},
+        stdout_contains="timings",
+        stderr_contains="Timings written to",
+    )
+
+    trace_path = output.stderr.split("Timings written to ")[1].splitlines()[0].strip()
+    events = json.loads(Path(trace_path).read_text())
+    phases = {event["name"] for event in events}
+    assert {"manifest discovery", "outdated environments", "activation", "task hashing"} <= phases
+    assert all(event["ph"] == "X" and event["dur"] >= 0 for event in events)
+
+
 def test_detached_environments_run(pixi: Path, tmp_path: Path, dummy_channel_1: str) -> None:
     tmp_project = tmp_path.joinpath("pixi-project")
     tmp_project.mkdir()
@@ -970,26 +993,39 @@ def test_task_args_multiple_inputs(pixi: Path, tmp_pixi_workspace: Path) -> None
     )
 
 
-def test_task_environment(
-    pixi: Path, tmp_pixi_workspace: Path, multiple_versions_channel_1: str
-) -> None:
-    """Test task environment."""
-    manifest_path = tmp_pixi_workspace.joinpath("pixi.toml")
+def package2_environments(channel: str) -> str:
+    """Manifest with an environment for version 0.1.0 and 0.2.0 of `package2`.
 
-    manifest_content = tomli.loads(EMPTY_BOILERPLATE_PROJECT)
+    Tasks don't influence the lock file, so the tests below add their own tasks
+    to the same prebuilt workspace.
+    """
+    return f"""
+    [workspace]
+    name = "test"
+    channels = ["{channel}"]
+    platforms = ["linux-64", "osx-64", "osx-arm64", "win-64"]
 
-    manifest_content["workspace"] = {
-        "name": "test",
-        "channels": [multiple_versions_channel_1],
-        "platforms": ["linux-64", "osx-64", "osx-arm64", "win-64"],
-    }
+    [feature.v010.dependencies]
+    package2 = "==0.1.0"
 
-    manifest_content["feature"] = {
-        "010": {"dependencies": {"package2": "==0.1.0"}},
-        "020": {"dependencies": {"package2": "==0.2.0"}},
-    }
+    [feature.v020.dependencies]
+    package2 = "==0.2.0"
+
+    [environments]
+    env-010 = ["v010"]
+    env-020 = ["v020"]
+    """
 
-    manifest_content["environments"] = {"env-010": ["010"], "env-020": ["020"]}
+
+def test_task_environment(
+    pixi: Path,
+    prebuilt_workspace: Callable[[str], Path],
+    multiple_versions_channel_1: str,
+) -> None:
+    """Test task environment."""
+    manifest_path = prebuilt_workspace(package2_environments(multiple_versions_channel_1))
+
+    manifest_content = tomli.loads(manifest_path.read_text())
 
     manifest_content["tasks"] = {
         "task1": "package2",
@@ -1021,28 +1057,14 @@ def test_task_environment(
 
 
 def test_task_environment_precedence(
-    pixi: Path, tmp_pixi_workspace: Path, multiple_versions_channel_1: str
+    pixi: Path,
+    prebuilt_workspace: Callable[[str], Path],
+    multiple_versions_channel_1: str,
 ) -> None:
     """Test that environment specified in task dependency takes precedence over CLI --environment flag."""
-    manifest_path = tmp_pixi_workspace.joinpath("pixi.toml")
-
-    manifest_content = tomli.loads(EMPTY_BOILERPLATE_PROJECT)
-
-    manifest_content["workspace"] = {
-        "name": "test-env-precedence",
-        "channels": [multiple_versions_channel_1],
-        "platforms": ["linux-64", "osx-64", "osx-arm64", "win-64"],
-    }
-
-    manifest_content["feature"] = {
-        "v010": {"dependencies": {"package2": "==0.1.0"}},
-        "v020": {"dependencies": {"package2": "==0.2.0"}},
-    }
+    manifest_path = prebuilt_workspace(package2_environments(multiple_versions_channel_1))
 
-    manifest_content["environments"] = {
-        "env-010": ["v010"],
-        "env-020": ["v020"],
-    }
+    manifest_content = tomli.loads(manifest_path.read_text())
 
     manifest_content["tasks"] = {
         "check-version": "package2",
@@ -1088,28 +1110,14 @@ def test_task_environment_precedence(
 
 
 def test_multiple_dependencies_with_environments(
-    pixi: Path, tmp_pixi_workspace: Path, multiple_versions_channel_1: str
+    pixi: Path,
+    prebuilt_workspace: Callable[[str], Path],
+    multiple_versions_channel_1: str,
 ) -> None:
     """Test that multiple dependencies can each specify different environments."""
-    manifest_path = tmp_pixi_workspace.joinpath("pixi.toml")
-
-    manifest_content = tomli.loads(EMPTY_BOILERPLATE_PROJECT)
-
-    manifest_content["workspace"] = {
-        "name": "test-multi-env-deps",
-        "channels": [multiple_versions_channel_1],
-        "platforms": ["linux-64", "osx-64", "osx-arm64", "win-64"],
-    }
-
-    manifest_content["feature"] = {
-        "v010": {"dependencies": {"package2": "==0.1.0"}},
-        "v020": {"dependencies": {"package2": "==0.2.0"}},
-    }
+    manifest_path = prebuilt_workspace(package2_environments(multiple_versions_channel_1))
 
-    manifest_content["environments"] = {
-        "env-010": ["v010"],
-        "env-020": ["v020"],
-    }
+    manifest_content = tomli.loads(manifest_path.read_text())
 
     manifest_content["tasks"] = {
         "check-v010": "package2",
@@ -1279,6 +1287,92 @@ def test_template_in_inputs_outputs(pixi: Path, tmp_pixi_workspace: Path) -> Non
     )
 
 
+def test_task_outputs_restored_from_cache(
+    pixi: Path, tmp_pixi_workspace: Path, tmp_path_factory: pytest.TempPathFactory
+) -> None:
+    """Test that removed outputs are restored from the cache instead of running the task again."""
+    manifest_path = tmp_pixi_workspace.joinpath("pixi.toml")
+    tmp_pixi_workspace.joinpath("input.txt").write_text("generated from input")
+    output_file = tmp_pixi_workspace.joinpath("output.txt")
+
+    manifest_content = tomli.loads(EMPTY_BOILERPLATE_PROJECT)
+    manifest_content["tasks"] = {
+        "generate": {
+            "cmd": "echo running generate && cat input.txt > output.txt",
+            "inputs": ["input.txt"],
+            "outputs": ["output.txt"],
+        },
+    }
+    manifest_path.write_text(tomli_w.dumps(manifest_content))
+
+    # Don't share the output store with other tests
+    env = {"PIXI_CACHE_DIR": str(tmp_path_factory.mktemp("pixi_cache"))}
+    command = [pixi, "run", "--manifest-path", manifest_path, "generate"]
+
+    verify_cli_command(command, stdout_contains="running generate", env=env)
+    assert output_file.read_text().strip() == "generated from input"
+
+    # Removed outputs are restored
+    output_file.unlink()
+    verify_cli_command(
+        command, stdout_excludes="running generate", stderr_contains="cache hit", env=env
+    )
+    assert output_file.read_text().strip() == "generated from input"
+
+    # Also without the task cache of the workspace, e.g. after a `git clean -x`
+    shutil.rmtree(tmp_pixi_workspace.joinpath(".pixi", "task-cache-v0"))
+    output_file.unlink()
+    verify_cli_command(
+        command, stdout_excludes="running generate", stderr_contains="cache hit", env=env
+    )
+    assert output_file.read_text().strip() == "generated from input"
+
+    # Changed inputs run the task again
+    tmp_pixi_workspace.joinpath("input.txt").write_text("changed input")
+    verify_cli_command(command, stdout_contains="running generate", env=env)
+    assert output_file.read_text().strip() == "changed input"
+
+
+def test_task_outputs_shared_through_directory(
+    pixi: Path, tmp_pixi_workspace: Path, tmp_path_factory: pytest.TempPathFactory
+) -> None:
+    """Test that outputs are shared between machines through a shared task cache directory."""
+    manifest_path = tmp_pixi_workspace.joinpath("pixi.toml")
+    tmp_pixi_workspace.joinpath("input.txt").write_text("generated from input")
+    output_file = tmp_pixi_workspace.joinpath("output.txt")
+
+    manifest_content = tomli.loads(EMPTY_BOILERPLATE_PROJECT)
+    manifest_content["tasks"] = {
+        "generate": {
+            "cmd": "echo running generate && cat input.txt > output.txt",
+            "inputs": ["input.txt"],
+            "outputs": ["output.txt"],
+        },
+    }
+    manifest_path.write_text(tomli_w.dumps(manifest_content))
+
+    shared_cache = tmp_path_factory.mktemp("shared_task_cache")
+    config_path = tmp_pixi_workspace.joinpath(".pixi", "config.toml")
+    config_path.write_text(
+        config_path.read_text() + f'\n[task-cache]\nurl = "{shared_cache.as_uri()}"\n'
+    )
+    command = [pixi, "run", "--manifest-path", manifest_path, "generate"]
+
+    # The first machine runs the task and pushes its outputs
+    first_machine = {"PIXI_CACHE_DIR": str(tmp_path_factory.mktemp("pixi_cache"))}
+    verify_cli_command(command, stdout_contains="running generate", env=first_machine)
+    assert any(shared_cache.joinpath("entries").iterdir())
+
+    # The second machine, with an empty local cache, downloads them instead of running the task
+    shutil.rmtree(tmp_pixi_workspace.joinpath(".pixi", "task-cache-v0"))
+    output_file.unlink()
+    second_machine = {"PIXI_CACHE_DIR": str(tmp_path_factory.mktemp("pixi_cache"))}
+    verify_cli_command(
+        command, stdout_excludes="running generate", stderr_contains="cache hit", env=second_machine
+    )
+    assert output_file.read_text().strip() == "generated from input"
+
+
 def test_argument_forwarding_in_dependencies(pixi: Path, tmp_pixi_workspace: Path) -> None:
     """Test that argument forwarding in dependencies works as expected."""
     manifest_path = tmp_pixi_workspace.joinpath("pixi.toml")
@@ -1610,6 +1704,103 @@ def test_run_with_environment_variable_priority(
     )
 
 
+def test_run_jobs_runs_independent_tasks_in_parallel(pixi: Path, tmp_pixi_workspace: Path) -> None:
+    manifest = tmp_pixi_workspace.joinpath("pixi.toml")
+    toml = f"""
+    {EMPTY_BOILERPLATE_PROJECT}
+    [tasks]
+    slow = "sleep 2 && echo slow-done"
+    fast = "echo fast-done"
+    all = {{ depends-on = ["slow", "fast"] }}
+    """
+    manifest.write_text(toml)
+
+    # One at a time the tasks run in order
+    output = verify_cli_command([pixi, "run", "--manifest-path", manifest, "all"])
+    assert output.stdout.index("slow-done") < output.stdout.index("fast-done")
+
+    # In parallel the fast task finishes while the slow one is still running
+    output = verify_cli_command(
+        [pixi, "run", "--manifest-path", manifest, "--jobs", "2", "all"],
+        stdout_contains=["[slow] slow-done", "[fast] fast-done"],
+    )
+    assert output.stdout.index("fast-done") < output.stdout.index("slow-done")
+
+
+def test_run_jobs_keep_going(pixi: Path, tmp_pixi_workspace: Path) -> None:
+    manifest = tmp_pixi_workspace.joinpath("pixi.toml")
+    toml = f"""
+    {EMPTY_BOILERPLATE_PROJECT}
+    [tasks]
+    fail = "exit 1"
+    slow = "sleep 1 && echo slow-done"
+    after-fail = {{ cmd = "echo after-fail-done", depends-on = ["fail"] }}
+    all = {{ depends-on = ["fail", "slow", "after-fail"] }}
+    """
+    manifest.write_text(toml)
+
+    # Without `--keep-going` the other running tasks are stopped
+    verify_cli_command(
+        [pixi, "run", "--manifest-path", manifest, "--jobs", "2", "all"],
+        expected_exit_code=ExitCode.FAILURE,
+        stdout_excludes=["slow-done", "after-fail-done"],
+    )
+
+    # With `--keep-going` only the tasks depending on the failed task don't run
+    verify_cli_command(
+        [pixi, "run", "--manifest-path", manifest, "--jobs", "2", "--keep-going", "all"],
+        expected_exit_code=ExitCode.FAILURE,
+        stdout_contains="[slow] slow-done",
+        stdout_excludes="after-fail-done",
+    )
+
+
+def test_run_jobs_output_does_not_interleave(pixi: Path, tmp_pixi_workspace: Path) -> None:
+    manifest = tmp_pixi_workspace.joinpath("pixi.toml")
+    toml = f"""
+    {EMPTY_BOILERPLATE_PROJECT}
+    [tasks]
+    first = "echo first-1 && sleep 0.4 && echo first-2 && sleep 0.4 && echo first-3"
+    second = "sleep 0.2 && echo second-1 && sleep 0.4 && echo second-2 && sleep 0.4 && echo second-3"
+    all = {{ depends-on = ["first", "second"] }}
+    """
+    manifest.write_text(toml)
+
+    output = verify_cli_command([pixi, "run", "--manifest-path", manifest, "--jobs", "2", "all"])
+    lines = [
+        line for line in output.stdout.splitlines() if line.startswith(("[first]", "[second]"))
+    ]
+    # The output of every task is printed in one block, prefixed with the task name
+    assert lines == [
+        "[first] first-1",
+        "[first] first-2",
+        "[first] first-3",
+        "[second] second-1",
+        "[second] second-2",
+        "[second] second-3",
+    ]
+
+
+def test_run_long_running_task_stops_on_output(pixi: Path, tmp_pixi_workspace: Path) -> None:
+    """A task that keeps running after it reported readiness is stopped once the output shows up."""
+    manifest = tmp_pixi_workspace.joinpath("pixi.toml")
+    toml = f"""
+    {EMPTY_BOILERPLATE_PROJECT}
+    [tasks]
+    serve = "echo ready && sleep 600"
+    """
+    manifest.write_text(toml)
+
+    start = time.perf_counter()
+    verify_cli_command(
+        [pixi, "run", "--manifest-path", manifest, "serve"],
+        stdout_contains="ready",
+        stream_output=True,
+        stop_on="ready",
+    )
+    assert time.perf_counter() - start < 30
+
+
 @pytest.mark.skipif(
     sys.platform == "win32",
     reason="Signal handling is different on Windows",
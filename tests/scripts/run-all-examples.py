@@ -1,8 +1,24 @@
 import subprocess
 import os
 import argparse
+import json
+import statistics
+import time
+import tomllib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Any
+
+
+# Phase durations of previous runs, used to start the slowest examples first
+# and to report performance regressions
+HISTORY_FILE = Path(__file__).parent / ".run-all-examples-history.json"
+# Number of previous runs needed before an example is checked for regressions
+MIN_HISTORY = 3
+
+# Example name -> list of runs, oldest first, mapping a phase or "total" to seconds
+History = dict[str, list[dict[str, float]]]
 
 
 @dataclass
@@ -11,85 +27,224 @@ class Results:
     skipped: list[tuple[str, str]]
     installed: list[str]
     failed: list[str]
+    # Example name -> phase -> seconds
+    timings: dict[str, dict[str, float]] = field(default_factory=dict)
 
     def __iadd__(self, other: "Results") -> "Results":
         self.succeeded += other.succeeded
         self.skipped += other.skipped
         self.installed += other.installed
         self.failed += other.failed
+        self.timings |= other.timings
         return self
 
+    def status_line(self) -> str:
+        return (
+            f"✅ {len(self.succeeded)} 🚀 {len(self.installed)} "
+            f"❌ {len(self.failed)} 🤷 {len(self.skipped)}"
+        )
 
-def has_test_task(folder: Path, pixi_exec: Path) -> bool:
-    command = [str(pixi_exec), "task", "--manifest-path", str(folder), "list"]
-    result = subprocess.run(command, capture_output=True, text=True)
-    return "test" in result.stderr
 
+@dataclass
+class ExampleRun:
+    """The outcome of running a single example, printed once it is finished."""
+
+    folder: Path
+    outcome: str = "failed"
+    duration: float = 0.0
+    phases: dict[str, float] = field(default_factory=dict)
+    log: list[str] = field(default_factory=list)
+
+    def run_phase(self, phase: str, command: list[str]) -> subprocess.CompletedProcess[str]:
+        self.log.append(f"Running {phase} command in {self.folder}: {' '.join(command)}")
+        start = time.perf_counter()
+        result = subprocess.run(command, capture_output=True, text=True)
+        self.phases[phase] = time.perf_counter() - start
+        return result
+
+
+def find_manifest(folder: Path) -> Path | None:
+    pixi_toml = folder / "pixi.toml"
+    pyproject_toml = folder / "pyproject.toml"
+
+    if pixi_toml.exists():
+        return pixi_toml
+    elif pyproject_toml.exists():
+        return pyproject_toml
+    return None
 
-def run_test_in_subfolders(
-    base_path: Path, pixi_exec: Path | None = None, run_clean: bool = False, rm_lock: bool = False
-) -> Results:
-    pixi_exec = pixi_exec or Path("pixi")
-    results = Results([], [], [], [])
-    folders = [folder for folder in base_path.iterdir() if folder.is_dir()]
 
-    tests = len(folders)
-    for i, folder in enumerate(folders):
-        pixi_toml = folder / "pixi.toml"
-        pyproject_toml = folder / "pyproject.toml"
+def has_test_task(manifest_path: Path) -> bool:
+    """Check the manifest for a `test` task in any feature or target."""
+    with manifest_path.open("rb") as f:
+        manifest: dict[str, Any] = tomllib.load(f)
+    if manifest_path.name == "pyproject.toml":
+        manifest = manifest.get("tool", {}).get("pixi", {})
 
-        if pixi_toml.exists():
-            manifest_path = pixi_toml
-        elif pyproject_toml.exists():
-            manifest_path = pyproject_toml
-        else:
-            continue
+    tables = [manifest, *manifest.get("target", {}).values()]
+    for feature in manifest.get("feature", {}).values():
+        tables += [feature, *feature.get("target", {}).values()]
+    return any("test" in table.get("tasks", {}) for table in tables)
 
+
+def log_failure(run: ExampleRun, result: subprocess.CompletedProcess[str], reason: str) -> None:
+    run.log.append(f"\033[91m ❌ {run.folder}{reason}\033[0m")
+    run.log.append(f"\tOutput:\n{result.stdout.replace('\n', '\n\t')}")
+    run.log.append(f"\tError:\n{result.stderr.replace('\n', '\n\t')}")
+
+
+def run_example(
+    folder: Path, manifest_path: Path, pixi_exec: Path, run_clean: bool, rm_lock: bool
+) -> ExampleRun:
+    """Run the phases of a single example, one after the other."""
+    run = ExampleRun(folder)
+    start = time.perf_counter()
+
+    try:
         if run_clean:
             clean_command = [str(pixi_exec), "clean", "--manifest-path", str(manifest_path)]
-            print(f"Running clean command in {folder}: {' '.join(clean_command)}")
-            clean_result = subprocess.run(clean_command, capture_output=True, text=True)
+            clean_result = run.run_phase("clean", clean_command)
             if clean_result.returncode != 0:
-                print(f"\033[91m ❌ {folder} (clean failed)\033[0m")
-                print(f"\tOutput:\n{clean_result.stdout.replace('\n', '\n\t')}")
-                print(f"\tError:\n{clean_result.stderr.replace('\n', '\n\t')}")
-                results.failed.append(str(folder))
-                continue
+                log_failure(run, clean_result, " (clean failed)")
+                return run
         if rm_lock:
             lock_file = manifest_path.parent / "pixi.lock"
             if lock_file.exists():
-                print(f"Removing lock file {lock_file}")
+                run.log.append(f"Removing lock file {lock_file}")
                 lock_file.unlink()
 
-        do_install = False
-        command = [str(pixi_exec), "run", "-v", "--manifest-path", str(manifest_path), "test"]
-        if not has_test_task(manifest_path, pixi_exec):
-            command = [str(pixi_exec), "-v", "install", "--manifest-path", str(manifest_path)]
-            do_install = True
+        # Install separately from the test, so both phases can be timed on their own
+        command = [str(pixi_exec), "-v", "install", "--manifest-path", str(manifest_path)]
+        result = run.run_phase("install", command)
+        if result.returncode != 0:
+            log_failure(run, result, "")
+            return run
 
-        print(f"Running command in {folder}: {' '.join(command)}")
-        result = subprocess.run(command, capture_output=True, text=True)
+        if not has_test_task(manifest_path):
+            run.log.append(f"\033[93m 🚀 {folder}\033[0m")
+            run.outcome = "installed"
+            return run
 
+        command = [str(pixi_exec), "run", "-v", "--manifest-path", str(manifest_path), "test"]
+        result = run.run_phase("test", command)
         if result.returncode != 0:
-            print(f"\033[91m ❌ {folder}\033[0m")
-            print(f"\tOutput:\n{result.stdout.replace('\n', '\n\t')}")
-            print(f"\tError:\n{result.stderr.replace('\n', '\n\t')}")
-            results.failed.append(str(folder))
-            continue
-
-        if do_install:
-            print(f"\033[93m 🚀 {folder}\033[0m")
-            results.installed.append(str(folder))
-        else:
-            print(f"\033[92m ✅ {folder}\033[0m")
-            results.succeeded.append(str(folder))
-
-        print(f"Done: {i + 1}/{tests}")
-        print("")
+            log_failure(run, result, "")
+            return run
+
+        run.log.append(f"\033[92m ✅ {folder}\033[0m")
+        run.outcome = "succeeded"
+        return run
+    finally:
+        run.duration = time.perf_counter() - start
+
+
+def load_history() -> History:
+    if not HISTORY_FILE.exists():
+        return {}
+    try:
+        return json.loads(HISTORY_FILE.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def save_history(history: History, results: Results, history_size: int) -> None:
+    """Append the timings of this run, keeping the last `history_size` runs per example."""
+    for name, timings in results.timings.items():
+        runs = history.setdefault(name, [])
+        runs.append(timings)
+        del runs[:-history_size]
+    HISTORY_FILE.write_text(json.dumps(history, indent=2, sort_keys=True))
+
+
+def median_duration(
+    history: History, name: str, phase: str, min_runs: int = MIN_HISTORY
+) -> float | None:
+    durations = [run[phase] for run in history.get(name, []) if phase in run]
+    if not durations or len(durations) < min_runs:
+        return None
+    return statistics.median(durations)
+
+
+def find_regressions(
+    results: Results, history: History, threshold: float
+) -> list[tuple[str, str, float, float]]:
+    """Find phases that took more than `threshold` longer than their median in the history.
+
+    The history must not contain the current run yet.
+    Returns tuples of example name, phase, current duration and median duration.
+    """
+    regressions: list[tuple[str, str, float, float]] = []
+    for name, timings in sorted(results.timings.items()):
+        for phase in ("install", "test"):
+            if phase not in timings:
+                continue
+            median = median_duration(history, name, phase)
+            if median is not None and timings[phase] > median * (1 + threshold):
+                regressions.append((name, phase, timings[phase], median))
+    return regressions
+
+
+def run_test_in_subfolders(
+    base_paths: list[Path],
+    pixi_exec: Path | None = None,
+    run_clean: bool = False,
+    rm_lock: bool = False,
+    jobs: int = 1,
+    history: History | None = None,
+) -> Results:
+    pixi_exec = pixi_exec or Path("pixi")
+    results = Results([], [], [], [])
+
+    examples: list[tuple[Path, Path]] = []
+    for base_path in base_paths:
+        for folder in base_path.iterdir():
+            if not folder.is_dir():
+                continue
+            manifest_path = find_manifest(folder)
+            if manifest_path is not None:
+                examples.append((folder, manifest_path))
+
+    # Examples don't depend on each other, so start the ones that usually take longest
+    # first, this keeps a single slow example from finishing long after all the others.
+    history = history or {}
+    examples.sort(
+        key=lambda example: (
+            median_duration(history, str(example[0]), "total", min_runs=1) or float("inf")
+        ),
+        reverse=True,
+    )
+
+    tests = len(examples)
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+        futures = [
+            executor.submit(run_example, folder, manifest_path, pixi_exec, run_clean, rm_lock)
+            for folder, manifest_path in examples
+        ]
+        for i, future in enumerate(as_completed(futures)):
+            run = future.result()
+            # Failed runs stop early, keep them out of the history
+            if run.outcome != "failed":
+                results.timings[str(run.folder)] = run.phases | {"total": run.duration}
+            if run.outcome == "succeeded":
+                results.succeeded.append(str(run.folder))
+            elif run.outcome == "installed":
+                results.installed.append(str(run.folder))
+            else:
+                results.failed.append(str(run.folder))
+
+            print("\n".join(run.log))
+            print(f"Done: {i + 1}/{tests} in {run.duration:.1f}s | {results.status_line()}")
+            print("")
+
     return results
 
 
-def print_summary(results: Results, pixi_exec: Path) -> None:
+def print_summary(
+    results: Results,
+    pixi_exec: Path,
+    regressions: list[tuple[str, str, float, float]] | None = None,
+    threshold: float = 0.0,
+) -> None:
     summary_text = f"║ ✅ {len(results.succeeded):<10} 🚀 {len(results.installed):<10} ❌ {len(results.failed):<10} 🤷 {len(results.skipped):<10} ║"
 
     # Calculate the actual length of the line, considering the emojis as single characters
@@ -120,6 +275,11 @@ def print_summary(results: Results, pixi_exec: Path) -> None:
         for name in results.failed:
             print(f"\t - {name}")
 
+    if regressions:
+        print(f"\033[95mMore than {threshold:.0%} slower than the median of previous runs:\033[0m")
+        for name, phase, duration, median in regressions:
+            print(f"\t - {name} ({phase}: {duration:.1f}s, median {median:.1f}s)")
+
 
 if __name__ == "__main__":
     try:
@@ -133,6 +293,25 @@ if __name__ == "__main__":
         parser.add_argument(
             "--rm-lock", action="store_true", help="Remove the lock file before running tests"
         )
+        parser.add_argument(
+            "--jobs",
+            "-j",
+            type=int,
+            default=1,
+            help="Number of examples to run at the same time",
+        )
+        parser.add_argument(
+            "--regression-threshold",
+            type=float,
+            default=0.25,
+            help="Report phases that are this fraction slower than the median of previous runs",
+        )
+        parser.add_argument(
+            "--history-size",
+            type=int,
+            default=10,
+            help="Number of previous runs to keep per example in the timing history",
+        )
         args = parser.parse_args()
 
         if args.pixi_exec:
@@ -140,15 +319,19 @@ if __name__ == "__main__":
 
         pixi_root = Path(os.environ.get("PIXI_PROJECT_ROOT", ""))
         pixi_exec = Path(args.pixi_exec) if args.pixi_exec else Path("pixi")
+        history = load_history()
         results = run_test_in_subfolders(
-            pixi_root / "examples", pixi_exec, args.clean, args.rm_lock
-        )
-
-        results += run_test_in_subfolders(
-            pixi_root / "examples" / "pixi-build", pixi_exec, args.clean, args.rm_lock
+            [pixi_root / "examples", pixi_root / "examples" / "pixi-build"],
+            pixi_exec,
+            args.clean,
+            args.rm_lock,
+            args.jobs,
+            history,
         )
 
-        print_summary(results, pixi_exec)
+        regressions = find_regressions(results, history, args.regression_threshold)
+        save_history(history, results, args.history_size)
+        print_summary(results, pixi_exec, regressions, args.regression_threshold)
 
     except KeyboardInterrupt:
         pass
@@ -1,5 +1,7 @@
 # pyright: reportUnusedParameter=false
 
+import os
+
 from pathlib import Path
 from typing import Any
 
@@ -7,15 +9,29 @@ import pytest
 
 from .helpers import setup_stdout_stderr_logging
 from .generate_summaries import terminal_summary, markdown_summary
+from .record_results import clear_results
 
 
 def pytest_configure(config: pytest.Config) -> None:
     setup_stdout_stderr_logging()
+    # Only the controller starts a new results log, pytest-xdist workers append to it
+    if not hasattr(config, "workerinput"):
+        clear_results()
+    # Share a pre-populated conda and uv cache between all tests
+    cache_dir = config.getoption("pixi_cache_dir")
+    if cache_dir:
+        os.environ["PIXI_CACHE_DIR"] = str(Path(cache_dir).resolve())
 
 
 def pytest_addoption(parser: pytest.Parser) -> None:
     # Used to override the default path to the pixi executable
     parser.addoption("--pixi-exec", action="store", help="Path to the pixi executable")
+    # Used to point all tests to a warm cache, e.g. one restored on CI
+    parser.addoption(
+        "--pixi-cache-dir",
+        action="store",
+        help="Path to the pixi cache directory, which also contains the uv cache",
+    )
 
 
 def pytest_terminal_summary(terminalreporter: Any, exitstatus: int, config: pytest.Config) -> None:
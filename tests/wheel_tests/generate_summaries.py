@@ -1,5 +1,3 @@
-import tomllib
-
 from pathlib import Path
 from rich.console import Console
 from rich.table import Table
@@ -7,18 +5,16 @@ from rich.text import Text
 from rich.panel import Panel
 
 from .read_wheels import read_wheel_file
-from .record_results import RESULTS_FILE
+from .record_results import RESULTS_FILE, read_results
 
 
 def terminal_summary() -> None:
-    # Read aggregated results from the shared file
-    results_file = RESULTS_FILE
-    if not results_file.exists():
+    # Read the results appended by all workers
+    if not RESULTS_FILE.exists():
         print("Error: No test results found.")
         return
 
-    with results_file.open("rb") as f:
-        results = tomllib.load(f)["results"]
+    results = sorted(read_results(), key=lambda r: r["name"])
 
     packages = read_wheel_file()
 
@@ -27,21 +23,31 @@ def terminal_summary() -> None:
     table.add_column("Test Name", style="dim")
     table.add_column("Outcome", justify="right")
     table.add_column("Duration (s)", justify="right")
+    table.add_column("Base setup (s)", justify="right")
+    table.add_column("Wheel add (s)", justify="right")
     table.add_column("Error Details")
 
     # Populate the table with collected results
-    names: list[str] = []
-    for result in sorted(results, key=lambda r: r["name"]):
+    names: set[str] = set()
+    passed = 0
+    failed = 0
+    for result in results:
         outcome_color = "green" if result["outcome"] == "passed" else "red"
         error_details = result["longrepr"] if result["outcome"] == "failed" else ""
         table.add_row(
             Text(result["name"]),
             Text(result["outcome"], style=outcome_color),
             f"{result['duration']:.2f}",
+            f"{result['base_duration']:.2f}",
+            f"{result['add_duration']:.2f}",
             error_details,
         )
-        # Record name
-        names.append(result["name"])
+        # Record name and outcome
+        names.add(result["name"])
+        if result["outcome"] == "passed":
+            passed += 1
+        elif result["outcome"] == "failed":
+            failed += 1
 
     for package in packages:
         if package.to_add_cmd() not in names:
@@ -50,6 +56,8 @@ def terminal_summary() -> None:
                 Text("N/A", style="dim"),
                 Text("N/A", style="dim"),
                 Text("N/A", style="dim"),
+                Text("N/A", style="dim"),
+                Text("N/A", style="dim"),
             )
 
     # Display the table in the terminal
@@ -59,8 +67,8 @@ def terminal_summary() -> None:
     summary_text = (
         "[bold]Summary:[/bold]\n\n"
         f"- Total tests run: {len(results)}\n"
-        f"- Passed: {sum(1 for r in results if r['outcome'] == 'passed')}\n"
-        f"- Failed: {sum(1 for r in results if r['outcome'] == 'failed')}\n\n"
+        f"- Passed: {passed}\n"
+        f"- Failed: {failed}\n\n"
         "To filter tests by a specific wheel, use the command:\n"
         "[bold green]pytest -k '<pixi_add_cmd>'[/]\n\n"
         "Replace [bold]<pixi_add_com>[/] with the desired wheel's name to run only tests for that wheel.\n"
@@ -100,18 +108,20 @@ pixi r test-common-wheels-dev -k "jax[cuda12]"
 """)
         f.write("## Test Results\n\n")
         f.write("\n")
-        f.write("| Test Name | Outcome | Duration (s) | Error Details |\n")
-        f.write("| :--- | ---: | ---: | --- |\n")
-
-        results_file = RESULTS_FILE
-        with results_file.open("rb") as r:
-            results = tomllib.load(r)["results"]
-            for result in results:
-                outcome = (
-                    '<span style="color: green">Passed</span>'
-                    if result["outcome"] == "passed"
-                    else '<span style="color: red">Failed</span>'
-                )
-                error_details = result["longrepr"] if result["outcome"] == "failed" else ""
-                f.write(f"|{result['name']}|{outcome}|{result['duration']:.2f}|{error_details}|\n")
+        f.write(
+            "| Test Name | Outcome | Duration (s) | Base setup (s) | Wheel add (s) | Error Details |\n"
+        )
+        f.write("| :--- | ---: | ---: | ---: | ---: | --- |\n")
+
+        for result in read_results():
+            outcome = (
+                '<span style="color: green">Passed</span>'
+                if result["outcome"] == "passed"
+                else '<span style="color: red">Failed</span>'
+            )
+            error_details = result["longrepr"] if result["outcome"] == "failed" else ""
+            f.write(
+                f"|{result['name']}|{outcome}|{result['duration']:.2f}"
+                + f"|{result['base_duration']:.2f}|{result['add_duration']:.2f}|{error_details}|\n"
+            )
         f.write("\n")
@@ -1,9 +1,13 @@
+import hashlib
+import json
 import os
 import pathlib
+import shutil
 import subprocess
 import tomllib
 import tomli_w
 
+from filelock import FileLock
 from typing import Any
 
 
@@ -66,3 +70,55 @@ def log_called_process_error(
                 f.write(err.stdout.decode("uft-8"))
         with std_err_log.open("w", encoding="utf-8") as f:
             f.write(err.stderr.decode("utf-8"))
+
+
+class BaseWorkspaces:
+    """
+    Workspaces containing only the python base, solved and installed once per session.
+    Every distinct set of system requirements gets its own base workspace, which is
+    shared between the pytest-xdist workers under a file lock.
+    """
+
+    def __init__(self, pixi: StrPath, root: pathlib.Path) -> None:
+        self.pixi: StrPath = pixi
+        self.root: pathlib.Path = root
+
+    def copy_to(
+        self, destination: pathlib.Path, system_requirements: dict[str, Any] | None
+    ) -> None:
+        """
+        Copy the manifest and lock file of the base workspace to `destination`,
+        creating the base workspace if this is the first test that needs it
+        """
+        key = hashlib.sha256(
+            json.dumps(system_requirements or {}, sort_keys=True).encode()
+        ).hexdigest()[:16]
+        workspace = self.root / key
+        manifest_path = workspace / "pixi.toml"
+        self.root.mkdir(parents=True, exist_ok=True)
+
+        with FileLock(str(workspace.with_suffix(".lock"))):
+            if not workspace.joinpath("pixi.lock").exists():
+                if workspace.exists():
+                    shutil.rmtree(workspace)
+                workspace.mkdir()
+                run([self.pixi, "init"], cwd=workspace)
+
+                # There is no CLI for system-requirements currently,
+                # so we need to manually edit the file
+                if system_requirements:
+                    add_system_requirements(manifest_path, system_requirements)
+
+                run(
+                    [
+                        self.pixi,
+                        "add",
+                        "--no-progress",
+                        "--manifest-path",
+                        manifest_path,
+                        "python==3.12.*",
+                    ]
+                )
+
+        for name in ("pixi.toml", "pixi.lock"):
+            shutil.copy2(workspace / name, destination / name)
@@ -1,53 +1,66 @@
-import tomllib
-import tomli_w
+import json
+import os
 
-from dataclasses import dataclass, field
-from filelock import FileLock
+from collections.abc import Iterator
 from pathlib import Path
 from typing import Any
 
 
-# Path to the results file, containing test outcomes
-RESULTS_FILE = Path(__file__).parent / ".wheel_test_results.toml"
-# Lock file to ensure process-safe write access to the results file
-LOCK_FILE = RESULTS_FILE.with_suffix(".lock")
+# Path to the results file, containing one JSON record per test outcome
+RESULTS_FILE = Path(__file__).parent / ".wheel_test_results.jsonl"
 
 
-@dataclass
-class Test:
-    id: str
-    results: list[dict[str, Any]] = field(default_factory=list)
+def clear_results() -> None:
+    """
+    Remove the results of a previous session, call once before the workers start.
+    """
+    RESULTS_FILE.unlink(missing_ok=True)
 
 
-def record_result(test_id: str, name: str, outcome: str, duration: float, details: str) -> None:
+def record_result(
+    test_id: str,
+    name: str,
+    outcome: str,
+    base_duration: float,
+    add_duration: float,
+    details: str,
+) -> None:
     """
     Collects test status after each test run, compatible with pytest-xdist.
+    The duration is split into setting up the python base and adding the wheel.
+
+    Every result is appended as a single line with a single `write` call on a file opened
+    with `O_APPEND`, so workers never have to read or lock the results of each other.
     """
-    result = {"name": name, "outcome": outcome, "duration": duration, "longrepr": details}
-
-    # Use file lock for process-safe write access to the results file
-    lock = FileLock(str(LOCK_FILE))
-
-    with lock:
-        test = Test(id=test_id)
-
-        # Get the existing results
-        if RESULTS_FILE.exists():
-            with RESULTS_FILE.open("rb") as f:
-                data = tomllib.load(f)
-                # If this doesn't hold, don't use the recorded data
-                if "id" in data and data["id"] == test_id:
-                    test = Test(id=data["id"], results=data["results"])
-
-        # Append the new result
-        # if we are in the same session
-        if test.id == test_id:
-            test.results.append(result)
-        # The data is from a different session
-        # so we overwrite the data
-        else:
-            test.results = [result]
-
-        # Write the results back to the file
-        with RESULTS_FILE.open("wb") as f:
-            tomli_w.dump(test.__dict__, f)
+    result = {
+        "id": test_id,
+        "name": name,
+        "outcome": outcome,
+        "duration": base_duration + add_duration,
+        "base_duration": base_duration,
+        "add_duration": add_duration,
+        "longrepr": details,
+    }
+    line = (json.dumps(result) + "\n").encode("utf-8")
+
+    flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0)
+    fd = os.open(RESULTS_FILE, flags, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+def read_results() -> Iterator[dict[str, Any]]:
+    """
+    Stream the recorded results, skipping a line that was only partially written.
+    """
+    if not RESULTS_FILE.exists():
+        return
+
+    with RESULTS_FILE.open("r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
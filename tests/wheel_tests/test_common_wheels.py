@@ -7,12 +7,16 @@ import time
 
 from .read_wheels import Package, read_wheel_file
 from .record_results import record_result
-from .helpers import add_system_requirements, log_called_process_error, run
+from .helpers import BaseWorkspaces, log_called_process_error, run
 
 
 @pytest.mark.flaky(reruns=5, reruns_delay=1, condition=sys.platform.startswith("win32"))
 def test_wheel(
-    pixi: str, package: Package, testrun_uid: str, tmp_pixi_workspace: pathlib.Path
+    pixi: str,
+    package: Package,
+    testrun_uid: str,
+    tmp_pixi_workspace: pathlib.Path,
+    base_workspaces: BaseWorkspaces,
 ) -> None:
     """
     Create a temporary directory and install the wheel in it.
@@ -20,18 +24,14 @@ def test_wheel(
     this is created by pytest-xdist
     """
     start = time.perf_counter()
+    base_duration = 0.0
     try:
         # Path to the manifest file
         manifest_path = tmp_pixi_workspace / "pixi.toml"
-        run([pixi, "init"], cwd=tmp_pixi_workspace)
 
-        # Check if we need to add system-requirements
-        # There is no CLI for it currently so we need to manually edit the file
-        if package.spec.system_requirements:
-            add_system_requirements(manifest_path, package.spec.system_requirements)
-
-        # Add python to the project
-        run([pixi, "add", "--no-progress", "--manifest-path", manifest_path, "python==3.12.*"])
+        # Start from the python base that is solved once per session
+        base_workspaces.copy_to(tmp_pixi_workspace, package.spec.system_requirements)
+        base_duration = time.perf_counter() - start
 
         # Add the wheel to the project
         run_args: list[str | os.PathLike[str]] = [
@@ -52,11 +52,24 @@ def test_wheel(
 
         run(run_args)
         # Record the success of the test
-        record_result(testrun_uid, package.to_add_cmd(), "passed", time.perf_counter() - start, "")
+        record_result(
+            testrun_uid,
+            package.to_add_cmd(),
+            "passed",
+            base_duration,
+            time.perf_counter() - start - base_duration,
+            "",
+        )
     except subprocess.CalledProcessError as e:
-        # Record the failure details
+        # Record the failure details, a failure in the base setup has no wheel add time
+        elapsed = time.perf_counter() - start
         record_result(
-            testrun_uid, package.to_add_cmd(), "failed", time.perf_counter() - start, str(e)
+            testrun_uid,
+            package.to_add_cmd(),
+            "failed",
+            base_duration or elapsed,
+            elapsed - base_duration if base_duration else 0.0,
+            str(e),
         )
         # Log the error
         log_called_process_error(package.to_add_cmd(), e, std_err_only=True)
@@ -96,3 +109,15 @@ def pixi(pytestconfig: pytest.Config) -> pathlib.Path:
         return target_dir.joinpath("pixi.exe")
     else:
         return target_dir.joinpath("pixi")
+
+
+@pytest.fixture(scope="session")
+def base_workspaces(pixi: pathlib.Path, tmp_path_factory: pytest.TempPathFactory) -> BaseWorkspaces:
+    """
+    The python base workspaces, shared by all tests of the session
+    """
+    base_temp = tmp_path_factory.getbasetemp()
+    if os.environ.get("PYTEST_XDIST_WORKER"):
+        # Every worker gets its own directory inside the basetemp of the controller
+        base_temp = base_temp.parent
+    return BaseWorkspaces(pixi, base_temp / "base-workspaces")
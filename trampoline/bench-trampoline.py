@@ -0,0 +1,324 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import TypedDict
+
+BINARIES_DIR = Path("trampoline", "binaries")
+DEFAULT_BUDGET = Path("trampoline", "bench-budget.json")
+ENV_VAR_COUNTS = [1, 10, 100, 500]
+BINARY_CONFIGURATION_MAGIC = b"PXTRAMP1"
+
+
+class Measurement(TypedDict):
+    median_ms: float
+    p90_ms: float
+    page_faults: float | None
+    max_rss_kb: int | None
+
+
+class Result(TypedDict):
+    configuration: str
+    env_vars: int
+    pixi_base_path: bool
+    trampoline: Measurement
+    direct: Measurement
+    overhead_ms: float
+    page_faults_overhead: float | None
+    max_rss_overhead_kb: float | None
+
+
+class Report(TypedDict):
+    target: str
+    host: str
+    runs: int
+    compressed_size_bytes: int
+    decompressed_size_bytes: int
+    results: list[Result]
+
+
+class Budget(TypedDict):
+    max_decompressed_size_kb: float
+    max_overhead_ms: float
+    max_page_faults_overhead: float
+    max_rss_overhead_kb: float
+
+
+def get_default_target() -> str:
+    result = subprocess.run(["rustc", "-vV"], capture_output=True, text=True, check=True)
+    for line in result.stdout.splitlines():
+        if line.startswith("host:"):
+            return line.split(":")[1].strip()
+    raise RuntimeError("Unable to determine default target")
+
+
+def compressed_trampoline_path(target: str) -> Path:
+    extension = ".exe" if target.endswith("windows-msvc") else ""
+    return BINARIES_DIR.joinpath(f"pixi-trampoline-{target}{extension}.zst")
+
+
+def decompress_trampoline(target: str, destination: Path) -> None:
+    subprocess.run(
+        ["zstd", "-d", compressed_trampoline_path(target), "-o", destination, "--force", "-q"],
+        check=True,
+    )
+    destination.chmod(0o755)
+
+
+def find_target_executable() -> Path:
+    """A small executable that exits immediately, which is executed by the trampoline."""
+    for name in ["true", "hostname"]:
+        executable = shutil.which(name)
+        if executable is not None:
+            return Path(executable)
+    raise RuntimeError("Unable to find an executable to benchmark the trampoline with")
+
+
+def encode_string(value: str) -> bytes:
+    encoded = value.encode()
+    return struct.pack("<I", len(encoded)) + encoded
+
+
+def write_configuration(
+    configuration_dir: Path, name: str, exe: Path, env_vars: int, binary: bool
+) -> None:
+    """Writes the configuration of a trampoline like `pixi global` does, see
+    `crates/pixi_global/src/trampoline.rs`."""
+    env = {f"PIXI_BENCH_VAR_{i}": f"value-{i}" for i in range(env_vars)}
+    path_diff = str(exe.parent)
+
+    json_path = configuration_dir.joinpath(f"{name}.json")
+    json_path.write_text(json.dumps({"exe": str(exe), "path_diff": path_diff, "env": env}))
+
+    binary_path = configuration_dir.joinpath(f"{name}.bin")
+    binary_path.unlink(missing_ok=True)
+    if binary:
+        stat = json_path.stat()
+        mtime_secs, mtime_nanos = divmod(stat.st_mtime_ns, 1_000_000_000)
+        content = BINARY_CONFIGURATION_MAGIC + struct.pack(
+            "<QQI", stat.st_size, mtime_secs, mtime_nanos
+        )
+        content += encode_string(str(exe)) + encode_string(path_diff)
+        content += struct.pack("<I", len(env))
+        for key, value in env.items():
+            content += encode_string(key) + encode_string(value)
+        binary_path.write_bytes(content)
+
+
+def uses_binary_configuration(trampoline: Path, configuration_dir: Path, exe: Path) -> bool:
+    """Checks whether the trampoline reads the binary configuration instead of falling back to the
+    JSON configuration. The JSON configuration is replaced by invalid content of the same size and
+    modification time, so the trampoline only succeeds if it uses the binary configuration."""
+    write_configuration(configuration_dir, "bench", exe, 1, binary=True)
+    json_path = configuration_dir.joinpath("bench.json")
+    stat = json_path.stat()
+    json_path.write_bytes(b" " * stat.st_size)
+    os.utime(json_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    result = subprocess.run([trampoline], capture_output=True, check=False)
+    return result.returncode == 0
+
+
+def run_once(executable: Path, env: dict[str, str]) -> tuple[float, int | None, int | None]:
+    """Runs the executable and returns the wall time in milliseconds, the number of minor page
+    faults and the peak resident set size in kilobytes. The page faults and the resident set size
+    are only available on unix."""
+    start = time.perf_counter()
+    if not hasattr(os, "wait4"):
+        subprocess.run([executable], env=env, check=True, stdout=subprocess.DEVNULL)
+        return (time.perf_counter() - start) * 1000, None, None
+
+    pid = os.posix_spawn(executable, [executable], env)
+    _, status, usage = os.wait4(pid, 0)
+    elapsed = (time.perf_counter() - start) * 1000
+    if os.waitstatus_to_exitcode(status) != 0:
+        raise RuntimeError(f"{executable} exited with status {status}")
+
+    # `ru_maxrss` is in bytes on macOS and in kilobytes everywhere else
+    max_rss_kb = usage.ru_maxrss // 1024 if sys.platform == "darwin" else usage.ru_maxrss
+    return elapsed, usage.ru_minflt, max_rss_kb
+
+
+def measure(executable: Path, env: dict[str, str], runs: int) -> Measurement:
+    # Warm up the file system cache
+    run_once(executable, env)
+    samples = [run_once(executable, env) for _ in range(runs)]
+    latencies = sorted(sample[0] for sample in samples)
+    page_faults = [sample[1] for sample in samples if sample[1] is not None]
+    max_rss = [sample[2] for sample in samples if sample[2] is not None]
+    return {
+        "median_ms": statistics.median(latencies),
+        "p90_ms": latencies[int(len(latencies) * 0.9) - 1],
+        "page_faults": statistics.median(page_faults) if page_faults else None,
+        "max_rss_kb": max(max_rss) if max_rss else None,
+    }
+
+
+def difference(trampoline: float | None, direct: float | None) -> float | None:
+    if trampoline is None or direct is None:
+        return None
+    return trampoline - direct
+
+
+def bench(target: str, runs: int) -> Report:
+    exe = find_target_executable()
+    results: list[Result] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        bin_dir = Path(tmp)
+        configuration_dir = bin_dir.joinpath("trampoline_configuration")
+        configuration_dir.mkdir()
+        extension = ".exe" if target.endswith("windows-msvc") else ""
+        trampoline = bin_dir.joinpath(f"bench{extension}")
+        decompress_trampoline(target, trampoline)
+        decompressed_size = trampoline.stat().st_size
+
+        # Trampolines that were built before the binary configuration existed silently fall back
+        # to the JSON configuration, which would make the binary scenarios measure the wrong thing
+        configurations = [False]
+        if uses_binary_configuration(trampoline, configuration_dir, exe):
+            configurations.append(True)
+        elif BINARY_CONFIGURATION_MAGIC in trampoline.read_bytes():
+            raise RuntimeError("The trampoline does not use the binary configuration it supports")
+        else:
+            print(
+                "skipping the binary configuration scenarios, the trampoline does not support it",
+                file=sys.stderr,
+            )
+
+        for base_path in [False, True]:
+            env = dict(os.environ)
+            env.pop("PIXI_BASE_PATH", None)
+            if base_path:
+                env["PIXI_BASE_PATH"] = env.get("PATH", "")
+            direct = measure(exe, env, runs)
+
+            for binary in configurations:
+                for env_vars in ENV_VAR_COUNTS:
+                    write_configuration(configuration_dir, "bench", exe, env_vars, binary)
+                    measured = measure(trampoline, env, runs)
+                    results.append(
+                        {
+                            "configuration": "binary" if binary else "json",
+                            "env_vars": env_vars,
+                            "pixi_base_path": base_path,
+                            "trampoline": measured,
+                            "direct": direct,
+                            "overhead_ms": measured["median_ms"] - direct["median_ms"],
+                            "page_faults_overhead": difference(
+                                measured["page_faults"], direct["page_faults"]
+                            ),
+                            "max_rss_overhead_kb": difference(
+                                measured["max_rss_kb"], direct["max_rss_kb"]
+                            ),
+                        }
+                    )
+
+    return {
+        "target": target,
+        "host": platform.platform(),
+        "runs": runs,
+        "compressed_size_bytes": compressed_trampoline_path(target).stat().st_size,
+        "decompressed_size_bytes": decompressed_size,
+        "results": results,
+    }
+
+
+def check_budget(report: Report, budget: Budget) -> list[str]:
+    """Returns a description of every budget that is exceeded."""
+    violations: list[str] = []
+
+    size_kb = report["decompressed_size_bytes"] / 1024
+    if size_kb > budget["max_decompressed_size_kb"]:
+        violations.append(
+            f"decompressed size {size_kb:.0f} KiB exceeds {budget['max_decompressed_size_kb']} KiB"
+        )
+
+    for result in report["results"]:
+        base_path = "set" if result["pixi_base_path"] else "unset"
+        scenario = (
+            f"{result['configuration']} configuration with {result['env_vars']} env vars "
+            + f"(PIXI_BASE_PATH {base_path})"
+        )
+        for key, value, maximum, unit in [
+            ("overhead_ms", result["overhead_ms"], budget["max_overhead_ms"], "ms"),
+            (
+                "page_faults_overhead",
+                result["page_faults_overhead"],
+                budget["max_page_faults_overhead"],
+                "page faults",
+            ),
+            (
+                "max_rss_overhead_kb",
+                result["max_rss_overhead_kb"],
+                budget["max_rss_overhead_kb"],
+                "KiB",
+            ),
+        ]:
+            if value is not None and value > maximum:
+                violations.append(f"{scenario}: {key} {value:.2f} {unit} exceeds {maximum} {unit}")
+
+    return violations
+
+
+def print_report(report: Report) -> None:
+    compressed_kb = report["compressed_size_bytes"] / 1024
+    decompressed_kb = report["decompressed_size_bytes"] / 1024
+    print(
+        f"{report['target']}: {compressed_kb:.0f} KiB compressed, "
+        + f"{decompressed_kb:.0f} KiB decompressed"
+    )
+    print(f"{'configuration':<14}{'env vars':>9}{'base path':>10}{'overhead':>12}{'faults':>8}")
+    for result in report["results"]:
+        faults = result["page_faults_overhead"]
+        base_path = "set" if result["pixi_base_path"] else "unset"
+        faults_text = "-" if faults is None else f"{faults:.0f}"
+        print(
+            f"{result['configuration']:<14}{result['env_vars']:>9}{base_path:>10}"
+            + f"{result['overhead_ms']:>10.2f}ms{faults_text:>8}"
+        )
+
+
+def main(target: str, runs: int, budget_path: Path) -> None:
+    report = bench(target, runs)
+    print_report(report)
+
+    # Record the results next to the binary they were measured for
+    output = BINARIES_DIR.joinpath(f"pixi-trampoline-{target}.bench.json")
+    output.write_text(json.dumps(report, indent=2) + "\n")
+
+    budget: Budget = json.loads(budget_path.read_text())
+    violations = check_budget(report, budget)
+    if violations:
+        for violation in violations:
+            print(f"budget exceeded: {violation}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the startup of the trampoline against executing the target directly."
+    )
+    parser.add_argument(
+        "--target",
+        type=str,
+        help="The target triple of the trampoline (e.g., x86_64-unknown-linux-musl).",
+    )
+    parser.add_argument(
+        "--runs", type=int, default=50, help="The number of runs for each scenario."
+    )
+    parser.add_argument(
+        "--budget",
+        type=Path,
+        default=DEFAULT_BUDGET,
+        help="The JSON file with the maximum allowed overhead of the trampoline.",
+    )
+    args = parser.parse_args()
+    target = args.target if args.target else get_default_target()
+    main(target, args.runs, args.budget)
@@ -8,11 +8,14 @@ use std::ops::Not;
 use std::os::unix::process::CommandExt;
 use std::path::{Path, PathBuf};
 use std::process::{Command, Stdio};
+use std::time::UNIX_EPOCH;
 mod executable_from_path;
 use executable_from_path::executable_from_path;
 
 // trampoline configuration folder name
 pub const TRAMPOLINE_CONFIGURATION: &str = "trampoline_configuration";
+// identifies the format of the binary configuration, and its version
+const BINARY_CONFIGURATION_MAGIC: &[u8; 8] = b"PXTRAMP1";
 
 #[derive(Deserialize, Debug)]
 pub struct Configuration {
@@ -24,13 +27,82 @@ pub struct Configuration {
     pub env: HashMap<String, String>,
 }
 
+/// Reads little-endian integers and length prefixed strings from a byte slice.
+struct BinaryReader<'a>(&'a [u8]);
+
+impl<'a> BinaryReader<'a> {
+    fn take(&mut self, len: usize) -> Option<&'a [u8]> {
+        if self.0.len() < len {
+            return None;
+        }
+        let (head, tail) = self.0.split_at(len);
+        self.0 = tail;
+        Some(head)
+    }
+
+    fn u32(&mut self) -> Option<u32> {
+        Some(u32::from_le_bytes(self.take(4)?.try_into().ok()?))
+    }
+
+    fn u64(&mut self) -> Option<u64> {
+        Some(u64::from_le_bytes(self.take(8)?.try_into().ok()?))
+    }
+
+    fn string(&mut self) -> Option<&'a str> {
+        let len = self.u32()? as usize;
+        std::str::from_utf8(self.take(len)?).ok()
+    }
+}
+
+/// Reads the compact binary configuration that pixi writes next to the JSON configuration, which
+/// doesn't require parsing JSON. Returns `None` if it doesn't exist, can't be decoded or if the
+/// JSON configuration was modified after the binary configuration was written.
+fn read_binary_configuration(configuration_dir: &Path, name: &str) -> Option<Configuration> {
+    let bytes = std::fs::read(configuration_dir.join(format!("{name}.bin"))).ok()?;
+    let mut reader = BinaryReader(&bytes);
+    if reader.take(BINARY_CONFIGURATION_MAGIC.len())? != BINARY_CONFIGURATION_MAGIC {
+        return None;
+    }
+
+    // The size and modification time of the JSON configuration it was written with
+    let (json_len, json_secs, json_nanos) = (reader.u64()?, reader.u64()?, reader.u32()?);
+    let json_metadata = std::fs::metadata(configuration_dir.join(format!("{name}.json"))).ok()?;
+    let json_mtime = json_metadata
+        .modified()
+        .ok()?
+        .duration_since(UNIX_EPOCH)
+        .ok()?;
+    if json_metadata.len() != json_len
+        || json_mtime.as_secs() != json_secs
+        || json_mtime.subsec_nanos() != json_nanos
+    {
+        return None;
+    }
+
+    let exe = PathBuf::from(reader.string()?);
+    let path_diff = reader.string()?.to_string();
+    let mut env = HashMap::new();
+    for _ in 0..reader.u32()? {
+        env.insert(reader.string()?.to_string(), reader.string()?.to_string());
+    }
+    Some(Configuration {
+        exe,
+        path_diff,
+        env,
+    })
+}
+
 fn read_configuration(current_exe: &Path) -> miette::Result<Configuration> {
     // the configuration file is next to the current executable parent folder,
     // under trampoline_configuration/current_exe_name.json
     if let Some(exe_parent) = current_exe.parent() {
-        let configuration_path = exe_parent
-            .join(TRAMPOLINE_CONFIGURATION)
-            .join(format!("{}.json", executable_from_path(current_exe),));
+        let configuration_dir = exe_parent.join(TRAMPOLINE_CONFIGURATION);
+        let name = executable_from_path(current_exe);
+        if let Some(configuration) = read_binary_configuration(&configuration_dir, &name) {
+            return Ok(configuration);
+        }
+
+        let configuration_path = configuration_dir.join(format!("{}.json", name));
         let configuration_file = File::open(&configuration_path)
             .into_diagnostic()
             .wrap_err(format!("Couldn't open {:?}", configuration_path))?;
@@ -47,40 +119,36 @@ fn read_configuration(current_exe: &Path) -> miette::Result<Configuration> {
 /// Compute the difference between two PATH variables (the entries split by `;` or `:`)
 fn setup_path(path_diff: &str) -> miette::Result<String> {
     let current_path = std::env::var("PATH").into_diagnostic()?;
-    let current_paths = std::env::split_paths(&current_path);
-    let path_diffs = std::env::split_paths(path_diff);
-
-    let paths: Vec<PathBuf> = if let Ok(base_path) = std::env::var("PIXI_BASE_PATH") {
-        let base_paths: Vec<PathBuf> = std::env::split_paths(&base_path).collect();
-        let new_parts: Vec<PathBuf> = current_paths
-            .filter(|current| base_paths.contains(current).not())
-            .collect();
-        new_parts
-            .into_iter()
-            .chain(path_diffs)
-            .chain(base_paths)
-            .collect()
-    } else {
-        path_diffs.chain(current_paths).collect()
+
+    let Ok(base_path) = std::env::var("PIXI_BASE_PATH") else {
+        // Prepending the entries doesn't require splitting the PATH
+        let separator = if cfg!(windows) { ";" } else { ":" };
+        return Ok(match (path_diff.is_empty(), current_path.is_empty()) {
+            (true, _) => current_path,
+            (false, true) => path_diff.to_string(),
+            (false, false) => format!("{path_diff}{separator}{current_path}"),
+        });
     };
 
+    let base_paths: Vec<PathBuf> = std::env::split_paths(&base_path).collect();
+    let new_parts = std::env::split_paths(&current_path)
+        .filter(|current| base_paths.contains(current).not())
+        .collect::<Vec<_>>();
+    let paths = new_parts
+        .into_iter()
+        .chain(std::env::split_paths(path_diff))
+        .chain(base_paths);
+
     std::env::join_paths(paths)
         .into_diagnostic()
         .map(|p| p.to_string_lossy().to_string())
 }
 
 fn trampoline() -> miette::Result<()> {
-    // Get command-line arguments (excluding the program name)
-    let args: Vec<String> = env::args().collect();
     let current_exe = env::current_exe()
         .into_diagnostic()
         .wrap_err("Couldn't get the `env::current_exe`")?;
 
-    // ignore any ctrl-c signals
-    ctrlc::set_handler(move || {})
-        .into_diagnostic()
-        .wrap_err("Couldn't set the ctrl-c handler")?;
-
     let configuration = read_configuration(&current_exe)?;
 
     // Create a new Command for the specified executable
@@ -94,8 +162,8 @@ fn trampoline() -> miette::Result<()> {
     // Special case for PATH
     cmd.env("PATH", setup_path(&configuration.path_diff)?);
 
-    // Add any additional arguments
-    cmd.args(&args[1..]);
+    // Add any additional command-line arguments (excluding the program name)
+    cmd.args(env::args_os().skip(1));
 
     // Configure stdin, stdout, and stderr to use the current process's streams
     cmd.stdin(Stdio::inherit())
@@ -112,6 +180,12 @@ fn trampoline() -> miette::Result<()> {
 
     #[cfg(target_os = "windows")]
     {
+        // ignore any ctrl-c signals, the child process handles them. This is not needed when the
+        // process is replaced with `exec`.
+        ctrlc::set_handler(move || {})
+            .into_diagnostic()
+            .wrap_err("Couldn't set the ctrl-c handler")?;
+
         let mut child = cmd
             .spawn()
             .into_diagnostic()
@@ -135,3 +209,91 @@ fn main() {
         std::process::exit(1);
     }
 }
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+    use std::time::{Duration, SystemTime};
+
+    /// The modification time of the JSON configuration that the binary configuration fixture was
+    /// encoded for. The fixture is produced by `Configuration::to_binary` in `pixi_global`, which
+    /// checks that it still encodes to the same bytes.
+    const FIXTURE_MTIME: Duration = Duration::new(1_700_000_000, 123_456_700);
+
+    fn set_modified(path: &Path, time: SystemTime) {
+        std::fs::File::options()
+            .write(true)
+            .open(path)
+            .unwrap()
+            .set_modified(time)
+            .unwrap();
+    }
+
+    /// Creates a configuration folder with the fixtures for an executable named `python`.
+    fn configuration_dir(test_name: &str) -> PathBuf {
+        let dir = env::temp_dir().join(format!(
+            "pixi-trampoline-{test_name}-{}",
+            std::process::id()
+        ));
+        let _ = fs_err::remove_dir_all(&dir);
+        let configuration_dir = dir.join(TRAMPOLINE_CONFIGURATION);
+        fs_err::create_dir_all(&configuration_dir).unwrap();
+        fs_err::write(
+            configuration_dir.join("python.json"),
+            include_bytes!("../tests/fixtures/binary_configuration.json"),
+        )
+        .unwrap();
+        fs_err::write(
+            configuration_dir.join("python.bin"),
+            include_bytes!("../tests/fixtures/binary_configuration.bin"),
+        )
+        .unwrap();
+        set_modified(
+            &configuration_dir.join("python.json"),
+            UNIX_EPOCH + FIXTURE_MTIME,
+        );
+        configuration_dir
+    }
+
+    #[test]
+    fn decodes_binary_configuration_of_pixi_global() {
+        let configuration_dir = configuration_dir("decode");
+        let configuration = read_binary_configuration(&configuration_dir, "python")
+            .expect("the binary configuration should be used");
+        assert_eq!(
+            configuration.exe,
+            PathBuf::from("/opt/pixi/envs/test/bin/python")
+        );
+        assert_eq!(configuration.path_diff, "/opt/pixi/envs/test/bin");
+        assert_eq!(
+            configuration.env,
+            HashMap::from([(
+                String::from("CONDA_PREFIX"),
+                String::from("/opt/pixi/envs/test")
+            )])
+        );
+    }
+
+    #[test]
+    fn outdated_binary_configuration_falls_back_to_json() {
+        let configuration_dir = configuration_dir("fallback");
+        let json = configuration_dir.join("python.json");
+
+        // The JSON configuration was modified after the binary configuration was written
+        set_modified(&json, UNIX_EPOCH + FIXTURE_MTIME + Duration::from_secs(1));
+        assert!(read_binary_configuration(&configuration_dir, "python").is_none());
+
+        // The JSON configuration has another size, but the same modification time
+        let mut contents = fs_err::read(&json).unwrap();
+        contents.push(b'\n');
+        fs_err::write(&json, contents).unwrap();
+        set_modified(&json, UNIX_EPOCH + FIXTURE_MTIME);
+        assert!(read_binary_configuration(&configuration_dir, "python").is_none());
+
+        let exe = configuration_dir.parent().unwrap().join("python");
+        let configuration = read_configuration(&exe).unwrap();
+        assert_eq!(configuration.path_diff, "/opt/pixi/envs/test/bin");
+
+        fs_err::remove_dir_all(configuration_dir.parent().unwrap()).unwrap();
+    }
+}